@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+# =========================
+# gost-check：离线批量检查（不依赖 Django / Celery / 数据库）
+#   gost-check archive/ 'reports/**/*.docx' -j 8 -o results.jsonl --checkpoint results.done
+# - 每个 worker 进程启动时建一个 Checker（加载 runtime.json、编好模式自动机等），之后逐个文档
+#   Checker.check，结果按 JSON Lines 流式写出（完成一个写一行，不攒在内存）
+# - 文档按 chunksize 一批批派给 worker（imap_unordered：谁先做完谁先写）
+# - checkpoint：每写出一行就追加一行路径；再次运行时跳过已完成的文档，输出追加到原文件
+# =========================
+
+STANDARDS_DIR = Path(__file__).resolve().parent / "standards"
+DEFAULT_RULES = STANDARDS_DIR / "gost_7_32_2017.runtime.json"
+DEFAULT_DSL = STANDARDS_DIR / "gost_7_32_2017.yaml"
+
+
+def resolve_rules(path: Optional[str]) -> str:
+    """runtime.json 直接用；给的是 DSL（.yaml）或默认 runtime 不存在时，现编一份到临时目录。"""
+    src = Path(path) if path else DEFAULT_RULES
+    if src.suffix in (".yaml", ".yml") or (not path and not src.exists()):
+        from .engine.compile_dsl import compile_dsl
+
+        dsl = src if src.suffix in (".yaml", ".yml") else DEFAULT_DSL
+        out = Path(tempfile.mkdtemp(prefix="gost-check-")) / "runtime.json"
+        compile_dsl(dsl, out)
+        return str(out)
+    if not src.exists():
+        raise SystemExit(f"gost-check: rules not found: {src}")
+    return str(src)
+
+
+def iter_inputs(specs: Iterable[str]) -> Iterator[str]:
+    """目录（递归找 .docx）/ glob / 文件 -> 去重后的路径；跳过 Word 的 ~$ 锁文件。"""
+    seen: Set[str] = set()
+    for spec in specs:
+        if os.path.isdir(spec):
+            found = sorted(str(p) for p in Path(spec).rglob("*.docx"))
+        elif glob.has_magic(spec):
+            found = sorted(glob.glob(spec, recursive=True))
+        else:
+            found = [spec]
+        for path in found:
+            if Path(path).name.startswith("~$") or path in seen:
+                continue
+            seen.add(path)
+            yield path
+
+
+# ---------- worker ----------
+_CHECKER = None  # 每个 worker 进程一个常驻 Checker（engine/checker.py）
+_ANNOTATE_DIR: Optional[str] = None
+
+
+def _init_worker(rules_path: str, extract_workers: int = 1, annotate_dir: Optional[str] = None):
+    global _CHECKER, _ANNOTATE_DIR
+    from .engine.checker import Checker
+
+    _CHECKER = Checker.from_path(rules_path, extract_workers=extract_workers)
+    _ANNOTATE_DIR = annotate_dir
+
+
+def annotated_path(path: str, annotate_dir: str) -> str:
+    # 不同目录下的同名文件靠路径 hash 区分
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(annotate_dir, f"{Path(path).stem}.{digest}.annotated.docx")
+
+
+def check_file(path: str) -> Dict[str, Any]:
+    """一个文档 -> 一行结果；异常不外抛（记成 status=error，批处理继续）。"""
+    res = next(_CHECKER.check_many([path])).to_dict()
+    if _ANNOTATE_DIR and res["status"] == "ok":
+        from .engine.annotate import annotate_docx
+
+        out = annotated_path(path, _ANNOTATE_DIR)
+        try:
+            annotate_docx(path, out, res["issues"])
+            res["annotated"] = out
+        except Exception as exc:
+            res["annotate_error"] = f"{type(exc).__name__}: {exc}"
+    return res
+
+
+# ---------- checkpoint ----------
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run(paths: List[str], rules_path: str, out, *, jobs: int = 1, chunksize: int = 4,
+        checkpoint=None, extract_workers: int = 1, annotate_dir: Optional[str] = None,
+        progress=None) -> Dict[str, int]:
+    """paths 逐个检查，结果写进 out（每行一个 JSON）；返回统计。"""
+    stats = {"ok": 0, "error": 0, "issues": 0}
+
+    def emit(res: Dict[str, Any]):
+        out.write(json.dumps(res, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+        if checkpoint is not None:
+            # 先写结果再记 checkpoint：中途被杀最多重做一个文档，不会丢结果
+            checkpoint.write(res["path"] + "\n")
+            checkpoint.flush()
+        stats[res["status"]] += 1
+        stats["issues"] += len(res.get("issues") or [])
+        if progress:
+            progress(stats, res)
+
+    if jobs <= 1 or len(paths) <= 1:
+        _init_worker(rules_path, extract_workers, annotate_dir)
+        for path in paths:
+            emit(check_file(path))
+        return stats
+
+    # spawn：和 benchmarks / chunked 一致，不继承父进程的线程和打开的文件
+    with get_context("spawn").Pool(jobs, initializer=_init_worker, initargs=(rules_path, extract_workers, annotate_dir)) as pool:
+        for res in pool.imap_unordered(check_file, paths, chunksize=max(1, chunksize)):
+            emit(res)
+    return stats
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="gost-check",
+        description="Check .docx reports against GOST 7.32-2017 offline (no database / broker); results as JSON Lines.",
+    )
+    ap.add_argument("inputs", nargs="+", help="files, directories (searched recursively) or glob patterns")
+    ap.add_argument("-r", "--rules", default=None, help="runtime.json or DSL .yaml (default: compiled GOST 7.32-2017)")
+    ap.add_argument("-o", "--out", default="-", help="JSON Lines output file (default: stdout)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("--chunksize", type=int, default=4, help="documents handed to a worker at a time")
+    ap.add_argument("--checkpoint", default=None,
+                    help="file of finished paths; existing entries are skipped and output is appended")
+    ap.add_argument("--extract-workers", type=int, default=1,
+                    help="processes for chunked extraction of very large documents (inside each job)")
+    ap.add_argument("--annotate", metavar="DIR", default=None,
+                    help="also write a copy of each document with the findings as Word comments into DIR")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no progress on stderr")
+    args = ap.parse_args(argv)
+
+    rules_path = resolve_rules(args.rules)
+    if args.annotate:
+        os.makedirs(args.annotate, exist_ok=True)
+    done = load_checkpoint(args.checkpoint)
+    paths = [p for p in iter_inputs(args.inputs) if p not in done]
+    if not args.quiet:
+        print(f"gost-check: {len(paths)} documents to check ({len(done)} already done)", file=sys.stderr)
+
+    t0 = time.perf_counter()
+
+    def progress(stats, res):
+        n = stats["ok"] + stats["error"]
+        if res["status"] == "error":
+            print(f"  error: {res['path']}: {res['error']}", file=sys.stderr)
+        if n % 50 == 0 or n == len(paths):
+            rate = n / max(time.perf_counter() - t0, 1e-9) * 60
+            print(f"  {n}/{len(paths)} ({rate:.0f} docs/min)", file=sys.stderr)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "a" if done else "w", encoding="utf-8")
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+    try:
+        stats = run(
+            paths, rules_path, out,
+            jobs=args.jobs, chunksize=args.chunksize, checkpoint=checkpoint,
+            extract_workers=args.extract_workers, annotate_dir=args.annotate,
+            progress=None if args.quiet else progress,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if not args.quiet:
+        print(
+            f"gost-check: {stats['ok']} ok, {stats['error']} failed, {stats['issues']} issues "
+            f"in {time.perf_counter() - t0:.1f}s",
+            file=sys.stderr,
+        )
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import posixpath
+import re
+import shutil
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from lxml import etree
+
+from .chunked import paragraph_spans
+from .package import REL_NS, DocxPackage, _rels_name
+
+# =========================
+# 带批注的原文副本：每条 finding 作为 Word 批注挂在它定位到的段落上（para_idx = 顶层 <w:p> 序号）
+# - 整个包只顺序过一遍：其他部件原样流式拷贝（保持原压缩方式），不经过 python-docx 的 load/save
+# - document.xml 只在目标段落的字节偏移处插 commentRangeStart / commentRangeEnd / commentReference，
+#   段落边界用和分块提取相同的字节扫描（chunked.paragraph_spans），不建 DOM
+# - comments.xml：原文已有批注就追加（id 接着编），没有就新建并补 .rels 关系和 [Content_Types] 覆盖项
+# - 没定位到段落的 finding（缺章节等文档级问题）挂在第一个段落上
+# =========================
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+COMMENTS_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+COMMENTS_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
+
+AUTHOR = "ГОСТ 7.32-2017"
+INITIALS = "ГОСТ"
+COPY_BUFFER = 1024 * 1024
+
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_PPR_RE = re.compile(rb"<(/?)w:pPr(?=[\s>/])")
+_ID_RE = re.compile(rb'<w:comment\b[^>]*?\bw:id="(-?\d+)"')
+
+
+def _text(s: Any) -> str:
+    return escape(_ILLEGAL_XML.sub(" ", str(s or "")))
+
+
+def _comment_xml(cid: int, fin: Dict[str, Any], date: str) -> str:
+    head = " ".join(x for x in (
+        f"[{fin.get('severity') or 'NEED_REVIEW'}]",
+        str(fin["rule_id"]) if fin.get("rule_id") else "",
+        f"§{fin['clause']}" if fin.get("clause") else "",
+    ) if x)
+    lines = [f"{head}: {fin.get('message') or ''}"]
+    if fin.get("suggestion"):
+        lines.append(f"Рекомендация: {fin['suggestion']}")
+    paras = "".join(f'<w:p><w:r><w:t xml:space="preserve">{_text(line)}</w:t></w:r></w:p>' for line in lines)
+    return (
+        f'<w:comment w:id="{cid}" w:author={quoteattr(AUTHOR)} w:initials={quoteattr(INITIALS)} '
+        f'w:date="{date}">{paras}</w:comment>'
+    )
+
+
+def _after_ppr(xml: bytes, pos: int, close: int) -> int:
+    """段落开标签之后：有 <w:pPr> 就跳到它的结束处（批注范围必须在 pPr 之后）"""
+    m = _PPR_RE.match(xml, pos)
+    if m is None or m.group(1):
+        return pos
+    depth = 0
+    for m in _PPR_RE.finditer(xml, pos, close):
+        gt = xml.index(b">", m.end())
+        if m.group(1):
+            depth -= 1
+        elif xml[gt - 1:gt] != b"/":
+            depth += 1
+        elif depth == 0:  # <w:pPr/>
+            return gt + 1
+        if depth == 0:
+            return gt + 1
+    return pos
+
+
+def _patch_document(xml: bytes, spans: Dict[int, Tuple[int, int, int]], ids_by_para: Dict[int, List[int]]) -> List[bytes]:
+    """-> 改好的 document.xml 分片（按顺序写出即可，不拼成整块）"""
+    edits: List[Tuple[int, int, bytes]] = []  # (起点, 终点, 替换内容)
+    for idx, ids in ids_by_para.items():
+        start, open_end, close = spans[idx]
+        begin = "".join(f'<w:commentRangeStart w:id="{i}"/>' for i in ids).encode()
+        end = "".join(
+            f'<w:commentRangeEnd w:id="{i}"/><w:r><w:commentReference w:id="{i}"/></w:r>' for i in ids
+        ).encode()
+        if close < 0:  # <w:p .../>：展开成成对标签
+            tag = xml[start:open_end - 2].rstrip() + b">"
+            edits.append((start, open_end, tag + begin + end + b"</w:p>"))
+            continue
+        at = _after_ppr(xml, open_end, close)
+        edits.append((at, at, begin))
+        edits.append((close, close, end))
+    edits.sort(key=lambda e: e[0])
+
+    out, cur = [], 0
+    for a, b, data in edits:
+        out.append(xml[cur:a])
+        out.append(data)
+        cur = b
+    out.append(xml[cur:])
+    return out
+
+
+def _add_relationship(rels_xml: Optional[bytes], target: str) -> bytes:
+    if rels_xml:
+        root = etree.fromstring(rels_xml)
+    else:
+        root = etree.Element(f"{{{REL_NS}}}Relationships", nsmap={None: REL_NS})
+    used = {rel.get("Id") for rel in root}
+    n = len(used) + 1
+    while f"rId{n}" in used:
+        n += 1
+    etree.SubElement(root, f"{{{REL_NS}}}Relationship", Id=f"rId{n}", Type=COMMENTS_RELTYPE, Target=target)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _add_content_type(ct_xml: bytes, part: str) -> bytes:
+    root = etree.fromstring(ct_xml)
+    etree.SubElement(root, f"{{{CT_NS}}}Override", PartName="/" + part, ContentType=COMMENTS_CT)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def annotate_docx(source, out, findings: Iterable[Dict[str, Any]]) -> int:
+    """
+    source：原 .docx（路径 / bytes / 文件对象）；out：输出路径或可写的二进制文件对象。
+    findings：issue dict（run_plan 的结果或 Finding.to_issue()）。返回写进去的批注条数。
+    """
+    findings = list(findings)
+    date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    with DocxPackage(source) as pkg:
+        main = pkg.main_part
+        xml = pkg.read(main)
+        if xml is None:
+            raise ValueError(f"{main}: main document part not found")
+
+        comments_part = pkg.related("comments", main)
+        existing = pkg.read(comments_part)
+        next_id = max((int(i) for i in _ID_RE.findall(existing or b"")), default=-1) + 1
+
+        # 段落 -> 批注 id；没有 para_idx 或 idx 越界的挂到第一个段落
+        wanted = {i for i in (f.get("para_idx") for f in findings) if isinstance(i, int) and i >= 0}
+        spans = paragraph_spans(xml, wanted | {0})
+        placed: List[Dict[str, Any]] = []
+        by_para: Dict[int, List[int]] = {}
+        for fin in findings:
+            idx = fin.get("para_idx")
+            idx = idx if idx in spans else 0
+            if idx not in spans:
+                continue  # 文档一个段落都没有
+            by_para.setdefault(idx, []).append(next_id + len(placed))
+            placed.append(fin)
+        body_parts = _patch_document(xml, spans, by_para)
+        del xml
+
+        comments = "".join(_comment_xml(next_id + n, fin, date) for n, fin in enumerate(placed)).encode()
+        if existing:
+            cut = existing.rfind(b"</w:comments>")
+            if cut < 0:  # <w:comments .../>：空的批注部件
+                cut = existing.rindex(b"/>")
+                existing = existing[:cut] + b"></w:comments>"
+                cut += 1
+            comments_xml = existing[:cut] + comments + existing[cut:]
+        else:
+            comments_part = posixpath.join(posixpath.dirname(main), "comments.xml")
+            comments_xml = (
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<w:comments xmlns:w="' + W_NS.encode() + b'">' + comments + b"</w:comments>"
+            )
+
+        replace = {main: body_parts, comments_part: [comments_xml]}
+        if not existing:
+            rels = _rels_name(main)
+            replace[rels] = [_add_relationship(pkg.read(rels), comments_part.rsplit("/", 1)[-1])]
+            replace["[Content_Types].xml"] = [_add_content_type(pkg.read("[Content_Types].xml"), comments_part)]
+
+        zin = pkg.zf
+        with zipfile.ZipFile(out, "w") as zout:
+            for info in zin.infolist():
+                parts = replace.pop(info.filename, None)
+                with zout.open(_copy_info(info), "w") as dst:
+                    if parts is not None:
+                        for chunk in parts:
+                            dst.write(chunk)
+                    else:
+                        with zin.open(info) as src:
+                            shutil.copyfileobj(src, dst, COPY_BUFFER)
+            for name, parts in replace.items():  # 新部件（comments.xml / 原来没有的 .rels）
+                info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with zout.open(info, "w") as dst:
+                    for chunk in parts:
+                        dst.write(chunk)
+    return len(placed)
+
+
+def _copy_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    new = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    new.compress_type = info.compress_type if info.compress_type == zipfile.ZIP_STORED else zipfile.ZIP_DEFLATED
+    new.external_attr = info.external_attr
+    return new
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# =========================
+# 图 / 表 / 公式 编号索引（6.5 figure_rules / 6.6 table_rules / 6.8 formula_rules）
+# 一次扫描全文，同时收集三类对象的题注（Рисунок N / Таблица N / (N)）和正文引用，
+# 三个 op 共用同一份索引：多一个 op 不多一遍扫描。
+# 编号形式：1, 2, 3（全文连续）/ 1.1, 1.2（按章）/ А.1（附录）
+# =========================
+
+_NUM = r"(?:[А-ЯA-Z]\.)?\d{1,3}(?:\.\d{1,3})?"
+_NUM_LIST = rf"{_NUM}(?:\s*(?:,|и|[-–—])\s*{_NUM})*"
+
+_CAPTION_RE = {
+    "figure": re.compile(rf"^Рисунок\s+({_NUM})\s*(?:[-–—]\s*(.*))?$"),
+    "table": re.compile(rf"^Таблица\s+({_NUM})\s*(?:[-–—]\s*(.*))?$"),
+}
+_FORMULA_RE = re.compile(rf"^(.*?)\s*\(({_NUM})\)\s*$")
+_MATH_CHARS = set("=<>≤≥≈≠+−×·∙/^∑∫√∂∞±")
+
+_REF_RE = {
+    "figure": re.compile(
+        rf"(?<![А-Яа-яЁё])(?:рис\.|рисун(?:ок|ка|ке|ку|ком|ки|ков|кам|ках|ками))\s*({_NUM_LIST})", re.I
+    ),
+    "table": re.compile(
+        rf"(?<![А-Яа-яЁё])(?:табл\.|таблиц(?:а|ы|е|у|ей|ах|ами|ам))\s*({_NUM_LIST})", re.I
+    ),
+    "formula": re.compile(
+        rf"(?<![А-Яа-яЁё])(?:формул[а-я]*|из|в|по|согласно|см\.)\s+\(({_NUM})\)", re.I
+    ),
+}
+
+KINDS = ("figure", "table", "formula")
+
+MAX_RANGE = 50
+
+
+def parse_number(num: str) -> Tuple[Optional[str], int]:
+    """'3' -> (None, 3)；'2.4' -> ('2', 4)；'А.1' -> ('А', 1)"""
+    if "." in num:
+        prefix, seq = num.rsplit(".", 1)
+        return prefix, int(seq)
+    return None, int(num)
+
+
+def _expand(num_list: str) -> List[str]:
+    """'1, 2 и 4' -> [1, 2, 4]；'1–3' -> [1, 2, 3]（只展开同前缀的区间）"""
+    out: List[str] = []
+    tokens = re.findall(rf"{_NUM}|[-–—]", num_list)
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok in "-–—":
+            i += 1
+            continue
+        if i + 2 < len(tokens) and tokens[i + 1] in "-–—":
+            a, b = parse_number(tok), parse_number(tokens[i + 2])
+            if a[0] == b[0] and a[1] <= b[1] and b[1] - a[1] <= MAX_RANGE:
+                prefix = f"{a[0]}." if a[0] is not None else ""
+                out.extend(f"{prefix}{k}" for k in range(a[1], b[1] + 1))
+                i += 3
+                continue
+        out.append(tok)
+        i += 1
+    return out
+
+
+def _is_formula(body: str, text: str) -> bool:
+    # OMML 公式在 python-docx 的段落文本里是空的，只剩下 "(N)"；否则要求有数学符号
+    if len(text) > 200:
+        return False
+    body = body.strip()
+    return not body or any(ch in _MATH_CHARS for ch in body)
+
+
+def build_caption_index(paragraphs: List[dict]) -> Dict[str, dict]:
+    """
+    返回 {kind: {"captions": [...], "refs": [(pos, idx, num), ...]}}
+    - captions：{"num", "prefix", "seq", "pos", "idx", "title"}，按 pos 升序
+    - refs：正文引用，按 pos 升序（题注段落本身不算引用）
+    """
+    index: Dict[str, dict] = {k: {"captions": [], "refs": []} for k in KINDS}
+
+    for pos, p in enumerate(paragraphs):
+        text = (p.get("text") or "").strip()
+        if not text:
+            continue
+
+        caption_kind = None
+        for kind, rx in _CAPTION_RE.items():
+            m = rx.match(text)
+            if m:
+                caption_kind = kind
+                prefix, seq = parse_number(m.group(1))
+                index[kind]["captions"].append({
+                    "num": m.group(1), "prefix": prefix, "seq": seq,
+                    "pos": pos, "idx": p.get("idx"), "title": (m.group(2) or "").strip(),
+                })
+                break
+        if caption_kind:
+            continue
+
+        m = _FORMULA_RE.match(text)
+        if m and _is_formula(m.group(1), text):
+            prefix, seq = parse_number(m.group(2))
+            index["formula"]["captions"].append({
+                "num": m.group(2), "prefix": prefix, "seq": seq,
+                "pos": pos, "idx": p.get("idx"), "title": "",
+            })
+            continue
+
+        low = text.lower()
+        if "рис" in low:
+            for m in _REF_RE["figure"].finditer(text):
+                index["figure"]["refs"].extend((pos, p.get("idx"), n) for n in _expand(m.group(1)))
+        if "табл" in low:
+            for m in _REF_RE["table"].finditer(text):
+                index["table"]["refs"].extend((pos, p.get("idx"), n) for n in _expand(m.group(1)))
+        if "(" in text:
+            for m in _REF_RE["formula"].finditer(text):
+                index["formula"]["refs"].append((pos, p.get("idx"), m.group(1)))
+
+    return index
+
+
+def chapter_numbers(paragraphs: List[dict], chapters: List[int]) -> List[Optional[str]]:
+    """一级标题 '2 Методы' -> '2'；没有编号的（ВВЕДЕНИЕ 等）为 None。"""
+    out: List[Optional[str]] = []
+    for pos in chapters:
+        m = re.match(r"^\s*(\d{1,3})[\.\s]", (paragraphs[pos].get("text") or "") + " ")
+        out.append(m.group(1) if m else None)
+    return out
+
+
+def check_numbering(
+    captions: List[dict],
+    chapters: List[int],
+    chapter_nums: List[Optional[str]],
+    appendix_start: Optional[int],
+) -> List[Tuple[dict, str]]:
+    """
+    编号校验，返回 [(caption, 问题描述), ...]
+    - 正文：要么全部连续编号（1, 2, 3），要么全部按章（2.1, 2.2 且前缀 = 章号），不能混用
+    - 附录：按附录字母分组（А.1, А.2）
+    """
+    problems: List[Tuple[dict, str]] = []
+    body = [c for c in captions if appendix_start is None or c["pos"] < appendix_start]
+    appx = [c for c in captions if appendix_start is not None and c["pos"] >= appendix_start]
+
+    per_chapter = [c for c in body if c["prefix"] is not None]
+    if per_chapter and len(per_chapter) != len(body):
+        first_plain = next(c for c in body if c["prefix"] is None)
+        problems.append((first_plain, "смешанная нумерация: сквозная и в пределах раздела"))
+        return problems
+
+    seen = set()
+    expected: Dict[Optional[str], int] = {}
+    for k_body, c in enumerate(body + appx):
+        if c["num"] in seen:
+            problems.append((c, f"номер {c['num']} повторяется"))
+            continue
+        seen.add(c["num"])
+        if k_body < len(body) and c["prefix"] is not None:
+            k = bisect_right(chapters, c["pos"]) - 1
+            ch = chapter_nums[k] if k >= 0 else None
+            if ch is not None and c["prefix"] != ch:
+                problems.append((c, f"номер {c['num']} не соответствует номеру раздела {ch}"))
+        want = expected.get(c["prefix"], 1)
+        if c["seq"] != want:
+            prefix = f"{c['prefix']}." if c["prefix"] is not None else ""
+            problems.append((c, f"после номера {prefix}{want - 1} идёт {c['num']}" if want > 1
+                             else f"нумерация начинается с {c['num']}, а не с {prefix}1"))
+        expected[c["prefix"]] = c["seq"] + 1
+    return problems
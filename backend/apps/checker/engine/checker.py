@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .conditions import compile_condition, parse_condition
+from .docx_extractor import extract_docx_snapshot
+from .hard_rules import build_context, run_plan
+from .patterns import ruleset_automaton
+from .rule_loader import load_rules
+
+# =========================
+# 嵌入用的进程内检查器：别的服务直接 import，不用复制 run_check_job 的流程
+#   checker = Checker.from_path(".../gost_7_32_2017.runtime.json")
+#   result = checker.check(upload_bytes)          # 路径 / bytes / 二进制文件对象
+#   for r in checker.check_many(paths): ...
+# - 规则集只加载、校验一次；字面量自动机、条件闭包在构造时编好，之后每个文档只付
+#   提取 + 跑规则的成本
+# - 结果是结构化的 Finding（NamedTuple），to_issue() 可还原成 result_writer / Finding 模型用的 dict
+# =========================
+
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, Any]
+
+SEVERITY_ORDER = ("HIGH", "MEDIUM", "LOW", "NEED_REVIEW")
+
+
+class Finding(NamedTuple):
+    rule_id: Optional[str]
+    clause: Optional[str]
+    severity: str
+    category: Optional[str]
+    message: str
+    suggestion: str
+    anchor: Optional[str]
+    para_idx: Optional[int]
+    snippet: Optional[str]
+    text_hash: Optional[str]
+
+    @classmethod
+    def from_issue(cls, issue: dict) -> "Finding":
+        rule_id = issue.get("rule_id")
+        return cls(
+            rule_id=str(rule_id) if rule_id is not None else None,
+            clause=issue.get("clause"),
+            severity=str(issue.get("severity") or "NEED_REVIEW"),
+            category=issue.get("category"),
+            message=str(issue.get("message") or ""),
+            suggestion=str(issue.get("suggestion") or ""),
+            anchor=issue.get("anchor"),
+            para_idx=issue.get("para_idx"),
+            snippet=issue.get("snippet"),
+            text_hash=issue.get("text_hash"),
+        )
+
+    def to_issue(self) -> dict:
+        return {"page": "?", **self._asdict()}
+
+
+class CheckResult(NamedTuple):
+    source: str  # 路径；bytes / 文件对象时是调用方给的 name 或 "<bytes>"
+    findings: List[Finding]
+    paragraphs: int
+    seconds: float
+    error: Optional[str] = None  # 只有 check_many 会产出：坏文件记一条继续
+    snapshot: Optional[dict] = None  # keep_snapshot=True 时保留（写结果 docx / 回放用）
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """按严重级别计数（HIGH -> NEED_REVIEW 顺序）"""
+        c = Counter(f.severity for f in self.findings)
+        return {s: c.pop(s) for s in SEVERITY_ORDER if s in c} | dict(c)
+
+    def issues(self) -> List[dict]:
+        return [f.to_issue() for f in self.findings]
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.error is not None:
+            return {"path": self.source, "status": "error", "error": self.error, "seconds": self.seconds}
+        return {
+            "path": self.source,
+            "status": "ok",
+            "paragraphs": self.paragraphs,
+            "counts": self.counts,
+            "issues": self.issues(),
+            "seconds": self.seconds,
+        }
+
+
+class Checker:
+    """
+    runtime：load_rules 得到的规则集（dict）。
+    extract_workers：超大文档的分块并行提取进程数（见 chunked）；
+    skip_ops：不在这里跑的 op（如交给 AI 的 CHECK_SEMANTIC_REVIEW）。
+    """
+    def __init__(self, runtime: dict, *, extract_workers: int = 1, skip_ops: Iterable[str] = (),
+                 keep_snapshot: bool = False):
+        self.runtime = runtime
+        self.extract_workers = extract_workers
+        self.skip_ops: Tuple[str, ...] = tuple(skip_ops)
+        self.keep_snapshot = keep_snapshot
+
+        # 预热：自动机 / 条件闭包都按内容缓存在进程里，这里编好后每个文档直接命中
+        self.automaton = ruleset_automaton(runtime)
+        for rule in runtime.get("rules") or []:
+            tree = rule.get("condition")
+            if tree is None and (rule.get("args") or {}).get("condition") is not None:
+                tree = parse_condition(rule["args"]["condition"])
+            if tree is not None:
+                compile_condition(tree)
+
+    @classmethod
+    def from_path(cls, rules_path: Union[str, os.PathLike], **kw) -> "Checker":
+        return cls(load_rules(str(rules_path)), **kw)
+
+    def check(self, source: Source, *, name: Optional[str] = None) -> CheckResult:
+        """一个文档（路径 / bytes / 二进制文件对象）-> CheckResult；提取失败直接抛异常。"""
+        t0 = time.perf_counter()
+        snap = extract_docx_snapshot(source, workers=self.extract_workers)
+        return self.check_snapshot(snap, name=name or _source_name(source), t0=t0)
+
+    def check_snapshot(self, snap: dict, *, name: str = "<snapshot>", t0: Optional[float] = None) -> CheckResult:
+        """已有的 snapshot（如 job 留档的）直接跑规则，不碰 docx。"""
+        t0 = time.perf_counter() if t0 is None else t0
+        ctx = build_context(snap, self.runtime, automaton=self.automaton)
+        issues = run_plan(snap, self.runtime, ctx, skip_ops=self.skip_ops)
+        return CheckResult(
+            source=name,
+            findings=[Finding.from_issue(i) for i in issues],
+            paragraphs=len(snap.get("paragraphs") or []),
+            seconds=round(time.perf_counter() - t0, 3),
+            snapshot=snap if self.keep_snapshot else None,
+        )
+
+    def check_many(self, sources: Iterable[Source]) -> Iterator[CheckResult]:
+        """逐个检查，按输入顺序产出；某个文档出错时产出 error 结果，后面的照常检查。"""
+        for source in sources:
+            t0 = time.perf_counter()
+            try:
+                result = self.check(source)
+            except Exception as exc:  # 坏文件 / 非 docx：记下来继续
+                result = CheckResult(
+                    source=_source_name(source),
+                    findings=[],
+                    paragraphs=0,
+                    seconds=round(time.perf_counter() - t0, 3),
+                    error=f"{type(exc).__name__}: {exc}",
+                )
+            yield result
+
+
+def _source_name(source: Source) -> str:
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return str(getattr(source, "name", None) or "<bytes>")
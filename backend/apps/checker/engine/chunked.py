@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+
+from .styles import FormatTable, StyleResolver, theme_fonts
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# 大文档并行提取
+# 1) document.xml 按字节只扫一遍，找出 <w:body> 顶层 <w:p>/<w:tbl>/<w:sdt> 的结束位置（顺带数顶层段落）
+# 2) 按字节数切成大小均衡的块，每块带上“块前有多少个顶层段落”——idx 全局一致
+# 3) 进程池里各自解析（styles.xml 按内容 hash 在 worker 里缓存成 StyleResolver），
+#    回到主进程按块顺序拼接，各块的 run 格式表重新编号合并成全局表
+# =========================
+
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024  # document.xml 小于这个（解压后）不值得起进程，直接顺序解析
+MIN_CHUNK_BYTES = 512 * 1024
+CHUNKS_PER_WORKER = 2  # 块数多于 worker 数：块大小不均时尾部不至于只剩一个进程在跑
+
+_TAG_RE = re.compile(rb"<(/?)w:(p|tbl|sdt)(?=[\s>/])")
+_ROOT_RE = re.compile(rb"<w:document\b[^>]*>")
+_BODY_RE = re.compile(rb"<w:body\b[^>]*>")
+_SECT_RE = re.compile(rb"<w:sectPr\b(?:[^>]*/>|.*?</w:sectPr>)", re.S)
+
+
+def scan_body(xml: bytes) -> Tuple[bytes, int, int, List[Tuple[int, int]]]:
+    """
+    -> (根元素开标签, body 内容起点, body 内容终点, [(顶层元素结束偏移, 截至此处的顶层段落数)])
+    只认 p / tbl / sdt 三种标签的开闭（<w:pPr>、<w:tblPr> 等不匹配）；正文里的 "<" 一定被转义，不会误判。
+    """
+    root = _ROOT_RE.search(xml)
+    body = _BODY_RE.search(xml, root.end() if root else 0)
+    if root is None or body is None:
+        raise ValueError("document.xml: <w:document>/<w:body> not found")
+    start, end = body.end(), xml.rfind(b"</w:body>")
+
+    bounds: List[Tuple[int, int]] = []
+    depth = 0
+    n_para = 0
+    for m in _TAG_RE.finditer(xml, start, end):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                bounds.append((xml.index(b">", m.end()) + 1, n_para))
+            continue
+        gt = xml.index(b">", m.end())
+        if depth == 0 and m.group(2) == b"p":
+            n_para += 1
+        if xml[gt - 1:gt] == b"/":  # <w:p/>：自闭合，不改变深度
+            if depth == 0:
+                bounds.append((gt + 1, n_para))
+        else:
+            depth += 1
+    return root.group(0), start, end, bounds
+
+
+def paragraph_spans(xml: bytes, wanted) -> Dict[int, Tuple[int, int, int]]:
+    """
+    顶层段落 idx（和 snapshot 的 idx 一致）-> (开标签起点, 开标签终点, 闭标签起点)；只返回 wanted 里的。
+    自闭合的 <w:p/> 闭标签起点记为 -1。annotate 按这些偏移直接改字节，不建 DOM。
+    """
+    wanted = set(wanted)
+    root = _ROOT_RE.search(xml)
+    body = _BODY_RE.search(xml, root.end() if root else 0)
+    if root is None or body is None:
+        raise ValueError("document.xml: <w:document>/<w:body> not found")
+    out: Dict[int, Tuple[int, int, int]] = {}
+    depth = 0
+    n_para = 0
+    open_at = None
+    for m in _TAG_RE.finditer(xml, body.end(), xml.rfind(b"</w:body>")):
+        if m.group(1):
+            depth -= 1
+            if depth == 0 and open_at is not None:
+                out[n_para - 1] = (*open_at, m.start())
+                open_at = None
+                if len(out) == len(wanted):
+                    break
+            continue
+        gt = xml.index(b">", m.end())
+        top_p = depth == 0 and m.group(2) == b"p"
+        if top_p:
+            n_para += 1
+        if xml[gt - 1:gt] == b"/":
+            if top_p and n_para - 1 in wanted:
+                out[n_para - 1] = (m.start(), gt + 1, -1)
+        else:
+            if top_p and n_para - 1 in wanted:
+                open_at = (m.start(), gt + 1)
+            depth += 1
+    return out
+
+
+def split_chunks(start: int, end: int, bounds: List[Tuple[int, int]], n: int) -> List[Tuple[int, int, int]]:
+    """按字节均分成 n 块，只在顶层元素边界处切 -> [(起点, 终点, 块前的顶层段落数)]"""
+    target = max((end - start) / max(n, 1), 1)
+    chunks = []
+    cur, first = start, 0
+    for pos, n_para in bounds:
+        if len(chunks) >= n - 1:
+            break
+        if pos - cur >= target:
+            chunks.append((cur, pos, first))
+            cur, first = pos, n_para
+    chunks.append((cur, end, first))
+    return chunks
+
+
+# ---------- worker ----------
+_RESOLVERS: Dict[str, StyleResolver] = {}
+
+
+def _resolver(styles_xml: Optional[bytes], theme_xml: Optional[bytes]) -> StyleResolver:
+    key = hashlib.sha1((styles_xml or b"") + b"\0" + (theme_xml or b"")).hexdigest()
+    res = _RESOLVERS.get(key)
+    if res is None:
+        if len(_RESOLVERS) > 8:
+            _RESOLVERS.clear()
+        styles_el = parse_xml(styles_xml) if styles_xml else None
+        res = _RESOLVERS[key] = StyleResolver(styles_el, theme_fonts(theme_xml))
+    return res
+
+
+def _parse_chunk(root_open: bytes, chunk: bytes, first_idx: int,
+                 styles_xml: Optional[bytes], theme_xml: Optional[bytes]) -> Tuple[List[dict], List[dict], List[tuple]]:
+    from .docx_extractor import paragraph_drawings, paragraph_record
+
+    resolver = _resolver(styles_xml, theme_xml)
+    formats = FormatTable()
+    body = parse_xml(root_open + b"<w:body>" + chunk + b"</w:body></w:document>")[0]
+    out, drawings = [], []
+    for i, p_el in enumerate(body.iterchildren(qn("w:p")), start=first_idx):
+        rec = paragraph_record(p_el, i, resolver, formats)
+        if rec is not None:
+            out.append(rec)
+        drawings += paragraph_drawings(p_el, i)
+    return out, formats.rows, drawings
+
+
+# ---------- 进程池（每个进程一个，跨 job 复用，spawn 成本只付一次） ----------
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_SIZE = 0
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_SIZE
+    if _POOL is None or _POOL_SIZE != workers:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        # spawn：调用方（Celery worker）可能有别的线程在跑，fork 不安全
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        _POOL_SIZE = workers
+    return _POOL
+
+
+def extract_parallel(xml: bytes, styles_xml: Optional[bytes], theme_xml: Optional[bytes],
+                     workers: int) -> Optional[Tuple[List[dict], List[dict], List[tuple], object]]:
+    """
+    document.xml 的字节 -> (paragraphs, formats, drawings, 第一节的 sectPr 元素)，和顺序解析的结果一致；
+    文档太小或当前进程不能再起子进程（如 Celery prefork 的 daemon worker）时返回 None，调用方走顺序解析。
+    """
+    if len(xml) < PARALLEL_MIN_BYTES:
+        return None
+
+    root_open, start, end, bounds = scan_body(xml)
+    n = max(1, min(workers * CHUNKS_PER_WORKER, (end - start) // MIN_CHUNK_BYTES))
+    chunks = split_chunks(start, end, bounds, n)
+
+    try:
+        pool = _pool(workers)
+        futures = [
+            pool.submit(_parse_chunk, root_open, xml[a:b], first, styles_xml, theme_xml)
+            for a, b, first in chunks
+        ]
+        results = [f.result() for f in futures]
+    except (AssertionError, OSError, RuntimeError) as exc:
+        # daemonic processes are not allowed to have children / BrokenProcessPool 等
+        logger.warning("parallel extraction unavailable, falling back to sequential: %s", exc)
+        return None
+
+    # 拼接：各块格式表 -> 全局格式表，段落里的 fmt_id 按映射改写
+    formats = FormatTable()
+    paragraphs: List[dict] = []
+    drawings: List[tuple] = []
+    for paras, rows, draws in results:
+        remap = [formats.intern(row) for row in rows]
+        for p in paras:
+            runs = p["runs"]
+            for k in range(2, len(runs), 3):
+                runs[k] = remap[runs[k]]
+        paragraphs.extend(paras)
+        drawings.extend(draws)
+
+    # 第一个节的页面设置（python-docx 的 sections[0]：段落里的 sectPr 或 body 末尾的 sectPr，取最先出现的）
+    sect = _SECT_RE.search(xml, start, end)
+    sect_el = parse_xml(root_open + sect.group(0) + b"</w:document>")[0] if sect else None
+    return paragraphs, formats.rows, drawings, sect_el
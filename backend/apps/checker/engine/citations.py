@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# =========================
+# 引用 <-> 参考文献 交叉索引（6.9 citation_numeric_brackets）
+# 一次扫描正文：[N] / [N, M] / [N–K] / [N; M] / [N, с. 15] -> 倒排索引 source -> 段落 idx
+# 参考文献列表按段落解析编号（显式编号优先，Word 自动编号丢失时按顺序号）
+# 全程线性，几百条文献的论文也是毫秒级
+# =========================
+
+_BRACKET_RE = re.compile(r"\[([^\[\]]{1,120})\]")
+_NUM_RE = re.compile(r"^(\d{1,4})(?:\s*[-–—]\s*(\d{1,4}))?$")
+_BIB_NUM_RE = re.compile(r"^\s*\[?(\d{1,4})\s*[\.\)\]]\s*")
+
+MAX_RANGE = 50  # [1–1000] 这类大概率不是引用，只展开合理长度的区间
+
+
+def parse_citation(body: str) -> List[int]:
+    """
+    方括号内容 -> 源编号列表；第一个片段不是数字则不算引用（[а], [x, y]）。
+    页码等非数字片段（с. 15 / p. 3）忽略。
+    """
+    nums: List[int] = []
+    parts = re.split(r"[,;]", body)
+    for i, part in enumerate(parts):
+        m = _NUM_RE.match(part.strip())
+        if not m:
+            if i == 0:
+                return []
+            continue
+        a = int(m.group(1))
+        b = int(m.group(2)) if m.group(2) else None
+        if b is None:
+            nums.append(a)
+        elif a <= b and b - a <= MAX_RANGE:
+            nums.extend(range(a, b + 1))
+        else:
+            nums.append(a)
+    return nums
+
+
+def parse_bibliography(paragraphs: List[dict], span: Tuple[int, int]) -> List[dict]:
+    entries: List[dict] = []
+    for k, pos in enumerate(range(span[0], span[1]), start=1):
+        p = paragraphs[pos]
+        text = (p.get("text") or "").strip()
+        if not text:
+            continue
+        m = _BIB_NUM_RE.match(text)
+        entries.append({
+            "num": int(m.group(1)) if m else k,
+            "pos": pos,
+            "idx": p.get("idx"),
+            "text": text[m.end():] if m else text,
+        })
+    return entries
+
+
+def build_citation_index(paragraphs: List[dict], bib_span: Optional[Tuple[int, int]]) -> dict:
+    """
+    返回：
+    - cited: {source_no: [para_idx, ...]}（倒排索引，按出现顺序）
+    - first_order: [source_no, ...]（按首次引用顺序去重）
+    - bibliography: [{"num", "pos", "idx", "text"}, ...]（没有参考文献章节时为 None）
+    """
+    cited: Dict[int, List[int]] = {}
+    first_order: List[int] = []
+    skip = range(bib_span[0] - 1, bib_span[1]) if bib_span else range(0)  # 参考文献章节（含标题）不算正文引用
+
+    for pos, p in enumerate(paragraphs):
+        if pos in skip:
+            continue
+        text = p.get("text") or ""
+        if "[" not in text:
+            continue
+        for m in _BRACKET_RE.finditer(text):
+            for num in parse_citation(m.group(1)):
+                lst = cited.get(num)
+                if lst is None:
+                    cited[num] = [p.get("idx")]
+                    first_order.append(num)
+                elif lst[-1] != p.get("idx"):
+                    lst.append(p.get("idx"))
+
+    return {
+        "cited": cited,
+        "first_order": first_order,
+        "bibliography": parse_bibliography(paragraphs, bib_span) if bib_span else None,
+    }
@@ -13,6 +13,12 @@ except Exception as e:
         f"Original error: {e}"
     )
 
+try:
+    from .conditions import parse_condition
+except ImportError:  # 直接当脚本跑（python compile_dsl.py ...）：把 backend 目录加进 sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    from apps.checker.engine.conditions import parse_condition
+
 # check.type -> runtime op code 映射（后端只认 op）
 TYPE_TO_OP = {
 
@@ -67,6 +73,40 @@ TYPE_TO_OP = {
 
 SEVERITY_ENUM = {"BLOCKER", "MAJOR", "MINOR", "INFO"}
 
+# 默认 schema：和 DSL 放在同一个 standards 目录
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "standards" / "dsl_schema.yaml"
+
+# =========================
+# 执行计划：op -> (层级, 估计代价, 依赖的共享索引)
+# - document：查 ctx 里的索引/章节区间即可；paragraph：逐段扫描（同层 op 合并成一遍）
+# - 代价是相对值，只用于排序；共享索引（hard_rules._cached 惰性构建）第一次用到时另算构建代价
+# =========================
+OP_PLAN = {
+    "CHECK_STRUCTURE_PRESENCE": ("document", 1, ("hits", "facts")),
+    "CHECK_REQUIRED_FIELDS": ("document", 1, ("hits",)),
+    "CHECK_ABSTRACT_COMPONENTS": ("document", 1, ("hits",)),
+    "CHECK_KEYWORD_COUNT": ("document", 1, ()),
+    "CHECK_MARGINS": ("document", 1, ()),
+    "CHECK_PAGE_NUMBER_HIDDEN": ("document", 1, ()),
+    "CHECK_REQUIRED_IF": ("document", 1, ("facts",)),
+    # 只放宽 4.1 的要求（编译期挂到 structure_presence 规则上），自身不出结论
+    "CHECK_CONDITIONAL_OPTIONAL": ("document", 0, ()),
+    "CHECK_ALLOWED_ABSENCE": ("document", 0, ()),
+    "CHECK_SEMANTIC_REVIEW": ("document", 1, ()),
+    "CHECK_TOC_COMPLETENESS": ("document", 4, ()),
+    "CHECK_FIGURE_RULES": ("document", 2, ("captions", "chapter_nums")),
+    "CHECK_TABLE_RULES": ("document", 2, ("captions", "chapter_nums")),
+    "CHECK_FORMULA_RULES": ("document", 2, ("captions", "chapter_nums")),
+    "CHECK_CITATION_NUMERIC_BRACKETS": ("document", 2, ("citations",)),
+    "CHECK_PAGE_FORMAT": ("paragraph", 3, ()),
+    "CHECK_HEADING_FORMAT": ("paragraph", 1, ("hits",)),
+}
+DEFAULT_OP_PLAN = ("document", 0, ())  # 未实现的 op：只出 REVIEW 占位
+
+INDEX_COST = {"hits": 8, "captions": 6, "chapter_nums": 2, "citations": 6, "facts": 1}
+
+PLAN_LEVELS = ("document", "paragraph")
+
 def _die(msg: str):
     raise ValueError(msg)
 
@@ -79,6 +119,121 @@ def _as_list(v, ctx: str):
         _die(f"Expected list at {ctx}, got {type(v).__name__}")
     return v
 
+def load_schema(path: Path) -> dict:
+    """dsl_schema.yaml -> {check.type: {"required": [...], "types": {...}}}（check 级公共字段并入 types）"""
+    schema = load_yaml(path).get("check_schema") or {}
+    common = {k: v for k, v in (schema.get("types") or {}).items() if k != "type"}
+    out = {}
+    for ctype, spec in (schema.get("supported_check_types") or {}).items():
+        params = (spec or {}).get("params") or {}
+        out[ctype] = {
+            "required": list(params.get("required") or []),
+            "types": {**common, **(params.get("types") or {})},
+        }
+    return out
+
+_TRUE = {"true", "yes", "on", "1"}
+_FALSE = {"false", "no", "off", "0"}
+
+def _coerce(value, typ: str, ctx: str):
+    """按 schema 类型把 YAML 值规整好；runtime 直接用，不再逐 job 解析。"""
+    if typ.startswith("list[") and typ.endswith("]"):
+        inner = typ[5:-1]
+        return [_coerce(v, inner, f"{ctx}[{i}]") for i, v in enumerate(_as_list(value, ctx))]
+    if typ == "number":
+        if isinstance(value, bool):
+            _die(f"{ctx}: expected number, got boolean")
+        if isinstance(value, (int, float)):
+            return value
+        if isinstance(value, str):
+            raw = value.strip().replace(",", ".")
+            try:
+                return int(raw)
+            except ValueError:
+                pass
+            try:
+                return float(raw)
+            except ValueError:
+                pass
+        _die(f"{ctx}: expected number, got {value!r}")
+    if typ == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+            return value.strip().lower() in _TRUE
+        _die(f"{ctx}: expected boolean, got {value!r}")
+    if typ == "string":
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            _die(f"{ctx}: expected string, got {type(value).__name__}")
+        return str(value)
+    return value  # enum 等：原样保留
+
+def coerce_args(args: dict, ctype: str, schema: dict, ctx: str) -> dict:
+    """校验必填参数并做类型转换；schema 里没有的 check.type / 参数原样保留。"""
+    spec = schema.get(ctype)
+    if spec is None:
+        return args
+    for k in spec["required"]:
+        _require(args, k, ctx)
+    types = spec["types"]
+    return {k: (_coerce(v, types[k], f"{ctx}.{k}") if k in types and v is not None else v) for k, v in args.items()}
+
+def build_plan(rules: list) -> dict:
+    """
+    执行计划：同 op 的规则合成一步；按层级（document / paragraph）分开。
+    一步怎么跑看 hard_rules：段落级 op 并进同一遍段落遍历，文档级 op 有 DOCUMENT_HANDLERS 的整组一次分析，
+    没有的只是排在一起、逐条执行（共用 ctx 里的索引）；
+    层内贪心排序：每次取“自身代价 + 尚未构建的共享索引代价”最小的一步，
+    用同一索引的步骤挨在一起，便宜的先跑。rules 里存的是规则下标（结果按声明顺序回排）。
+    """
+    steps = {}
+    for pos, r in enumerate(rules):
+        op = r["op"]
+        level, cost, needs = OP_PLAN.get(op, DEFAULT_OP_PLAN)
+        step = steps.get(op)
+        if step is None:
+            step = steps[op] = {"op": op, "level": level, "cost": 0, "needs": list(needs), "rules": [], "first": pos}
+        step["rules"].append(pos)
+        step["cost"] += cost
+
+    plan = {}
+    built = set()  # document 层先跑，它建好的索引 paragraph 层直接复用
+    for level in PLAN_LEVELS:
+        pending = [st for st in steps.values() if st["level"] == level]
+        ordered = []
+        while pending:
+            def marginal(st):
+                return st["cost"] + sum(INDEX_COST.get(n, 1) for n in st["needs"] if n not in built), st["first"]
+            best = min(pending, key=marginal)
+            pending.remove(best)
+            built.update(best["needs"])
+            ordered.append({k: best[k] for k in ("op", "rules", "needs", "cost")})
+        plan[level] = ordered
+    return plan
+
+EXEMPTION_OPS = ("CHECK_CONDITIONAL_OPTIONAL", "CHECK_ALLOWED_ABSENCE")
+
+def link_exemptions(rules: list):
+    """
+    conditional_optional / allowed_absence（如 5.4.3 “не более 10 страниц — содержание можно не приводить”）
+    -> structure_presence 规则的 exemptions：{元素: [{"rule": id, "condition": AST 或 None（无条件）}]}。
+    运行期缺这个元素时先看条件，成立就不报。
+    """
+    exemptions = {}
+    for r in rules:
+        element = r["args"].get("element") if r["op"] in EXEMPTION_OPS else None
+        if element:
+            exemptions.setdefault(str(element).strip().upper(), []).append(
+                {"rule": r["id"], "condition": r.get("condition")}
+            )
+    if not exemptions:
+        return
+    for r in rules:
+        if r["op"] == "CHECK_STRUCTURE_PRESENCE":
+            r["exemptions"] = exemptions
+
 def load_yaml(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
@@ -107,7 +262,7 @@ def validate_top(dsl: dict):
         _die("rules is empty.")
     return std, rules
 
-def normalize_rule(rule: dict, i: int) -> dict:
+def normalize_rule(rule: dict, i: int, schema: dict | None = None) -> dict:
     ctx = f"rules[{i}]"
     if not isinstance(rule, dict):
         _die(f"{ctx} must be a mapping.")
@@ -133,6 +288,8 @@ def normalize_rule(rule: dict, i: int) -> dict:
 
     # 把除 'type' 外的字段都视为 args（包含 required_elements 等）
     args = {k: check[k] for k in check.keys() if k != "type"}
+    if schema:
+        args = coerce_args(args, ctype, schema, f"{ctx}.check")
 
     runtime_rule = {
         "id": rid,
@@ -143,6 +300,13 @@ def normalize_rule(rule: dict, i: int) -> dict:
         "args": args,  # 稳定结构：后端只认 op + args
     }
 
+    # condition 在编译期解析成安全 AST（conditions.parse_condition），runtime 直接编成闭包
+    if args.get("condition") is not None:
+        try:
+            runtime_rule["condition"] = parse_condition(args["condition"])
+        except ValueError as e:
+            _die(f"{ctx}.check.condition: {e}")
+
     # 可选字段保留（用于追溯/展示）
     for opt in ["clause", "tags", "basis", "description"]:
         if opt in rule:
@@ -150,13 +314,14 @@ def normalize_rule(rule: dict, i: int) -> dict:
 
     return runtime_rule
 
-def compile_dsl(dsl_path: Path, out_path: Path):
+def compile_dsl(dsl_path: Path, out_path: Path, schema_path: Path | None = None):
     dsl = load_yaml(dsl_path)
     std, rules = validate_top(dsl)
+    schema = load_schema(Path(schema_path or SCHEMA_PATH))
 
     runtime = {
         "runtime_format": "GOST_RUNTIME_RULESET",
-        "runtime_version": "1.0",
+        "runtime_version": "1.1",
 
         "compiled_at": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
 
@@ -180,7 +345,7 @@ def compile_dsl(dsl_path: Path, out_path: Path):
             unsupported.append((i, ctype))
             continue
         
-        rr = normalize_rule(r, i)
+        rr = normalize_rule(r, i, schema)
         rid = rr["id"]
         if rid in seen_ids:
             _die(f"Duplicate rule id: {rid}")
@@ -196,6 +361,11 @@ def compile_dsl(dsl_path: Path, out_path: Path):
         lines = [f"rules[{i}].check.type = {t}" for i, t in unsupported]
         _die("Unsupported check.type found:\n" + "\n".join(lines))
 
+    link_exemptions(runtime["rules"])
+
+    # runtime 只按 plan 执行（见 hard_rules.run_plan）
+    runtime["plan"] = build_plan(runtime["rules"])
+
     out_path.parent.mkdir(parents=True, exist_ok=True)
     out_path.write_text(json.dumps(runtime, ensure_ascii=False, indent=2), encoding="utf-8")
 
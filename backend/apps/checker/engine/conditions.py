@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import ast
+import json
+import math
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from .captions import build_caption_index
+from .sections import resolve_scope
+
+# =========================
+# 规则条件：required_if / conditional_optional / allowed_absence 的 condition（如 "author_count > 1"）
+# - 编译期（compile_dsl）：字符串 -> 安全 AST，只允许 比较 / and / or / not / 常量 / 文档事实名，
+#   存进 runtime.json（JSON 嵌套列表）；未知事实名、函数调用、属性访问等直接编译失败
+# - 运行期：AST -> 闭包，按 AST 缓存，进程内每个条件只编一次
+# - 文档事实（DocumentFacts）：第一次用到时计算并缓存，同一 job 的所有规则共用
+# =========================
+
+# ---------- 文档事实 ----------
+FACTS: Dict[str, Callable[[dict, dict], Any]] = {}
+
+
+def fact(name: str):
+    def register(fn):
+        FACTS[name] = fn
+        return fn
+    return register
+
+
+class DocumentFacts:
+    """一个 job 的文档事实；值为 None 表示无法判断（条件里和 None 的比较一律为假）。"""
+    def __init__(self, snapshot: dict, ctx: dict):
+        self.snapshot, self.ctx = snapshot, ctx
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._values:
+            self._values[name] = FACTS[name](self.snapshot, self.ctx)
+        return self._values[name]
+
+    def computed(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+
+def _paragraphs(snapshot: dict) -> List[dict]:
+    return snapshot.get("paragraphs") or []
+
+
+def _span_paragraphs(snapshot: dict, ctx: dict, scope: str) -> Optional[List[dict]]:
+    span = resolve_scope(ctx["sections"], scope)
+    return None if span is None else _paragraphs(snapshot)[span[0]:span[1]]
+
+
+def _captions(snapshot: dict, ctx: dict) -> dict:
+    # 和 hard_rules 的图表规则共用 ctx["captions"]
+    cap = ctx.get("captions")
+    if cap is None:
+        cap = ctx["captions"] = build_caption_index(_paragraphs(snapshot))
+    return cap
+
+
+# И.И. Иванов / Иванов И.И. / Иванов И.
+_NAME_RE = re.compile(
+    r"(?:[А-ЯЁ]\.\s?(?:[А-ЯЁ]\.\s?)?([А-ЯЁ][а-яё]+(?:-[А-ЯЁ][а-яё]+)?))"
+    r"|(?:([А-ЯЁ][а-яё]+(?:-[А-ЯЁ][а-яё]+)?)\s+[А-ЯЁ]\.\s?(?:[А-ЯЁ]\.)?)"
+)
+_EXECUTOR_RE = re.compile(r"исполнител", re.I)
+_OTHER_ROLE_RE = re.compile(r"утверждаю|согласовано|ректор|директор|руководител|заведующ|нормоконтрол", re.I)
+
+
+def _names(text: str) -> set:
+    return {m.group(1) or m.group(2) for m in _NAME_RE.finditer(text or "")}
+
+
+@fact("author_count")
+def _author_count(snapshot: dict, ctx: dict) -> Optional[int]:
+    """
+    исполнители（按姓去重）：有 СПИСОК ИСПОЛНИТЕЛЕЙ 时数其中的姓名；
+    否则只数титульный лист上“Исполнитель / Ответственный исполнитель”那几行的签名（职务和签名分两段时取下一段）——
+    УТВЕРЖДАЮ / Ректор、Руководитель НИР 的签名不算。没有执行人行就无法判断（None）。
+    """
+    paras = _span_paragraphs(snapshot, ctx, "section:СПИСОК ИСПОЛНИТЕЛЕЙ")
+    if paras is not None:
+        names = set()
+        for p in paras:
+            names |= _names(p.get("text"))
+        return len(names)
+
+    paras = _span_paragraphs(snapshot, ctx, "title_page") or []
+    names = set()
+    for i, p in enumerate(paras):
+        if not _EXECUTOR_RE.search(p.get("text") or ""):
+            continue
+        found = _names(p.get("text"))
+        nxt = (paras[i + 1].get("text") or "") if i + 1 < len(paras) else ""
+        if not found and not _OTHER_ROLE_RE.search(nxt):
+            found = _names(nxt)
+        names |= found
+    return len(names) or None
+
+
+CHARS_PER_PAGE = 1800  # 14 pt、1.5 倍行距的一页正文（约 7 段 × 250 字符）
+_VOLUME_RE = re.compile(r"\bОтч[её]т\s+(\d+)\s*с\.", re.I)
+
+
+@fact("page_count")
+def _page_count(snapshot: dict, ctx: dict) -> Optional[int]:
+    """реферат里的“Отчет N с.”；没有就按字符数估算（docx 里没有真实页数）。"""
+    for p in _span_paragraphs(snapshot, ctx, "section:РЕФЕРАТ") or []:
+        m = _VOLUME_RE.search(p.get("text") or "")
+        if m:
+            return int(m.group(1))
+    chars = sum(p.get("char_len") or 0 for p in _paragraphs(snapshot))
+    return max(1, math.ceil(chars / CHARS_PER_PAGE)) if chars else None
+
+
+@fact("has_appendices")
+def _has_appendices(snapshot: dict, ctx: dict) -> bool:
+    return bool(ctx["sections"]["appendices"])
+
+
+@fact("appendix_count")
+def _appendix_count(snapshot: dict, ctx: dict) -> int:
+    return len(ctx["sections"]["appendices"])
+
+
+@fact("chapter_count")
+def _chapter_count(snapshot: dict, ctx: dict) -> int:
+    return len(ctx["sections"]["chapters"])
+
+
+@fact("figure_count")
+def _figure_count(snapshot: dict, ctx: dict) -> int:
+    return len(_captions(snapshot, ctx)["figure"]["captions"])
+
+
+@fact("table_count")
+def _table_count(snapshot: dict, ctx: dict) -> int:
+    return len(_captions(snapshot, ctx)["table"]["captions"])
+
+
+@fact("formula_count")
+def _formula_count(snapshot: dict, ctx: dict) -> int:
+    return len(_captions(snapshot, ctx)["formula"]["captions"])
+
+
+@fact("image_count")
+def _image_count(snapshot: dict, ctx: dict) -> int:
+    return len(snapshot.get("images") or [])
+
+
+# ---------- 编译期：字符串 -> 安全 AST ----------
+# AST（JSON）：["fact", name] / ["const", value] / ["cmp", op, a, b] / ["and", a, b, ...] / ["or", ...] / ["not", a]
+_CMP_OPS = {
+    ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+    ast.In: "in", ast.NotIn: "not in",
+}
+
+
+def parse_condition(expr: str) -> list:
+    """条件字符串 -> AST；语法不支持或事实名未知时抛 ValueError。"""
+    try:
+        tree = ast.parse(str(expr).strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"invalid condition {expr!r}: {exc.msg}") from None
+    return _convert(tree.body, expr)
+
+
+def _convert(node, expr: str) -> list:
+    if isinstance(node, ast.BoolOp):
+        return ["and" if isinstance(node.op, ast.And) else "or", *(_convert(v, expr) for v in node.values)]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ["not", _convert(node.operand, expr)]
+    if isinstance(node, ast.Compare):
+        # a < b <= c -> (a < b) and (b <= c)
+        parts, left = [], _convert(node.left, expr)
+        for op, comp in zip(node.ops, node.comparators):
+            if type(op) not in _CMP_OPS:
+                raise ValueError(f"invalid condition {expr!r}: unsupported operator")
+            right = _convert(comp, expr)
+            parts.append(["cmp", _CMP_OPS[type(op)], left, right])
+            left = right
+        return parts[0] if len(parts) == 1 else ["and", *parts]
+    if isinstance(node, ast.Name):
+        if node.id in ("true", "false", "True", "False"):
+            return ["const", node.id.lower() == "true"]
+        if node.id not in FACTS:
+            raise ValueError(f"invalid condition {expr!r}: unknown fact '{node.id}' (known: {', '.join(sorted(FACTS))})")
+        return ["fact", node.id]
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+        return ["const", node.value]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant) \
+            and isinstance(node.operand.value, (int, float)) and not isinstance(node.operand.value, bool):
+        return ["const", -node.operand.value]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_convert(e, expr) for e in node.elts]
+        if any(i[0] != "const" for i in items):
+            raise ValueError(f"invalid condition {expr!r}: list items must be literals")
+        return ["const", [i[1] for i in items]]
+    raise ValueError(f"invalid condition {expr!r}: unsupported syntax ({type(node).__name__})")
+
+
+def condition_facts(tree: list) -> List[str]:
+    """AST 里用到的事实名（报告里展示实际值用）"""
+    if tree[0] == "fact":
+        return [tree[1]]
+    if tree[0] == "const":
+        return []
+    out: List[str] = []
+    for sub in tree[1:] if tree[0] != "cmp" else tree[2:]:
+        for name in condition_facts(sub):
+            if name not in out:
+                out.append(name)
+    return out
+
+
+# ---------- 运行期：AST -> 闭包 ----------
+Condition = Callable[[DocumentFacts], bool]
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "in": lambda a, b: a in b, "not in": lambda a, b: a not in b,
+}
+
+_COMPILED: Dict[str, Condition] = {}
+
+
+def compile_condition(tree: list) -> Condition:
+    key = json.dumps(tree, ensure_ascii=False)
+    fn = _COMPILED.get(key)
+    if fn is None:
+        fn = _COMPILED[key] = _closure(tree)
+    return fn
+
+
+def _value(tree: list) -> Callable[[DocumentFacts], Any]:
+    if tree[0] == "fact":
+        name = tree[1]
+        return lambda facts: facts[name]
+    if tree[0] == "const":
+        val = tree[1]
+        return lambda facts: val
+    return _closure(tree)
+
+
+def _closure(tree: list) -> Condition:
+    kind = tree[0]
+    if kind == "cmp":
+        op, left, right = _OPS[tree[1]], _value(tree[2]), _value(tree[3])
+
+        def cmp(facts):
+            a, b = left(facts), right(facts)
+            if a is None or b is None:
+                return False
+            try:
+                return bool(op(a, b))
+            except TypeError:
+                return False
+        return cmp
+    if kind == "and":
+        parts = [_closure_or_truth(t) for t in tree[1:]]
+        return lambda facts: all(p(facts) for p in parts)
+    if kind == "or":
+        parts = [_closure_or_truth(t) for t in tree[1:]]
+        return lambda facts: any(p(facts) for p in parts)
+    if kind == "not":
+        inner = _closure_or_truth(tree[1])
+        return lambda facts: not inner(facts)
+    return _closure_or_truth(tree)
+
+
+def _closure_or_truth(tree: list) -> Condition:
+    """事实 / 常量单独出现时按真值判断（如 "has_appendices"）"""
+    if tree[0] in ("fact", "const"):
+        get = _value(tree)
+        return lambda facts: bool(get(facts))
+    return _closure(tree)
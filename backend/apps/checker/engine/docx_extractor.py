@@ -3,7 +3,11 @@ import re
 import hashlib
 from typing import Optional, Dict, Any, List
 
-from docx import Document
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+
+from .package import DocxPackage
+from .styles import FormatTable, StyleResolver, encode_runs, alignment as _alignment, line_spacing as _line_spacing, theme_fonts, _on
 
 # ---------- helpers ----------
 def _norm_text(s: str) -> str:
@@ -45,72 +49,218 @@ def _heading_level(style_name: Optional[str]) -> Optional[int]:
     except Exception:
         return None
 
-def extract_docx_snapshot(docx_path: str) -> dict:
+def _margins(sect_pr) -> Dict[str, Any]:
+    def mm(v):
+        return round(v.mm, 2) if v is not None else None
+
+    if sect_pr is None:
+        return {}
+    return {
+        "left_mm": mm(sect_pr.left_margin),
+        "right_mm": mm(sect_pr.right_margin),
+        "top_mm": mm(sect_pr.top_margin),
+        "bottom_mm": mm(sect_pr.bottom_margin),
+        "page_width_mm": mm(sect_pr.page_width),
+        "page_height_mm": mm(sect_pr.page_height),
+    }
+
+
+def paragraph_record(p_el, idx: int, resolver: StyleResolver, formats: FormatTable) -> Optional[dict]:
     """
-    MVP 提取：段落文本、段落样式（字体大小、是否居中、是否全大写）、节的页边距、行距。
-    注意：docx 没有真实页码，这里用“段落索引/章节锚点”代替；页码用 '?'。
+    body 顶层 <w:p>（python-docx 的 CT_P）-> snapshot 段落；空段落返回 None（idx 照样占位）。
+    顺序解析和并行分块解析（chunked）共用这一个函数，两种模式结果一致。
     """
-    doc = Document(docx_path)
-
-    # section format (取第一个 section)
-    sec = doc.sections[0]
-    margins_mm = {
-        "left_mm": round(sec.left_margin.mm, 2),
-        "right_mm": round(sec.right_margin.mm, 2),
-        "top_mm": round(sec.top_margin.mm, 2),
-        "bottom_mm": round(sec.bottom_margin.mm, 2),
-        "page_width_mm": round(sec.page_width.mm, 2),
-        "page_height_mm": round(sec.page_height.mm, 2),
+    # 与 python-docx Paragraph.text 相同：直接子 run + 超链接里的 run
+    run_els = p_el.xpath("./w:r | ./w:hyperlink/w:r")
+    run_texts = [r.text for r in run_els]
+    raw = "".join(run_texts)
+    text = raw.strip()
+    if not text:
+        return None
+    style_id, ppr, base_rpr = resolver.paragraph(p_el.pPr)
+    style_name = resolver.name(style_id)
+
+    # 每个 run 的有效格式（样式 -> based_on -> docDefaults + run 覆盖）进全局格式表，段落里只留游程
+    run_fmts = []
+    first_rpr = None
+    for r, rt in zip(run_els, run_texts):
+        if not rt:
+            continue
+        rpr = resolver.run(base_rpr, r.rPr)
+        if first_rpr is None and rt.strip():
+            first_rpr = rpr
+        run_fmts.append((rt, formats.intern(rpr)))
+    runs = encode_runs(run_fmts, len(raw) - len(raw.lstrip()))
+
+    # 段落级字体沿用“首个有文字的 run”
+    rpr = first_rpr if first_rpr is not None else resolver.font(base_rpr)
+    font_name = rpr.get("font_name")
+    font_size = rpr.get("size_pt")
+
+    line_spacing, line_spacing_pt = _line_spacing(ppr)
+    first_line = ppr.get("first_line_twips")
+    alignment = _alignment(ppr)
+    alignment_code = int(alignment) if alignment is not None else None
+    alignment_text = str(alignment) if alignment is not None else "None"
+
+    return {
+        "idx": idx,
+        "text": text,
+        "text_u": text.upper(),
+        "text_hash": _text_hash(text),
+        "snippet": text[:120],
+        "char_len": len(text),
+        "style": style_name,
+        "is_heading_style": _is_heading_style(style_name),
+        "heading_level": _heading_level(style_name),
+        "font_name": font_name,
+        "font_size_pt": font_size,
+        "is_upper": text.isupper(),
+        "line_spacing": line_spacing,
+        "line_spacing_pt": line_spacing_pt,
+        "first_line_indent_cm": round(first_line * 2.54 / 1440, 2) if first_line is not None else None,
+        "page_break_before": bool(ppr.get("page_break_before")),
+        "alignment": alignment,
+        "alignment_text": alignment_text,
+        "alignment_code": alignment_code,
+        "runs": runs,
     }
 
-    paragraphs = []
-    for i, p in enumerate(doc.paragraphs):
-        text = (p.text or "").strip()
-        if not text:
+
+def paragraph_drawings(p_el, idx: int) -> List[tuple]:
+    """段落里的嵌入图片 -> [(段落 idx, r:embed, 显示宽 EMU, 显示高 EMU)]（图片段落通常没有文字，单独收集）"""
+    out = []
+    for d in p_el.iter(qn("w:drawing")):
+        blip = next(d.iter(qn("a:blip")), None)
+        if blip is None:
             continue
-        style_name = p.style.name if p.style is not None else None
-
-        # 取 run 的首个非空字体信息
-        font_name = None
-        font_size = None
-        for r in p.runs:
-            if r.text and r.font:
-                if r.font.name:
-                    font_name = r.font.name
-                if r.font.size:
-                    font_size = float(r.font.size.pt)
-                if font_name or font_size:
-                    break
-
-        line_spacing = None
-        if p.paragraph_format and p.paragraph_format.line_spacing:
-            try:
-                line_spacing = float(p.paragraph_format.line_spacing)
-            except Exception:
-                line_spacing = None
-        alignment = p.alignment
-        alignment_code = int(alignment) if alignment is not None else None
-        alignment_text = str(alignment) if alignment is not None else "None"
-
-        paragraphs.append({
-            "idx": i,
-            "text": text,
-            "text_u": text.upper(),
-            "text_hash": _text_hash(text),
-            "snippet": text[:120],
-            "char_len": len(text),
-            "style": style_name,
-            "is_heading_style": _is_heading_style(style_name),
-            "heading_level": _heading_level(style_name),
-            "font_name": font_name,
-            "font_size_pt": font_size,
-            "is_upper": text.isupper(),
-            "line_spacing": line_spacing,
-            "alignment": alignment,
-            "alignment_text": alignment_text,
-            "alignment_code": alignment_code,
+        ext = next(d.iter(qn("wp:extent")), None)
+        cx = int(ext.get("cx") or 0) if ext is not None else 0
+        cy = int(ext.get("cy") or 0) if ext is not None else 0
+        out.append((idx, blip.get(qn("r:embed")), cx, cy))
+    return out
+
+
+_PAGE_FIELD_RE = re.compile(r"\bPAGE\b")
+
+
+def _page_fields(pkg: DocxPackage, part: Optional[str], resolver: StyleResolver, kind: str) -> List[dict]:
+    """页眉/页脚部件里带 PAGE 域的段落 -> [{"part": "header"|"footer", "jc": 对齐}]"""
+    xml = pkg.read(part)
+    if not xml:
+        return []
+    out = []
+    for p in parse_xml(xml).iter(qn("w:p")):
+        instr = "".join(t.text or "" for t in p.iter(qn("w:instrText")))
+        instr += " ".join(f.get(qn("w:instr")) or "" for f in p.iter(qn("w:fldSimple")))
+        if _PAGE_FIELD_RE.search(instr):
+            _, ppr, _ = resolver.paragraph(p.pPr)
+            out.append({"part": kind, "jc": ppr.get("jc") or "left"})
+    return out
+
+
+def _page_numbers(pkg: DocxPackage, main: str, sect_el, resolver: StyleResolver) -> Dict[str, Any]:
+    """
+    第一节的页码设置：首页不同（titlePg）、页码格式（pgNumType），
+    以及首页 / 其余页（奇偶页不同时还有偶数页）实际显示的页眉页脚里的 PAGE 域。
+    """
+    if sect_el is None:
+        return {}
+    refs: Dict[str, List[tuple]] = {}
+    for kind in ("header", "footer"):
+        for ref in sect_el.iterchildren(qn(f"w:{kind}Reference")):
+            part = pkg.target(ref.get(qn("r:id")), main)
+            refs.setdefault(ref.get(qn("w:type")) or "default", []).append((kind, part))
+
+    title_pg = sect_el.find(qn("w:titlePg"))
+    title_pg = title_pg is not None and _on(title_pg)
+    settings = pkg.read(pkg.related("settings", main))
+    even = settings is not None and any(_on(e) for e in parse_xml(settings).iter(qn("w:evenAndOddHeaders")))
+    fmt = sect_el.find(qn("w:pgNumType"))
+
+    def fields(htype: str) -> List[dict]:
+        return [f for kind, part in refs.get(htype, []) for f in _page_fields(pkg, part, resolver, kind)]
+
+    out = {
+        "title_pg": title_pg,
+        "fmt": (fmt.get(qn("w:fmt")) if fmt is not None else None) or "decimal",
+        # titlePg 时首页只用 first 类型的页眉页脚（第一节没有就是空白）
+        "first": fields("first") if title_pg else fields("default"),
+        "default": fields("default"),
+    }
+    if even:
+        out["even"] = fields("even")
+    return out
+
+
+def _images(pkg: DocxPackage, main: str, drawings: List[tuple]) -> List[dict]:
+    """嵌入图片 -> snapshot["images"]：元数据只读图片文件头（同一部件只读一次）"""
+    out = []
+    for idx, rid, cx, cy in drawings:
+        part = pkg.target(rid, main)
+        if part is None:
+            continue  # 外链图片
+        out.append({
+            "idx": idx,
+            "part": part,
+            **pkg.image_info(part),
+            "width_cm": round(cx / 360000, 2) if cx else None,
+            "height_cm": round(cy / 360000, 2) if cy else None,
         })
-        # anchor_map：将“结构标题”映射到段落 idx（多策略：优先 heading style，再兜底靠文本全匹配）
+    return out
+
+
+def extract_docx_snapshot(docx_path, workers: int = 1) -> dict:
+    """
+    MVP 提取：段落文本、段落样式（字体大小、是否居中、是否全大写）、节的页边距、行距、
+    嵌入图片元数据、页眉页脚里的页码。
+    注意：docx 没有真实页码，这里用“段落索引/章节锚点”代替；页码用 '?'。
+    只读 document.xml / styles.xml / theme / settings.xml / 页眉页脚，word/media 里的图片只读文件头。
+    workers > 1 且 document.xml 足够大时走分块并行解析（chunked.extract_parallel）。
+    docx_path 也可以是 .docx 的 bytes 或二进制文件对象（见 DocxPackage）。
+    """
+    with DocxPackage(docx_path) as pkg:
+        main = pkg.main_part
+        xml = pkg.read(main)
+        if xml is None:
+            raise ValueError(f"{main}: main document part not found")
+        styles_xml = pkg.read(pkg.related("styles", main))
+        theme_xml = pkg.read(pkg.related("theme", main))
+
+        # 有效格式：样式链按 id 解析一次并缓存，段落/run 只合并直接格式
+        resolver = StyleResolver(parse_xml(styles_xml) if styles_xml else None, theme_fonts(theme_xml))
+
+        parsed = None
+        if workers > 1:
+            from .chunked import extract_parallel
+
+            parsed = extract_parallel(xml, styles_xml, theme_xml, workers)
+
+        if parsed is not None:
+            paragraphs, formats, drawings, sect_el = parsed
+        else:
+            root = parse_xml(xml)
+            del xml
+            table = FormatTable()
+            paragraphs, drawings = [], []
+            for i, p_el in enumerate(root.body.iterchildren(qn("w:p"))):
+                rec = paragraph_record(p_el, i, resolver, table)
+                if rec is not None:
+                    paragraphs.append(rec)
+                drawings += paragraph_drawings(p_el, i)
+            formats = table.rows
+            # section format (取第一个 section，同 python-docx 的 sections[0])
+            sect_lst = root.sectPr_lst
+            sect_el = sect_lst[0] if sect_lst else None
+
+        snap = _build_snapshot(_margins(sect_el), paragraphs, formats)
+        snap["images"] = _images(pkg, main, drawings)
+        snap["page_numbers"] = _page_numbers(pkg, main, sect_el, resolver)
+    return snap
+
+
+def _build_snapshot(margins_mm: Dict[str, Any], paragraphs: List[dict], formats: List[dict]) -> dict:
+    # anchor_map：将“结构标题”映射到段落 idx（多策略：优先 heading style，再兜底靠文本全匹配）
     anchor_map: Dict[str, int] = {}
     for p in paragraphs:
         key = _norm_heading_key(p["text"])
@@ -133,5 +283,6 @@ def extract_docx_snapshot(docx_path: str) -> dict:
         "version": "snapshot_v1",
         "margins": margins_mm,
         "paragraphs": paragraphs,
+        "formats": formats,  # run 格式表：p["runs"] 里的 fmt_id 指向这里
         "anchor_map": anchor_map,  # { "ВВЕДЕНИЕ": 50, ... }
     }
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import csv
+import html
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple
+
+# =========================
+# 结果导出器注册表（docx 之外的快速格式）
+# 每个导出器都是生成器：逐条消费 findings、逐块 yield 字符串，不在内存里拼完整输出，
+# 可以直接喂给 StreamingHttpResponse / 写文件。
+# =========================
+
+
+class Exporter(NamedTuple):
+    name: str
+    content_type: str
+    extension: str
+    render: Callable[[Iterable[Dict[str, Any]], Dict[str, Any]], Iterator[str]]
+
+
+EXPORTERS: Dict[str, Exporter] = {}
+
+
+def register_exporter(name: str, content_type: str, extension: str):
+    def deco(fn):
+        EXPORTERS[name] = Exporter(name, content_type, extension, fn)
+        return fn
+    return deco
+
+
+def get_exporter(name: str) -> Exporter | None:
+    return EXPORTERS.get((name or "").lower())
+
+
+def _location(fin: Dict[str, Any]) -> str:
+    anchor = (fin.get("anchor") or "").strip()
+    para_idx = fin.get("para_idx")
+    if anchor or para_idx is not None:
+        return f"{anchor} #{para_idx if para_idx is not None else '?'}".strip()
+    return str(fin.get("page", "?"))
+
+
+FIELDS = ("rule_id", "clause", "severity", "category", "message", "suggestion", "anchor", "para_idx", "snippet")
+
+
+# ---------- JSON ----------
+@register_exporter("json", "application/json", "json")
+def export_json(findings: Iterable[Dict[str, Any]], meta: Dict[str, Any]) -> Iterator[str]:
+    head = json.dumps(meta, ensure_ascii=False)
+    # meta 对象去掉结尾 '}'，把 findings 数组接在同一个对象里
+    yield head[:-1] + (', ' if meta else '') + '"findings": ['
+    first = True
+    for fin in findings:
+        item = {k: fin.get(k) for k in FIELDS}
+        yield ("" if first else ", ") + json.dumps(item, ensure_ascii=False)
+        first = False
+    yield "]}\n"
+
+
+# ---------- CSV ----------
+class _Line:
+    """csv.writer 的写入目标：只暂存当前一行。"""
+    def __init__(self):
+        self.buf = ""
+
+    def write(self, s: str):
+        self.buf += s
+
+    def pop(self) -> str:
+        s, self.buf = self.buf, ""
+        return s
+
+
+@register_exporter("csv", "text/csv; charset=utf-8", "csv")
+def export_csv(findings: Iterable[Dict[str, Any]], meta: Dict[str, Any]) -> Iterator[str]:
+    line = _Line()
+    w = csv.writer(line)
+    # BOM：Excel 直接打开时按 UTF-8 识别西里尔字母
+    w.writerow(FIELDS)
+    yield "\ufeff" + line.pop()
+    for fin in findings:
+        w.writerow(["" if fin.get(k) is None else fin.get(k) for k in FIELDS])
+        yield line.pop()
+
+
+# ---------- SARIF（2.1.0 子集，CI 友好） ----------
+SARIF_LEVEL = {"HIGH": "error", "MEDIUM": "warning", "LOW": "note", "NEED_REVIEW": "note"}
+
+
+@register_exporter("sarif", "application/sarif+json", "sarif")
+def export_sarif(findings: Iterable[Dict[str, Any]], meta: Dict[str, Any]) -> Iterator[str]:
+    artifact = meta.get("source") or f"job-{meta.get('job_id', '')}.docx"
+    yield (
+        '{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", "version": "2.1.0", '
+        '"runs": [{"results": ['
+    )
+    rules: Dict[str, Dict[str, Any]] = {}  # rule_id -> reportingDescriptor（流式结束后再输出）
+    first = True
+    for fin in findings:
+        rid = str(fin.get("rule_id") or fin.get("category") or "ENGINE")
+        if rid not in rules:
+            rules[rid] = {
+                "id": rid,
+                "properties": {"clause": fin.get("clause"), "category": fin.get("category")},
+            }
+        result = {
+            "ruleId": rid,
+            "level": SARIF_LEVEL.get(str(fin.get("severity")), "note"),
+            "message": {"text": str(fin.get("message", ""))},
+            "locations": [{
+                "physicalLocation": {"artifactLocation": {"uri": artifact}},
+                "logicalLocations": [{"name": _location(fin), "kind": "paragraph"}],
+            }],
+            "properties": {
+                "severity": fin.get("severity"),
+                "suggestion": fin.get("suggestion"),
+                "para_idx": fin.get("para_idx"),
+            },
+        }
+        if fin.get("clause"):
+            result["properties"]["clause"] = fin.get("clause")
+        yield ("" if first else ", ") + json.dumps(result, ensure_ascii=False)
+        first = False
+
+    tool = {
+        "driver": {
+            "name": "gost-auto-checker",
+            "rules": list(rules.values()),
+        }
+    }
+    yield "], " + '"tool": ' + json.dumps(tool, ensure_ascii=False) + "}]}\n"
+
+
+# ---------- HTML（单文件报告，内联样式） ----------
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="ru"><head><meta charset="utf-8">
+<title>{title}</title>
+<style>
+body{{font-family:Arial,Helvetica,sans-serif;margin:24px;color:#222}}
+table{{border-collapse:collapse;width:100%}}
+th,td{{border:1px solid #ccc;padding:6px 8px;vertical-align:top;text-align:left}}
+th{{background:#f2f2f2}}
+.HIGH{{color:#b00020;font-weight:bold}}.MEDIUM{{color:#c77700}}.LOW{{color:#2e7d32}}.NEED_REVIEW{{color:#555}}
+</style></head><body>
+<h1>{title}</h1>
+<p>Job ID: {job_id}<br>Дата: {date}</p>
+<table><thead><tr><th>#</th><th>Уровень</th><th>Правило</th><th>Ошибка</th><th>Рекомендация</th><th>Позиция</th></tr></thead><tbody>
+"""
+
+
+@register_exporter("html", "text/html; charset=utf-8", "html")
+def export_html(findings: Iterable[Dict[str, Any]], meta: Dict[str, Any]) -> Iterator[str]:
+    esc = html.escape
+    yield _HTML_HEAD.format(
+        title=esc("Результаты проверки отчёта по ГОСТ 7.32-2017"),
+        job_id=esc(str(meta.get("job_id", ""))),
+        date=esc(meta.get("generated_at") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+    n = 0
+    for n, fin in enumerate(findings, start=1):
+        sev = str(fin.get("severity", "NEED_REVIEW"))
+        rule = " ".join(x for x in (
+            f"[{fin['rule_id']}]" if fin.get("rule_id") else "",
+            f"§{fin['clause']}" if fin.get("clause") else "",
+            str(fin.get("category") or ""),
+        ) if x)
+        yield (
+            f'<tr><td>{n}</td><td class="{esc(sev)}">{esc(sev)}</td><td>{esc(rule)}</td>'
+            f'<td>{esc(str(fin.get("message", "")))}</td><td>{esc(str(fin.get("suggestion", "")))}</td>'
+            f'<td>{esc(_location(fin))}</td></tr>\n'
+        )
+    yield f"</tbody></table>\n<p>Всего замечаний: {n}</p>\n</body></html>\n"
@@ -1,7 +1,19 @@
 from __future__ import annotations
+import logging
+from bisect import bisect_left
 from typing import Any, Dict, List
-from .locator import attach_location
+from .locator import attach_location, build_idx_map
 from .docx_extractor import _norm_heading_key
+from .sections import build_section_index, resolve_scope, resolve_scopes
+from .patterns import FIELD_MARKERS, norm_pattern, ruleset_automaton, scan_paragraphs
+from .citations import build_citation_index
+from .toc import parse_toc, reconcile_toc
+from .captions import build_caption_index, chapter_numbers, check_numbering
+from .conditions import DocumentFacts, compile_condition, condition_facts, parse_condition
+from . import profiling
+from .visitor import ParagraphHandler, walk
+
+logger = logging.getLogger(__name__)
 def _map_severity(gost_sev: str) -> str:
     mapping = {"BLOCKER": "HIGH", "MAJOR": "MEDIUM", "MINOR": "LOW", "INFO": "NEED_REVIEW"}
     return mapping.get((gost_sev or "").upper(), "NEED_REVIEW")
@@ -106,33 +118,470 @@ def run_hard_rules(runtime: dict, snapshot: dict) -> list[dict]:
         findings.append(attach_location(snapshot, issue, anchor="DOCUMENT", para_idx=None))
 
     return findings
-def push_issue(snapshot, issues, rule, issue, *, anchor=None, para_idx=None):
-    issue.setdefault("rule_id", rule.get("id"))
-    issue.setdefault("clause", rule.get("clause"))
-    issues.append(attach_location(snapshot, issue, anchor=anchor, para_idx=para_idx))
+def build_context(snapshot: dict, runtime: dict | None = None, *, automaton=None) -> dict:
+    """
+    每个 job 一份的执行上下文：章节索引 + 按规则集预解析好的 scope 区间 + 规则集的字面量自动机。
+    run_rule 共用它，避免每条规则各自扫全文。
+    automaton：调用方已经为这个规则集编好的自动机（Checker 常驻持有），省掉每个文档重新收集模式。
+    """
+    sections = build_section_index(snapshot)
+    return {
+        "sections": sections,
+        "scopes": resolve_scopes(sections, runtime) if runtime else {},
+        "automaton": automaton if automaton is not None else ruleset_automaton(runtime or {}),
+    }
+
+
+def _hits(snapshot: dict, ctx: dict):
+    """字面量命中表：第一次用到时对全文扫一遍，之后所有规则共用。"""
+    return _cached(ctx, "hits", lambda: scan_paragraphs(ctx["automaton"], snapshot.get("paragraphs") or []))
+
+
+def _facts(snapshot: dict, ctx: dict) -> DocumentFacts:
+    """文档事实（author_count、page_count ...）：按需计算，同一 job 的规则共用。"""
+    return _cached(ctx, "facts", lambda: DocumentFacts(snapshot, ctx))
+
+
+def _condition(rule: dict):
+    """规则的条件闭包：优先用编译期解析好的 AST；旧版 runtime.json 只有字符串时现解析。"""
+    tree = rule.get("condition")
+    if tree is None:
+        expr = (rule.get("args") or {}).get("condition")
+        if expr is None:
+            return None, None
+        tree = parse_condition(expr)
+    return compile_condition(tree), tree
+
+
+def _scope_span(ctx: dict, scope: str):
+    """规则 scope 对应的段落区间 [start, end)；章节不存在返回 None。"""
+    scopes = ctx.get("scopes") or {}
+    return scopes[scope] if scope in scopes else resolve_scope(ctx["sections"], scope)
+
+
+def _scope_paragraphs(snapshot: dict, ctx: dict, scope: str) -> List[dict] | None:
+    """规则 scope 对应的段落切片；章节不存在返回 None。"""
+    span = _scope_span(ctx, scope)
+    if span is None:
+        return None
+    return (snapshot.get("paragraphs") or [])[span[0]:span[1]]
+
+
+SCOPE_TITLES = {"title_page": "ТИТУЛЬНЫЙ ЛИСТ", "appendices": "ПРИЛОЖЕНИЯ"}
+
+
+def _scope_title(scope: str) -> str:
+    if scope.startswith("section:"):
+        return scope.split(":", 1)[1]
+    return SCOPE_TITLES.get(scope, scope)
+
+
+def _exempt(snapshot: dict, ctx: dict, rule: dict, element: str) -> bool:
+    """缺少的结构元素是否被 conditional_optional / allowed_absence 放宽（条件为空即无条件放宽）"""
+    for ex in (rule.get("exemptions") or {}).get(element.upper(), []):
+        tree = ex.get("condition")
+        if tree is None or compile_condition(tree)(_facts(snapshot, ctx)):
+            return True
+    return False
+
+
+def _section_missing_issue(rule: dict) -> Dict[str, Any]:
+    title = _scope_title(rule.get("scope") or "")
+    return _issue(
+        rule,
+        message=f"Не найден раздел «{title}» — правило {rule.get('id')} не может быть проверено автоматически.",
+        suggestion=f"Добавьте раздел «{title}» с заголовком по ГОСТ 7.32-2017 или проверьте вручную.",
+        category="REVIEW",
+    )
+
+
+def _review_placeholder(rule: dict, reason: str) -> Dict[str, Any]:
+    return _issue(
+        rule,
+        message=f"Требование «{rule.get('title') or rule.get('id')}» требует смысловой проверки: {reason}.",
+        suggestion="Проверьте раздел вручную.",
+        category="REVIEW",
+    )
+
+
+def _cached(ctx: dict, key: str, build):
+    """ctx 里的惰性派生数据：第一次用到时构建，同一 job 的后续规则复用。"""
+    val = ctx.get(key)
+    if val is None:
+        val = ctx[key] = build()
+    return val
+
+
+def _locate(snapshot: dict, ctx: dict, issue: Dict[str, Any], *, anchor=None, para_idx=None) -> Dict[str, Any]:
+    idx_map = _cached(ctx, "idx_map", lambda: build_idx_map(snapshot))
+    return attach_location(snapshot, issue, anchor=anchor, para_idx=para_idx, idx_map=idx_map)
+
+
+MAX_LOCATED_ISSUES = 20  # 同一规则逐条定位的上限，超出部分合并成一条
+
+
+# 6.5 / 6.6 / 6.8：op -> (对象类型, 名称, 名称宾格, 必须有引用, 引用须在对象之前)
+CAPTION_OPS = {
+    "CHECK_FIGURE_RULES": ("figure", "рисунок", "рисунок", True, True),
+    "CHECK_TABLE_RULES": ("table", "таблица", "таблицу", True, True),
+    "CHECK_FORMULA_RULES": ("formula", "формула", "формулу", False, False),
+}
+
+
+def _low_resolution_issues(snapshot: dict, ctx: dict, rule: dict, min_dpi: float) -> List[Dict[str, Any]]:
+    """
+    6.5 插图清晰度：栅格图按显示尺寸折算的有效分辨率（像素 / 英寸）低于 min_dpi。
+    snapshot["images"] 的像素尺寸来自图片文件头（extractor 不解压像素）；矢量图（emf / wmf / svg）没有像素尺寸，不查。
+    """
+    low = []
+    for img in snapshot.get("images") or []:
+        px, cm = img.get("width_px"), img.get("width_cm")
+        if px and cm:
+            dpi = px / (cm / 2.54)
+            if dpi < min_dpi:
+                low.append((img, round(dpi)))
+
+    # 图片所在段落没有文字、不在 snapshot 里：定位到其后第一个有文字的段落（通常就是图题）
+    idxs = [p.get("idx") for p in snapshot.get("paragraphs") or []]
+    issues = []
+    for img, dpi in low[:MAX_LOCATED_ISSUES]:
+        k = bisect_left(idxs, img["idx"])
+        issues.append(_locate(snapshot, ctx, _issue(
+            rule,
+            message=f"Иллюстрация низкого разрешения: ~{dpi} dpi при выводе ({img['width_px']}×{img['height_px']} пикс. на {img['width_cm']} см).",
+            suggestion=f"Замените изображение на вариант с разрешением не менее {min_dpi:g} dpi в размере вывода или уменьшите его размер.",
+            category="REVIEW"
+        ), para_idx=idxs[k] if k < len(idxs) else None))
+    if len(low) > MAX_LOCATED_ISSUES:
+        issues.append(_issue(
+            rule,
+            message=f"Ещё {len(low) - MAX_LOCATED_ISSUES} иллюстраций низкого разрешения.",
+            suggestion="Проверьте качество всех растровых иллюстраций.",
+            category="REVIEW"
+        ))
+    return issues
+
+
+# =========================
+# 文档级整组执行：执行计划里同 op 的规则作为一组交进来，文档只分析一遍，再按规则分别出 issue
+# 函数签名：(snapshot, ctx, [(规则下标, rule), ...]) -> {规则下标: issues}
+# =========================
+def _caption_group(snapshot: dict, ctx: dict, rules: List[tuple]) -> Dict[int, List[dict]]:
+    """6.5 / 6.6 / 6.8：图、表、公式编号与引用（三个 op 共用一份题注索引；同 op 的规则共用一份分析结果）"""
+    kind, label, label_acc, ref_required, ref_before = CAPTION_OPS[rules[0][1].get("op")]
+    paragraphs = snapshot.get("paragraphs") or []
+    cap = _cached(ctx, "captions", lambda: build_caption_index(paragraphs))[kind]
+    captions, refs = cap["captions"], cap["refs"]
+
+    found: List[tuple] = []  # (message, suggestion, para_idx)
+    overflow = 0
+    if captions or refs:
+        sections = ctx["sections"]
+        appendices = sections["appendices"]
+        problems = check_numbering(
+            captions,
+            sections["chapters"],
+            _cached(ctx, "chapter_nums", lambda: chapter_numbers(paragraphs, sections["chapters"])),
+            appendices[0] if appendices else None,
+        )
+        for c, problem in problems[:MAX_LOCATED_ISSUES]:
+            found.append((
+                f"Нарушена нумерация ({label} {c['num']}): {problem}.",
+                "Нумеруйте арабскими цифрами сквозной нумерацией или в пределах раздела (1.1, 1.2); в приложениях — с буквой приложения (А.1).",
+                c["idx"],
+            ))
+
+        first_ref: Dict[str, tuple] = {}
+        for ref in refs:
+            first_ref.setdefault(ref[2], ref)
+        numbers = {c["num"] for c in captions}
+
+        dangling = [r for n, r in first_ref.items() if n not in numbers]
+        for pos, idx, num in dangling[:MAX_LOCATED_ISSUES]:
+            found.append((
+                f"В тексте есть ссылка на {label_acc} {num}, но объекта с таким номером нет.",
+                "Проверьте номер в ссылке или подпись объекта.",
+                idx,
+            ))
+
+        unreferenced = [c for c in captions if c["num"] not in first_ref] if ref_required else []
+        for c in unreferenced[:MAX_LOCATED_ISSUES]:
+            found.append((
+                f"На {label_acc} {c['num']} нет ссылки в тексте.",
+                "На все иллюстрации и таблицы должны быть ссылки в тексте отчета.",
+                c["idx"],
+            ))
+
+        late = [c for c in captions if c["num"] in first_ref and first_ref[c["num"]][0] > c["pos"]] if ref_before else []
+        for c in late[:MAX_LOCATED_ISSUES]:
+            found.append((
+                f"{label.capitalize()} {c['num']}: первая ссылка в тексте стоит после самого объекта.",
+                "Размещайте объект непосредственно после текста, в котором он упоминается впервые.",
+                c["idx"],
+            ))
+
+        overflow = sum(max(0, len(x) - MAX_LOCATED_ISSUES) for x in (problems, dangling, unreferenced, late))
+
+    out: Dict[int, List[dict]] = {}
+    for pos, rule in rules:
+        issues: List[dict] = []
+        min_dpi = (rule.get("args") or {}).get("min_dpi")
+        if kind == "figure" and min_dpi:
+            issues += _low_resolution_issues(snapshot, ctx, rule, min_dpi)
+        for message, suggestion, idx in found:
+            issues.append(_locate(snapshot, ctx, _issue(rule, message=message, suggestion=suggestion), para_idx=idx))
+        if overflow:
+            issues.append(_issue(
+                rule,
+                message=f"Ещё {overflow} замечаний того же типа ({label}).",
+                suggestion="Проверьте нумерацию и ссылки по всему документу."
+            ))
+        out[pos] = issues
+    return out
+
+
+def _semantic_review_group(snapshot: dict, ctx: dict, rules: List[tuple]) -> Dict[int, List[dict]]:
+    """CHECK_SEMANTIC_REVIEW：AI 关闭时只给人工复核提示；AI_DIRECT / HYBRID 由 semantic.review 出结论"""
+    found: Dict[str, bool] = {}  # scope -> 章节是否存在（同组规则常落在同一章节）
+    out: Dict[int, List[dict]] = {}
+    for pos, rule in rules:
+        scope = rule.get("scope") or "document"
+        if scope not in found:
+            found[scope] = _scope_span(ctx, scope) is not None
+        if found[scope]:
+            out[pos] = [_review_placeholder(rule, "AI-проверка не включена")]
+        else:
+            out[pos] = [_section_missing_issue(rule)]
+    return out
+
+
+# op -> 整组执行函数；没注册的 op 在 run_plan 里逐条 run_rule（共用 ctx 里的索引）
+DOCUMENT_HANDLERS = {
+    **{op: _caption_group for op in CAPTION_OPS},
+    "CHECK_SEMANTIC_REVIEW": _semantic_review_group,
+}
+
+
+# =========================
+# 段落级规则：visitor.ParagraphHandler，run_plan 把它们合并成一遍遍历（visitor.walk）
+# =========================
+class _Located:
+    """逐段问题：前 MAX_LOCATED_ISSUES 个定位到段落，其余只计数。"""
+    def __init__(self):
+        self.items: List[tuple] = []
+        self.total = 0
+
+    def add(self, p: dict, *extra):
+        self.total += 1
+        if len(self.items) < MAX_LOCATED_ISSUES:
+            self.items.append((p, *extra))
+
+    @property
+    def overflow(self) -> int:
+        return self.total - len(self.items)
+
+
+# font_color 参数里的颜色名 -> w:color 的十六进制值；"AUTO"（自动）按黑色算
+COLOR_NAMES = {"black": "000000"}
+
+
+def _span_text(p: dict, offset: int, length: int) -> str:
+    return _norm((p.get("text") or "")[offset:offset + length])
+
+
+class _PageFormatHandler(ParagraphHandler):
+    """6.1.1（字号、字体颜色按 run 查；行距按段落查）"""
+    def __init__(self, snapshot: dict, rule: dict, ctx: dict):
+        self.snapshot, self.rule, self.ctx = snapshot, rule, ctx
+        # 参数已在编译期按 dsl_schema 做过类型转换（compile_dsl.coerce_args）
+        args = rule.get("args") or {}
+        self.min_fs = args.get("min_font_size_pt")
+        self.line_spacing = args.get("line_spacing")
+        color = args.get("font_color")
+        self.color = COLOR_NAMES.get(color.lower(), color.upper()) if color else None
+
+        # 字符级检查先过一遍格式表：只有违规的 fmt_id 才需要在段落里展开定位
+        self.formats = snapshot.get("formats")
+        self.small_fmts: Dict[int, float] = {}
+        self.color_fmts: Dict[int, str] = {}
+        for fid, f in enumerate(self.formats or []):
+            size = f.get("size_pt")
+            if self.min_fs is not None and size is not None and size < self.min_fs:
+                self.small_fmts[fid] = size
+            c = f.get("color")
+            if self.color and c and c not in ("AUTO", self.color):
+                self.color_fmts[fid] = c
+
+        self.small = _Located()
+        # 颜色、行距通常来自样式：按 (样式, 值) 归组，一组一条，避免整篇文档逐段报
+        self.colors: Dict[tuple, list] = {}
+        self.spacing: Dict[tuple, list] = {}
+
+    def visit(self, pos: int, p: dict):
+        if self.formats is None:
+            # 旧版 snapshot 没有 run 格式表：退回段落级字号
+            fs = p.get("font_size_pt")
+            if fs is not None and self.min_fs is not None and fs < self.min_fs:
+                self.small.add(p, fs, _norm(p.get("text"))[:80])
+        elif self.small_fmts or self.color_fmts:
+            self._visit_runs(p)
+        # 行距检查（只能粗糙）
+        ls = p.get("line_spacing")
+        if ls is not None and self.line_spacing is not None and abs(ls - self.line_spacing) > 0.2:
+            group = self.spacing.get((p.get("style"), ls))
+            if group is None:
+                self.spacing[(p.get("style"), ls)] = [p, 1]
+            else:
+                group[1] += 1
+
+    def _visit_runs(self, p: dict):
+        runs = p.get("runs") or []
+        small_seen = False
+        colors_seen = set()
+        for k in range(2, len(runs), 3):
+            fid = runs[k]
+            size = self.small_fmts.get(fid)
+            if size is not None and not small_seen:
+                small_seen = True  # 每段只记一次（第一个违规片段）
+                self.small.add(p, size, _span_text(p, runs[k - 2], runs[k - 1])[:80])
+            color = self.color_fmts.get(fid)
+            if color is not None and color not in colors_seen:
+                colors_seen.add(color)
+                key = (p.get("style"), color)
+                group = self.colors.get(key)
+                if group is None:
+                    self.colors[key] = [p, 1, _span_text(p, runs[k - 2], runs[k - 1])[:80]]
+                else:
+                    group[1] += 1
+
+    def finish(self) -> List[dict]:
+        rule, issues = self.rule, []
+        for p, fs, fragment in self.small.items:
+            issues.append(_locate(self.snapshot, self.ctx, _issue(
+                rule,
+                message=f"Размер шрифта меньше нормы: {fs} pt (< {self.min_fs} pt). Фрагмент: «{fragment}».",
+                suggestion=f"Установите размер шрифта не менее {self.min_fs} pt (обычно 14 pt для основного текста)."
+            ), para_idx=p.get("idx")))
+        if self.small.overflow:
+            issues.append(_issue(
+                rule,
+                message=f"Ещё {self.small.overflow} абзацев со шрифтом меньше {self.min_fs} pt.",
+                suggestion=f"Установите размер шрифта не менее {self.min_fs} pt во всём документе."
+            ))
+        for (style, color), (p, n, fragment) in list(self.colors.items())[:MAX_LOCATED_ISSUES]:
+            where = f"стиль «{style}», абзацев: {n}" if style else f"абзацев: {n}"
+            issues.append(_locate(self.snapshot, self.ctx, _issue(
+                rule,
+                message=f"Цвет шрифта #{color} вместо чёрного ({where}). Первый фрагмент: «{fragment}».",
+                suggestion="Текст отчета печатается шрифтом чёрного цвета: установите цвет «Авто» или чёрный (удобнее всего — в стиле)."
+            ), para_idx=p.get("idx")))
+        for (style, ls), (p, n) in list(self.spacing.items())[:MAX_LOCATED_ISSUES]:
+            where = f"стиль «{style}», абзацев: {n}" if style else f"абзацев: {n}"
+            issues.append(_locate(self.snapshot, self.ctx, _issue(
+                rule,
+                message=f"Возможное несоответствие межстрочного интервала: {ls} (ожидается ~{self.line_spacing}; {where}). Первый фрагмент: «{_norm(p.get('text', ''))[:80]}».",
+                suggestion=f"Проверьте межстрочный интервал и выставьте около {self.line_spacing} (удобнее всего — в стиле абзаца).",
+                category="REVIEW"
+            ), para_idx=p.get("idx")))
+        return issues
+
+
+DEFAULT_HEADING_TITLES = (
+    "ТИТУЛЬНЫЙ ЛИСТ", "РЕФЕРАТ", "СОДЕРЖАНИЕ", "ВВЕДЕНИЕ",
+    "ОСНОВНАЯ ЧАСТЬ", "ЗАКЛЮЧЕНИЕ", "СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ", "ПРИЛОЖЕНИЯ",
+)
+
+
+class _HeadingFormatHandler(ParagraphHandler):
+    """6.2.1（MVP：只针对结构标题）"""
+    def __init__(self, snapshot: dict, rule: dict, ctx: dict):
+        self.snapshot, self.rule, self.ctx = snapshot, rule, ctx
+        args = rule.get("args") or {}
+        self.need_upper = bool(args.get("uppercase", False))
+        self.need_center = bool(args.get("centered", False))
+        self.need_no_dot = bool(args.get("no_trailing_period", False))
+        self.need_new_page = bool(args.get("start_new_page", False))  # MVP：docx 里没有分页信息，只给复核提示
+
+        titles = args.get("titles") or []
+        # 候选段落直接取命中表里“整段等于结构标题”的位置，不再逐段比对
+        hits = _hits(snapshot, ctx)
+        self.positions = {pos for title in (titles or DEFAULT_HEADING_TITLES) for pos in hits.exact(title)}
+        if not titles:
+            self.positions.update(ctx["sections"]["appendices"])  # «ПРИЛОЖЕНИЕ А» 等
+        self.bad = _Located()
+        self.headings: List[dict] = []
+
+    def visit(self, pos: int, p: dict):
+        t = _norm(p.get("text"))
+        self.headings.append(p)
+        parts = []
+        if self.need_upper and p.get("is_upper") is not True:
+            parts.append("ПРОПИСНЫЕ")
+        if self.need_center and "CENTER" not in str(p.get("alignment_text") or "").upper():
+            parts.append("по центру")
+        if self.need_no_dot and t.endswith("."):
+            parts.append("без точки в конце")
+        if parts:
+            self.bad.add(p, parts)
+
+    def finish(self) -> List[dict]:
+        rule, issues = self.rule, []
+        for p, parts in self.bad.items:
+            issues.append(_locate(self.snapshot, self.ctx, _issue(
+                rule,
+                message=f"Заголовок оформлен неверно: «{_norm(p.get('text'))[:80]}» (требуется: {', '.join(parts)}).",
+                suggestion="Исправьте формат заголовка согласно ГОСТ 7.32-2017."
+            ), para_idx=p.get("idx")))
+        if self.bad.overflow:
+            issues.append(_issue(
+                rule,
+                message=f"Ещё {self.bad.overflow} заголовков структурных элементов оформлены неверно.",
+                suggestion="Исправьте формат заголовков согласно ГОСТ 7.32-2017."
+            ))
+        if self.need_new_page and self.headings:
+            titles = ", ".join(f"«{_norm(p.get('text'))[:40]}»" for p in self.headings[:10])
+            issues.append(_locate(self.snapshot, self.ctx, _issue(
+                rule,
+                message=f"Проверьте, что структурные элементы начинаются с новой страницы: {titles}.",
+                suggestion="В Word: вставьте разрыв страницы перед заголовком структурного элемента.",
+                category="REVIEW"
+            ), para_idx=self.headings[0].get("idx")))
+        return issues
+
+
+# op -> handler 类；compile_dsl.OP_PLAN 里标成 paragraph 层的 op 在这里注册
+PARAGRAPH_HANDLERS = {
+    "CHECK_PAGE_FORMAT": _PageFormatHandler,
+    "CHECK_HEADING_FORMAT": _HeadingFormatHandler,
+}
 
 # =========================
 # 单条规则执行（给 Celery 逐条跑 + 进度条用）
 # =========================
-def run_rule(snapshot: dict, rule: dict) -> List[dict]:
+def run_rule(snapshot: dict, rule: dict, ctx: dict | None = None) -> List[dict]:
     op = rule.get("op")
     args = rule.get("args", {}) or {}
+    if ctx is None:
+        ctx = build_context(snapshot, {"rules": [rule]})
+
+    # 有整组执行函数的 op：单条规则就是只有一条的组
+    if op in DOCUMENT_HANDLERS:
+        return DOCUMENT_HANDLERS[op](snapshot, ctx, [(0, rule)])[0]
 
     paragraphs = snapshot.get("paragraphs") or []
     margins = snapshot.get("margins") or {}
-    all_texts = _texts(snapshot)
-    all_upper = {t.upper() for t in all_texts}
 
     issues: List[dict] = []
 
     # 4.1 CHECK_STRUCTURE_PRESENCE
     if op == "CHECK_STRUCTURE_PRESENCE":
+        hits = _hits(snapshot, ctx)
         required = args.get("required_elements", []) or []
         for title in required:
             t = _norm(title)
             if not t:
                 continue
-            if t.upper() not in all_upper:
+            if not hits.exact(t) and not _exempt(snapshot, ctx, rule, t):
                 issues.append(_issue(
                     rule,
                     message=f"Отсутствует обязательный структурный элемент: «{t}».",
@@ -140,76 +589,41 @@ def run_rule(snapshot: dict, rule: dict) -> List[dict]:
                 ))
         return issues
 
-    # 6.1.1 CHECK_PAGE_FORMAT（MVP：字号 + 行距）
-    if op == "CHECK_PAGE_FORMAT":
-        min_fs = args.get("min_font_size_pt")
-        line_spacing_req = args.get("line_spacing")
-
-        # 字号检查
-        if min_fs is not None:
-            try:
-                min_fs = float(min_fs)
-            except Exception:
-                min_fs = None
-
-        if min_fs is not None:
-            for p in paragraphs[:500]:
-                fs = p.get("font_size_pt")
-                if fs is None:
-                    continue
-                try:
-                    fs = float(fs)
-                except Exception:
-                    continue
-                if fs < min_fs:
-                    issues.append(_issue(
-                        rule,
-                        message=f"Размер шрифта меньше нормы: {fs} pt (< {min_fs} pt). Фрагмент: «{_norm(p.get('text',''))[:80]}».",
-                        suggestion=f"Установите размер шрифта не менее {min_fs} pt (обычно 14 pt для основного текста)."
-                    ))
-                    break
-
-        # 行距检查（只能粗糙）
-        if line_spacing_req is not None:
-            try:
-                line_spacing_req = float(line_spacing_req)
-            except Exception:
-                line_spacing_req = None
-
-        if line_spacing_req is not None:
-            for p in paragraphs[:500]:
-                ls = p.get("line_spacing")
-                if ls is None:
-                    continue
-                try:
-                    ls = float(ls)
-                except Exception:
-                    continue
-                if abs(ls - line_spacing_req) > 0.2:
-                    issues.append(_issue(
-                        rule,
-                        message=f"Возможное несоответствие межстрочного интервала: {ls} (ожидается ~{line_spacing_req}). Фрагмент: «{_norm(p.get('text',''))[:80]}».",
-                        suggestion=f"Проверьте межстрочный интервал и выставьте около {line_spacing_req}.",
-                        category="REVIEW"
-                    ))
-                    break
+    # 5.2.1 CHECK_REQUIRED_IF：条件成立时 scope 对应的章节必须存在
+    if op == "CHECK_REQUIRED_IF":
+        cond, tree = _condition(rule)
+        if cond is None:
+            issues.append(_review_placeholder(rule, "условие не задано"))
+            return issues
+        facts = _facts(snapshot, ctx)
+        scope = rule.get("scope") or "document"
+        if cond(facts) and _scope_span(ctx, scope) is None:
+            title = _scope_title(scope)
+            values = ", ".join(f"{name} = {facts[name]}" for name in condition_facts(tree))
+            issues.append(_issue(
+                rule,
+                message=f"Не найден раздел «{title}», обязательный при условии «{args.get('condition')}» ({values}).",
+                suggestion=f"Добавьте раздел «{title}» согласно ГОСТ 7.32-2017."
+            ))
+        return issues
 
+    # 5.2.2 / 5.4.3：只放宽 4.1（编译期挂到 structure_presence 的 exemptions 上），自身不出结论
+    if op in ("CHECK_CONDITIONAL_OPTIONAL", "CHECK_ALLOWED_ABSENCE"):
         return issues
 
+    # 6.1.1 / 6.2.1 段落级规则：单独跑时也走 handler（run_plan 里和其它段落规则合并成一遍）
+    if op in PARAGRAPH_HANDLERS:
+        handler = PARAGRAPH_HANDLERS[op](snapshot, rule, ctx)
+        walk(paragraphs, [handler])
+        return handler.finish()
+
     # 6.1.1.margins CHECK_MARGINS
     if op == "CHECK_MARGINS":
-        tol = float(args.get("tolerance_mm", 1.0))
+        tol = args.get("tolerance_mm", 1.0)
         for k in ("left_mm", "right_mm", "top_mm", "bottom_mm"):
             target = args.get(k)
-            if target is None:
-                continue
             real = margins.get(k)
-            if real is None:
-                continue
-            try:
-                target = float(target)
-                real = float(real)
-            except Exception:
+            if target is None or real is None:
                 continue
             if abs(real - target) > tol:
                 issues.append(_issue(
@@ -219,114 +633,65 @@ def run_rule(snapshot: dict, rule: dict) -> List[dict]:
                 ))
         return issues
 
-    # 6.2.1 CHECK_HEADING_FORMAT（MVP：只针对结构标题）
-    if op == "CHECK_HEADING_FORMAT":
-        need_upper = bool(args.get("uppercase", False))
-        need_center = bool(args.get("centered", False))
-        need_no_dot = bool(args.get("no_trailing_period", False))
-        need_new_page = bool(args.get("start_new_page", False))  # MVP: 可先做提示或弱校验
-
-        structural_titles = set(args.get("titles", []) or [])
-        if not structural_titles:
-            structural_titles = {
-                "ТИТУЛЬНЫЙ ЛИСТ","РЕФЕРАТ","СОДЕРЖАНИЕ","ВВЕДЕНИЕ",
-                "ОСНОВНАЯ ЧАСТЬ","ЗАКЛЮЧЕНИЕ","СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ","ПРИЛОЖЕНИЯ"
-            }
-
-        structural_upper = {s.upper() for s in structural_titles}
-
-        for p in snapshot.get("paragraphs", []):
-            t = (p.get("text") or "").strip()
-            if not t:
-                continue
-
-            t_u = p.get("text_u") or t.upper()
-            if t_u not in structural_upper:
-                continue
-
-            # ✅ 大小写校验按参数控制
-            ok_upper = (p.get("is_upper") is True) if need_upper else True
-
-            # ✅ 居中校验：先用 extractor 的 alignment 字符串兜底
-            # align_raw = p.get("alignment")
-            # if align_raw is None:
-                # align_raw = str(p.get("alignment") or "")
-            align_raw = p.get("alignment_text")
-            if align_raw is None:
-                align_raw = str(p.get("alignment_text") or "")
-            ok_center = (("CENTER" in str(align_raw).upper()) if need_center else True)
-            # ✅ 末尾句点校验
-            ok_no_dot = (not t.endswith(".")) if need_no_dot else True
-
-            # ✅ start_new_page：docx 很难精确验证“新页开始”
-            # MVP策略：给 NEED_REVIEW 提示，不阻断
-            start_new_page_issue = None
-            if need_new_page:
-                start_new_page_issue = {
-                    "severity": "NEED_REVIEW",
-                    "category": "HEADING",
-                    "message": f"Проверьте, что структурный элемент начинается с новой страницы: «{t}»",
-                    "suggestion": "В Word: вставьте разрыв страницы перед заголовком структурного элемента.",
-                }
-
-            if (not ok_upper) or (not ok_center) or (not ok_no_dot):
-                parts = []
-                if need_upper and not ok_upper:
-                    parts.append("ПРОПИСНЫЕ")
-                if need_center and not ok_center:
-                    parts.append("по центру")
-                if need_no_dot and not ok_no_dot:
-                    parts.append("без точки в конце")
-
-                issue = {
-                    "severity": "MAJOR",
-                    "category": "HEADING",
-                    "message": f"Заголовок оформлен неверно: «{t}» (требуется: {', '.join(parts)})",
-                    "suggestion": "Исправьте формат заголовка согласно ГОСТ 7.32-2017.",
-                    "rule_id": rule.get("id"),
-                    "clause": rule.get("clause"),
-                }
-                # issues.append(attach_location(snapshot, issue, anchor=t, para_idx=p.get("idx")))
-                push_issue(snapshot, issues, rule, {
-   "severity": "MAJOR",
-   "category": "...",
-   "message": "...",
-   "suggestion": "...",
-                }, anchor="ВВЕДЕНИЕ", para_idx=p.get("idx"))
-
-            if need_new_page:
-                issue2 = {
-                "severity": "NEED_REVIEW",
-                "category": "HEADING",
-                "message": f"Проверьте, что структурный элемент начинается с новой страницы: «{t}»",
-                "suggestion": "В Word: вставьте разрыв страницы перед заголовком структурного элемента.",
-                "rule_id": rule.get("id"),
-                "clause": rule.get("clause"),
-                }
-                push_issue(snapshot, issues, rule, {
-   "severity": "MAJOR",
-   "category": "...",
-   "message": "...",
-   "suggestion": "...",
-                }, anchor="ВВЕДЕНИЕ", para_idx=p.get("idx"))
-
-                # issues.append(attach_location(snapshot, issue2, anchor=t, para_idx=p.get("idx")))
-            break
+    # 6.3.2 CHECK_PAGE_NUMBER_HIDDEN：首页（титульный лист）实际显示的页眉页脚里不能有 PAGE 域
+    if op == "CHECK_PAGE_NUMBER_HIDDEN":
+        pn = snapshot.get("page_numbers")
+        if pn is None:
+            # 旧版 snapshot 没有页眉页脚信息
+            issues.append(_review_placeholder(rule, "нет данных о колонтитулах"))
+        elif pn.get("first"):
+            issue = _issue(
+                rule,
+                message="На титульном листе отображается номер страницы (поле PAGE в колонтитуле первой страницы).",
+                suggestion="Включите «Особый колонтитул для первой страницы» и оставьте колонтитул титульного листа без номера."
+            )
+            issues.append(_locate(snapshot, ctx, issue, para_idx=paragraphs[0].get("idx")) if paragraphs else issue)
         return issues
 
+    # 5.1.2 CHECK_REQUIRED_FIELDS（титульный лист：按字段标记查命中表）
+    if op == "CHECK_REQUIRED_FIELDS":
+        span = _scope_span(ctx, rule.get("scope") or "title_page")
+        if span is None:
+            issues.append(_section_missing_issue(rule))
+            return issues
+        hits = _hits(snapshot, ctx)
+        missing, manual = [], []
+        for field in args.get("fields", []) or []:
+            markers = FIELD_MARKERS.get(norm_pattern(field))
+            if markers is None:
+                manual.append(field)
+            elif all(hits.first_in(m, span) is None for m in markers):
+                missing.append(field)
+        if missing:
+            issues.append(_issue(
+                rule,
+                message=f"На титульном листе не найдены сведения: {', '.join(missing)}.",
+                suggestion="Дополните титульный лист согласно ГОСТ 7.32-2017, п. 5.1.2."
+            ))
+        if manual:
+            issues.append(_issue(
+                rule,
+                message=f"Проверьте вручную наличие на титульном листе: {', '.join(manual)}.",
+                suggestion="Эти сведения не распознаются автоматически.",
+                category="REVIEW"
+            ))
+        return issues
 
-    # 5.3.2 CHECK_ABSTRACT_COMPONENTS（MVP：粗糙关键词扫描）
+    # 5.3.2 CHECK_ABSTRACT_COMPONENTS（MVP：粗糙关键词扫描，只看 РЕФЕРАТ 章节）
     if op == "CHECK_ABSTRACT_COMPONENTS":
+        span = _scope_span(ctx, rule.get("scope") or "document")
+        if span is None:
+            issues.append(_section_missing_issue(rule))
+            return issues
+        hits = _hits(snapshot, ctx)
         required = args.get("required", []) or []
-        # MVP：只检查是否出现 ключевые слова / ключевые слова: / объем 等关键片段
-        joined = "\n".join(all_texts).lower()
+        # MVP：只检查是否出现 ключевые слова / ключевые слова: / объем 等关键片段（查命中表）
         missing = []
         for item in required:
-            it = _norm(item).lower()
-            if not it:
+            if not _norm(item):
                 continue
             # 很粗糙：按词片段查找
-            if it not in joined:
+            if hits.first_in(item, span) is None:
                 missing.append(item)
         if missing:
             issues.append(_issue(
@@ -336,15 +701,19 @@ def run_rule(snapshot: dict, rule: dict) -> List[dict]:
             ))
         return issues
 
-    # 5.3.2.1 CHECK_KEYWORD_COUNT（MVP：查“Ключевые слова:”后面按逗号拆）
+    # 5.3.2.1 CHECK_KEYWORD_COUNT（MVP：查“Ключевые слова:”后面按逗号拆，只看 РЕФЕРАТ 章节）
     if op == "CHECK_KEYWORD_COUNT":
+        scoped = _scope_paragraphs(snapshot, ctx, rule.get("scope") or "document")
+        if scoped is None:
+            issues.append(_section_missing_issue(rule))
+            return issues
         min_k = int(args.get("min", 5))
         max_k = int(args.get("max", 15))
-        joined = "\n".join(all_texts)
 
         # 尝试找 “Ключевые слова” 行
         line = None
-        for t in all_texts:
+        for p in scoped:
+            t = _norm(p.get("text", ""))
             if "ключев" in t.lower() and ":" in t:
                 line = t
                 break
@@ -369,6 +738,137 @@ def run_rule(snapshot: dict, rule: dict) -> List[dict]:
             ))
         return issues
 
+    # 5.4.1 CHECK_TOC_COMPLETENESS：СОДЕРЖАНИЕ <-> 正文标题 对账
+    if op == "CHECK_TOC_COMPLETENESS":
+        toc_span = _scope_span(ctx, rule.get("scope") or "section:СОДЕРЖАНИЕ")
+        if toc_span is None:
+            issues.append(_section_missing_issue(rule))
+            return issues
+        entries = parse_toc(paragraphs, toc_span)
+
+        # 正文标题：目录之后的标题样式段落（1–3 级）+ 结构标题/附录
+        sections = ctx["sections"]
+        boundary = set(sections["headings"].values()) | set(sections["appendices"])
+        headings = [
+            {"pos": pos, "idx": p.get("idx"), "text": p.get("text") or ""}
+            for pos, p in enumerate(paragraphs[toc_span[1]:], start=toc_span[1])
+            if pos in boundary or (p.get("is_heading_style") and (p.get("heading_level") or 1) <= 3)
+        ]
+        page_map = {int(k): v for k, v in (snapshot.get("page_map") or {}).items()}
+        rec = reconcile_toc(entries, headings, page_map or None)
+
+        for hi in rec["missing"][:MAX_LOCATED_ISSUES]:
+            h = headings[hi]
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Заголовок «{_norm(h['text'])[:80]}» отсутствует в содержании.",
+                suggestion="Обновите содержание: в него включаются все структурные элементы и заголовки разделов."
+            ), para_idx=h["idx"]))
+        if rec["extra"]:
+            titles = "; ".join(f"«{entries[ei]['title'][:60]}»" for ei in rec["extra"][:20])
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"В содержании есть пункты без соответствующего заголовка в тексте: {titles}.",
+                suggestion="Удалите лишние пункты или приведите заголовки в тексте в соответствие с содержанием."
+            ), para_idx=entries[rec["extra"][0]]["idx"]))
+        for ei in rec["fuzzy"][:MAX_LOCATED_ISSUES]:
+            e = entries[ei]
+            h = headings[rec["match"][ei]]
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Пункт содержания «{e['title'][:60]}» не совпадает с заголовком «{_norm(h['text'])[:60]}».",
+                suggestion="Наименования в содержании должны полностью совпадать с заголовками в тексте.",
+                category="REVIEW"
+            ), para_idx=e["idx"]))
+        if rec["misordered"]:
+            e = entries[rec["misordered"][0]]
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Порядок пунктов содержания не соответствует порядку заголовков в тексте (например, «{e['title'][:60]}»).",
+                suggestion="Перестройте содержание в порядке следования разделов."
+            ), para_idx=e["idx"]))
+        no_page = [e for e in entries if e["page"] is None]
+        if no_page:
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Для {len(no_page)} пунктов содержания не указан номер страницы (например, «{no_page[0]['title'][:60]}»).",
+                suggestion="Укажите номера страниц, с которых начинаются структурные элементы и разделы."
+            ), para_idx=no_page[0]["idx"]))
+        for ei, actual in rec["page_mismatch"][:MAX_LOCATED_ISSUES]:
+            e = entries[ei]
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Номер страницы в содержании для «{e['title'][:60]}»: {e['page']}, фактически {actual}.",
+                suggestion="Обновите поле содержания (F9 в Word)."
+            ), para_idx=e["idx"]))
+        return issues
+
+    # 6.9 CHECK_CITATION_NUMERIC_BRACKETS：正文 [N] <-> СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ
+    if op == "CHECK_CITATION_NUMERIC_BRACKETS":
+        bib_title = "СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ"
+        bib_span = _scope_span(ctx, f"section:{bib_title}")
+        cidx = _cached(ctx, "citations", lambda: build_citation_index(paragraphs, bib_span))
+        bib = cidx["bibliography"]
+        cited = cidx["cited"]
+
+        if bib is None:
+            if cited:
+                issues.append(_issue(
+                    rule,
+                    message=f"В тексте есть ссылки [N], но не найден раздел «{bib_title}».",
+                    suggestion=f"Добавьте раздел «{bib_title}» с пронумерованными источниками."
+                ))
+            return issues
+
+        if not cited:
+            if bib:
+                issues.append(_locate(snapshot, ctx, _issue(
+                    rule,
+                    message="В тексте не найдено ни одной ссылки на источники в квадратных скобках.",
+                    suggestion="Приводите ссылки в виде порядкового номера источника в квадратных скобках: [1], [2, 5]."
+                ), anchor=bib_title))
+            return issues
+
+        bib_nums = {e["num"] for e in bib}
+
+        # 1) 引用了不存在的源
+        unresolved = [n for n in cidx["first_order"] if n not in bib_nums]
+        for n in unresolved[:MAX_LOCATED_ISSUES]:
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"Ссылка [{n}] не соответствует ни одному источнику в списке (источников: {len(bib)}).",
+                suggestion="Проверьте номер ссылки или добавьте источник в список."
+            ), para_idx=cited[n][0]))
+        if len(unresolved) > MAX_LOCATED_ISSUES:
+            rest = unresolved[MAX_LOCATED_ISSUES:]
+            issues.append(_issue(
+                rule,
+                message=f"Ещё {len(rest)} ссылок без источника: {', '.join(map(str, rest[:50]))}.",
+                suggestion="Проверьте номера ссылок и список источников."
+            ))
+
+        # 2) 列表里从未被引用的源
+        orphans = [e for e in bib if e["num"] not in cited]
+        if orphans:
+            nums = ", ".join(str(e["num"]) for e in orphans[:50])
+            issues.append(_locate(snapshot, ctx, _issue(
+                rule,
+                message=f"На источники нет ссылок в тексте: {nums}{' …' if len(orphans) > 50 else ''}.",
+                suggestion="Сошлитесь на каждый источник в тексте или удалите лишние из списка."
+            ), para_idx=orphans[0]["idx"]))
+
+        # 3) 编号应按首次引用顺序：第 k 个首次出现的源编号应为 k
+        for k, n in enumerate((x for x in cidx["first_order"] if x in bib_nums), start=1):
+            if n != k:
+                issues.append(_locate(snapshot, ctx, _issue(
+                    rule,
+                    message=f"Нарушен порядок нумерации источников: [{n}] упоминается впервые раньше, чем [{k}].",
+                    suggestion="Нумеруйте источники в порядке первого упоминания в тексте.",
+                    category="REVIEW"
+                ), para_idx=cited[n][0]))
+                break
+        return issues
+
     # 其它规则：MVP 先提示需要人工/后续实现（保证“规则不空转”）
     issues.append(_issue(
         rule,
@@ -379,15 +879,144 @@ def run_rule(snapshot: dict, rule: dict) -> List[dict]:
     return issues
 
 
+# =========================
+# 按执行计划跑（compile_dsl.build_plan）：先 document 层再 paragraph 层；同 op 的规则一步跑完——
+# 段落级 op 合成一遍遍历（PARAGRAPH_HANDLERS），文档级 op 整组交给 DOCUMENT_HANDLERS，其余逐条跑；
+# 结果按规则声明顺序回排，和计划里的执行顺序无关
+# =========================
+PLAN_LEVELS = ("document", "paragraph")
+
+
+def plan_steps(runtime: dict) -> List[tuple]:
+    """
+    [(level, op, [(规则下标, rule), ...])]；旧版 runtime.json 没有 plan 时按声明顺序逐条跑。
+    plan 和 rules 对不上（手改了 rules 没重新编译）时同样退回声明顺序：否则越界下标会让整个 job 失败，
+    计划外的规则会被悄悄跳过。
+    """
+    rules = runtime.get("rules") or []
+    plan = runtime.get("plan")
+    if plan and not _plan_matches(plan, len(rules)):
+        logger.warning("runtime plan does not match its %d rules; running rules in declaration order", len(rules))
+        plan = None
+    if not plan:
+        return [("document", r.get("op"), [(pos, r)]) for pos, r in enumerate(rules)]
+    return [
+        (level, step["op"], [(pos, rules[pos]) for pos in step["rules"]])
+        for level in PLAN_LEVELS
+        for step in plan.get(level) or []
+    ]
+
+
+def _plan_matches(plan: dict, n_rules: int) -> bool:
+    """计划里的规则下标恰好是 0..n-1 各一次"""
+    seen: List[int] = [
+        pos
+        for level in PLAN_LEVELS
+        for step in plan.get(level) or []
+        for pos in step.get("rules") or []
+    ]
+    return len(seen) == n_rules and sorted(seen) == list(range(n_rules))
+
+
+def _rule_failed(rule: dict, exc: Exception) -> Dict[str, Any]:
+    # 单条规则失败：不影响全局（降级一条 issue）
+    return {
+        "page": "?",
+        "severity": "NEED_REVIEW",
+        "category": "ENGINE",
+        "rule_id": rule.get("id"),
+        "message": f"Rule {rule.get('id', '?')} failed: {exc}",
+        "suggestion": "Проверьте правило/реализацию или отметьте для ручной проверки.",
+    }
+
+
+def run_plan(snapshot: dict, runtime: dict, ctx: dict | None = None, *, skip_ops=(), on_rule=None) -> List[dict]:
+    """
+    skip_ops：交给别处执行的 op（如 AI 接管的 CHECK_SEMANTIC_REVIEW）；
+    on_rule(done, total)：每跑完一条规则回调一次（进度条用）。
+    """
+    if ctx is None:
+        ctx = build_context(snapshot, runtime)
+    steps = [s for s in plan_steps(runtime) if s[1] not in skip_ops]
+    total = sum(len(rules) for _, _, rules in steps)
+
+    per_rule: Dict[int, List[dict]] = {}
+    done = [0]
+
+    def record(pos: int, issues: List[dict]):
+        per_rule[pos] = issues
+        done[0] += 1
+        if on_rule is not None:
+            on_rule(done[0], total)
+
+    fused = []
+    for level, op, rules in steps:
+        if level == "paragraph" and op in PARAGRAPH_HANDLERS:
+            fused.extend((op, pos, rule) for pos, rule in rules)
+            continue
+        if op in DOCUMENT_HANDLERS:
+            _document_group(snapshot, ctx, op, rules, record)
+            continue
+        for pos, rule in rules:
+            record(pos, _run_one(snapshot, rule, ctx))
+    if fused:
+        _paragraph_pass(snapshot, ctx, fused, record)
+    return [issue for pos in sorted(per_rule) for issue in per_rule[pos]]
+
+
+def _run_one(snapshot: dict, rule: dict, ctx: dict) -> List[dict]:
+    try:
+        with profiling.op(rule.get("op"), rule_id=rule.get("id")):
+            return run_rule(snapshot, rule, ctx)
+    except Exception as exc:
+        return [_rule_failed(rule, exc)]
+
+
+def _document_group(snapshot: dict, ctx: dict, op: str, rules: List[tuple], record):
+    """同 op 的文档级规则一次交给 DOCUMENT_HANDLERS；整组出错就退回逐条执行，把错误落到具体规则上。"""
+    try:
+        with profiling.op(op, rule_id=",".join(str(rule.get("id")) for _, rule in rules)):
+            per_rule = DOCUMENT_HANDLERS[op](snapshot, ctx, rules)
+    except Exception:
+        for pos, rule in rules:
+            record(pos, _run_one(snapshot, rule, ctx))
+        return
+    for pos, _rule in rules:
+        record(pos, per_rule[pos])
+
+
+def _paragraph_pass(snapshot: dict, ctx: dict, fused: List[tuple], record):
+    """所有段落级规则共用一遍遍历；遍历中某个 handler 出错就退回逐条执行，把错误落到具体规则上。"""
+    handlers = []
+    for op, pos, rule in fused:
+        try:
+            with profiling.op(op, rule_id=rule.get("id")):
+                handlers.append((op, pos, rule, PARAGRAPH_HANDLERS[op](snapshot, rule, ctx)))
+        except Exception as exc:
+            record(pos, [_rule_failed(rule, exc)])
+
+    try:
+        with profiling.stage("paragraph_pass"):
+            walk(snapshot.get("paragraphs") or [], [h for *_, h in handlers])
+    except Exception:
+        for _op, pos, rule, _h in handlers:
+            record(pos, _run_one(snapshot, rule, ctx))
+        return
+
+    for op, pos, rule, h in handlers:
+        try:
+            with profiling.op(op, rule_id=rule.get("id")):
+                issues = h.finish()
+        except Exception as exc:
+            issues = [_rule_failed(rule, exc)]
+        record(pos, issues)
+
+
 # =========================
 # 批量执行（兜底/一次跑全 rules）
 # =========================
 def run_hard_rules(snapshot: dict, standard: dict) -> List[dict]:
-    rules = (standard or {}).get("rules", []) or []
-    findings: List[dict] = []
-
-    for rule in rules:
-        findings.extend(run_rule(snapshot, rule))
+    findings = run_plan(snapshot, standard or {})
 
     if not findings:
         findings.append({
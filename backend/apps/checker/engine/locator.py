@@ -3,6 +3,8 @@ from __future__ import annotations
 import re
 from typing import Optional, Dict, Any, List
 
+from . import profiling
+
 def _norm_text(s: str) -> str:
     s = (s or "").strip()
     s = re.sub(r"\s+", " ", s)
@@ -25,6 +27,10 @@ def build_para_index(snapshot: dict) -> dict:
             idx_by_upper.setdefault(p["text_u"], p["idx"])
     return {"idx_by_hash": idx_by_hash, "idx_by_upper": idx_by_upper}
 
+def build_idx_map(snapshot: dict) -> Dict[int, dict]:
+    paragraphs: List[dict] = snapshot.get("paragraphs") or []
+    return {p.get("idx"): p for p in paragraphs if p.get("idx") is not None}
+
 def locate_anchor(snapshot: dict, anchor: str) -> Optional[int]:
     amap = snapshot.get("anchor_map", {}) or {}
     key = _norm_heading_key(anchor)
@@ -36,7 +42,21 @@ def attach_location(
     issue: Dict[str, Any],
     *,
     anchor: Optional[str] = None,
-    para_idx: Optional[int] = None
+    para_idx: Optional[int] = None,
+    idx_map: Optional[Dict[int, dict]] = None
+    ) -> Dict[str, Any]:
+    # 定位耗时单独计入 "locate" 阶段（它发生在 run_rule 内部，是 rules 的一部分）
+    with profiling.stage("locate"):
+        return _attach_location(snapshot, issue, anchor=anchor, para_idx=para_idx, idx_map=idx_map)
+
+
+def _attach_location(
+    snapshot: dict,
+    issue: Dict[str, Any],
+    *,
+    anchor: Optional[str] = None,
+    para_idx: Optional[int] = None,
+    idx_map: Optional[Dict[int, dict]] = None
     ) -> Dict[str, Any]:
     """
     给 issue 打上定位字段（不覆盖已有有效字段）。
@@ -46,11 +66,12 @@ def attach_location(
     - snippet: "..."
     - text_hash: "ab12cd..."
     - page: "?"  (docx 无真实页码，先占位)
+    idx_map：调用方缓存的 idx->段落 映射（批量定位时避免每条 issue 重建）
     """
     out = dict(issue)  # ✅ 不原地污染
 
-    paragraphs: List[dict] = snapshot.get("paragraphs") or []
-    idx_map = {p.get("idx"): p for p in paragraphs if p.get("idx") is not None}
+    if idx_map is None:
+        idx_map = build_idx_map(snapshot)
 
     # 1) anchor：只在传入且 issue 没有时写入
     if anchor and not out.get("anchor"):
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import io
+import posixpath
+import struct
+import zipfile
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+# =========================
+# docx 包的按需访问：只用 zipfile 读需要的部件（沿 .rels 找 document / styles / theme / 页眉页脚），
+# 不像 python-docx 的 Document() 那样把整个包（包括 word/media 里的大图）都读进内存。
+# 图片只读文件头（尺寸 / DPI / 格式），像素数据不解压。
+# =========================
+
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _rels_name(part: str) -> str:
+    d, f = posixpath.split(part)
+    return posixpath.join(d, "_rels", f + ".rels")
+
+
+class DocxPackage:
+    def __init__(self, source):
+        """source：文件路径、已打开的二进制文件对象，或整个 .docx 的 bytes（内存里直接读，不落临时文件）。"""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        self.zf = zipfile.ZipFile(source)
+        self._names = set(self.zf.namelist())
+        self._rels: Dict[str, List[tuple]] = {}
+        self._targets: Dict[str, Dict[str, str]] = {}
+        self._images: Dict[str, Dict[str, Any]] = {}
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self) -> "DocxPackage":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, part: Optional[str]) -> Optional[bytes]:
+        if not part or part not in self._names:
+            return None
+        return self.zf.read(part)
+
+    def size(self, part: Optional[str]) -> int:
+        """解压后的大小（只看 zip 目录，不解压）。"""
+        if not part or part not in self._names:
+            return 0
+        return self.zf.getinfo(part).file_size
+
+    def rels(self, part: str = "") -> List[tuple]:
+        """[(reltype 短名, 目标部件名, rId)]；part="" 是包级关系（_rels/.rels）。"""
+        hit = self._rels.get(part)
+        if hit is not None:
+            return hit
+        raw = self.read(_rels_name(part) if part else "_rels/.rels")
+        out = []
+        if raw:
+            base = posixpath.dirname(part)
+            for rel in etree.fromstring(raw).iterfind(f"{{{REL_NS}}}Relationship"):
+                if rel.get("TargetMode") == "External":
+                    continue
+                rtype = (rel.get("Type") or "").rsplit("/", 1)[-1]
+                target = rel.get("Target") or ""
+                name = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+                out.append((rtype, name, rel.get("Id")))
+        self._rels[part] = out
+        return out
+
+    def related(self, rtype: str, part: str = "") -> Optional[str]:
+        for t, name, _ in self.rels(part):
+            if t == rtype:
+                return name
+        return None
+
+    def target(self, rid: Optional[str], part: str) -> Optional[str]:
+        """r:id（如 <a:blip r:embed="rId5">）-> 目标部件名"""
+        targets = self._targets.get(part)
+        if targets is None:
+            targets = self._targets[part] = {r: name for _, name, r in self.rels(part)}
+        return targets.get(rid)
+
+    def image_info(self, part: str) -> Dict[str, Any]:
+        """图片元数据（按部件缓存）：format / width_px / height_px / dpi；读不出的字段为 None。"""
+        hit = self._images.get(part)
+        if hit is None:
+            fmt = posixpath.splitext(part)[1].lstrip(".").lower()
+            fmt = {"jpg": "jpeg", "jpe": "jpeg", "tif": "tiff"}.get(fmt, fmt)
+            hit = {"format": fmt, "width_px": None, "height_px": None, "dpi": None}
+            reader = _HEADER_READERS.get(fmt)
+            if reader is not None and part in self._names:
+                try:
+                    with self.zf.open(part) as f:
+                        hit.update(reader(f))
+                except (struct.error, ValueError, EOFError, zipfile.BadZipFile):
+                    pass  # 头部损坏：只保留格式
+            self._images[part] = hit
+        return hit
+
+    @property
+    def main_part(self) -> str:
+        return self.related("officeDocument") or "word/document.xml"
+
+
+# ---------- 图片文件头 ----------
+# 只顺序读到尺寸/分辨率所在的头部；ZipExtFile 流式解压，后面的像素数据不会被读到。
+def _read(f, n: int) -> bytes:
+    b = f.read(n)
+    if len(b) < n:
+        raise EOFError
+    return b
+
+
+def _skip(f, n: int):
+    while n > 0:
+        n -= len(_read(f, min(n, 65536)))
+
+
+def _png(f) -> Dict[str, Any]:
+    if _read(f, 8) != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not a PNG")
+    out: Dict[str, Any] = {}
+    while True:
+        length, tag = struct.unpack(">I4s", _read(f, 8))
+        if tag == b"IHDR":
+            out["width_px"], out["height_px"] = struct.unpack(">II", _read(f, 8))
+            _skip(f, length - 8 + 4)
+        elif tag == b"pHYs":
+            x, y, unit = struct.unpack(">IIB", _read(f, 9))
+            if unit == 1 and x and y:  # 像素/米
+                out["dpi"] = [round(x * 0.0254), round(y * 0.0254)]
+            _skip(f, length - 9 + 4)
+        elif tag in (b"IDAT", b"IEND"):  # pHYs 必须在 IDAT 之前
+            return out
+        else:
+            _skip(f, length + 4)
+
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg(f) -> Dict[str, Any]:
+    if _read(f, 2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    out: Dict[str, Any] = {}
+    while True:
+        marker = _read(f, 2)
+        while marker[1] == 0xFF:  # 填充字节
+            marker = marker[1:] + _read(f, 1)
+        code = marker[1]
+        if code in (0xD9, 0xDA):  # EOI / SOS：后面是扫描数据
+            return out
+        length = struct.unpack(">H", _read(f, 2))[0]
+        if code == 0xE0 and length >= 16:
+            seg = _read(f, 14)
+            if seg[:5] == b"JFIF\0" and seg[7] in (1, 2):
+                x, y = struct.unpack(">HH", seg[8:12])
+                if x and y:
+                    out["dpi"] = [x, y] if seg[7] == 1 else [round(x * 2.54), round(y * 2.54)]
+            _skip(f, length - 2 - 14)
+        elif code in _JPEG_SOF:
+            seg = _read(f, 5)
+            out["height_px"], out["width_px"] = struct.unpack(">HH", seg[1:5])
+            return out
+        else:
+            _skip(f, length - 2)
+
+
+def _gif(f) -> Dict[str, Any]:
+    head = _read(f, 10)
+    if head[:3] != b"GIF":
+        raise ValueError("not a GIF")
+    w, h = struct.unpack("<HH", head[6:10])
+    return {"width_px": w, "height_px": h}
+
+
+def _bmp(f) -> Dict[str, Any]:
+    head = _read(f, 46)
+    if head[:2] != b"BM":
+        raise ValueError("not a BMP")
+    w, h = struct.unpack("<ii", head[18:26])
+    x, y = struct.unpack("<ii", head[38:46])
+    out: Dict[str, Any] = {"width_px": w, "height_px": abs(h)}
+    if x > 0 and y > 0:
+        out["dpi"] = [round(x * 0.0254), round(y * 0.0254)]
+    return out
+
+
+_HEADER_READERS = {"png": _png, "jpeg": _jpeg, "gif": _gif, "bmp": _bmp}
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .docx_extractor import _norm_text
+from .sections import STRUCTURAL_TITLES
+
+# =========================
+# 多模式字面量匹配（Aho-Corasick）
+# 规则集里所有字面量（结构标题、титульный лист 字段标记、реферат 要素……）编译成一个自动机，
+# 每个 job 对全文只扫一遍，产出命中表给各规则共用；再加模式不增加每篇文档的扫描次数。
+# =========================
+
+# args 里哪些键是字面量列表/字面量
+LITERAL_ARG_KEYS = ("required_elements", "elements", "fields", "required", "titles", "element")
+
+# 5.1.2 титульный лист 字段 -> 可在文本里直接找到的标记（任一命中即视为存在）
+# 没有列出的字段（组织名称、работа 名称、город、год）无法靠字面量判断，交给人工
+FIELD_MARKERS: Dict[str, Tuple[str, ...]] = {
+    "индекс удк": ("удк",),
+    "регистрационный номер нир": ("рег. №", "регистрационный №", "регистрационный номер", "№ госрегистрации"),
+    "регистрационный номер отчета": ("инв. №", "инвентарный №", "регистрационный номер"),
+    "гриф утверждения или согласования": ("утверждаю", "согласовано"),
+    "вид документа": ("отчет",),
+    "вид отчета": ("заключительный", "промежуточный", "этап"),
+    "должность и фио руководителя": ("руководител",),
+}
+
+
+def norm_pattern(s: str) -> str:
+    """模式/语料统一归一化：压空白 + 小写 + ё→е。"""
+    return _norm_text(s).lower().replace("ё", "е")
+
+
+class Automaton:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pat in patterns:
+            pat = norm_pattern(pat)
+            if not pat or pat in self._ids:
+                continue
+            self._ids[pat] = len(self.patterns)
+            self.patterns.append(pat)
+            self._insert(pat, self._ids[pat])
+        self._build_fail()
+
+    def _insert(self, pat: str, pid: int):
+        state = 0
+        for ch in pat:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pid)
+
+    def _build_fail(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """yield (end_pos, pattern_id)；text 需已用 norm_pattern 归一化。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    yield i + 1, pid
+
+
+class HitTable:
+    """
+    命中表：pattern -> 命中的段落下标（snapshot["paragraphs"] 的 pos，升序）
+    exact：整段文本恰好等于该模式（结构标题判定用）
+    """
+    def __init__(self):
+        self._pos: Dict[str, List[int]] = {}
+        self._exact: Dict[str, List[int]] = {}
+
+    def add(self, pattern: str, pos: int, exact: bool):
+        lst = self._pos.setdefault(pattern, [])
+        if not lst or lst[-1] != pos:
+            lst.append(pos)
+        if exact:
+            self._exact.setdefault(pattern, []).append(pos)
+
+    def positions(self, pattern: str) -> List[int]:
+        return self._pos.get(norm_pattern(pattern), [])
+
+    def exact(self, pattern: str) -> List[int]:
+        return self._exact.get(norm_pattern(pattern), [])
+
+    def first_in(self, pattern: str, span: Optional[Tuple[int, int]] = None) -> Optional[int]:
+        """区间 [start, end) 内第一次命中的 pos；span=None 表示全文。"""
+        lst = self.positions(pattern)
+        if not lst:
+            return None
+        if span is None:
+            return lst[0]
+        i = bisect_left(lst, span[0])
+        if i < len(lst) and lst[i] < span[1]:
+            return lst[i]
+        return None
+
+
+def collect_patterns(runtime: dict) -> List[str]:
+    """规则集 args 里的所有字面量 + 内置标记。"""
+    pats: List[str] = list(STRUCTURAL_TITLES)
+    for rule in (runtime or {}).get("rules", []) or []:
+        args = rule.get("args") or {}
+        for key in LITERAL_ARG_KEYS:
+            v = args.get(key)
+            if isinstance(v, str):
+                pats.append(v)
+            elif isinstance(v, list):
+                pats.extend(x for x in v if isinstance(x, str))
+        if rule.get("op") == "CHECK_REQUIRED_FIELDS":
+            for field in args.get("fields") or []:
+                pats.extend(FIELD_MARKERS.get(norm_pattern(str(field)), ()))
+    return pats
+
+
+_AUTOMATON_CACHE: Dict[Tuple[str, ...], Automaton] = {}
+
+
+def ruleset_automaton(runtime: dict) -> Automaton:
+    """同一规则集（同一组模式）只编译一次，worker 进程内复用。"""
+    key = tuple(sorted({norm_pattern(p) for p in collect_patterns(runtime)}))
+    ac = _AUTOMATON_CACHE.get(key)
+    if ac is None:
+        ac = _AUTOMATON_CACHE[key] = Automaton(key)
+    return ac
+
+
+def scan_paragraphs(automaton: Automaton, paragraphs: List[dict]) -> HitTable:
+    """对全文跑一遍自动机（按段落重置状态，模式不会跨段落）。"""
+    hits = HitTable()
+    pats = automaton.patterns
+    for pos, p in enumerate(paragraphs):
+        text = norm_pattern(p.get("text") or "")
+        if not text:
+            continue
+        n = len(text)
+        for end, pid in automaton.iter_matches(text):
+            pat = pats[pid]
+            hits.add(pat, pos, exact=(end == n and len(pat) == n))
+    return hits
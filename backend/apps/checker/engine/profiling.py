@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# =========================
+# 检查流水线埋点：每个阶段（extract / context / rules / locate / semantic / render ...）
+# 和每个 op（run_rule 按 rule["op"] 归类）记录 wall 时间、CPU 时间、内存分配增量。
+# - Profiler 挂在 contextvar 上：引擎里的埋点（如 locator）不用改函数签名，没激活时几乎零开销
+# - breakdown() 是可 JSON 化的汇总（存 JobEvent.meta["profile"]），带固定桶的直方图，
+#   /metrics 直接把各 job 的桶累加成 Prometheus histogram
+# =========================
+
+# 直方图上界（秒）；最后一个桶是 +Inf
+BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TOP_RULES = 10  # breakdown 里保留最慢的几条规则
+
+_current: ContextVar[Optional["Profiler"]] = ContextVar("gost_profiler", default=None)
+
+
+def _new_stat() -> Dict[str, Any]:
+    return {"n": 0, "wall": 0.0, "cpu": 0.0, "alloc": 0, "buckets": [0] * (len(BUCKETS) + 1)}
+
+
+class Profiler:
+    """
+    trace_alloc=True 时开 tracemalloc 统计每段的净分配字节数（开销明显，默认关）。
+    CPU 用 thread_time：HYBRID 模式下后台线程的 AI 请求不会算进主线程的规则耗时。
+    """
+    def __init__(self, trace_alloc: bool = False):
+        self.trace_alloc = trace_alloc
+        self.stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.rules: List[Tuple[float, str, str]] = []
+        self._started_tracing = False
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        token = _current.set(self)
+        if self.trace_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    @contextmanager
+    def measure(self, kind: str, name: str, rule_id: Optional[str] = None) -> Iterator[None]:
+        """kind：stage | op；同名多次进入会累加（n 次 + 直方图）。"""
+        alloc0 = tracemalloc.get_traced_memory()[0] if self.trace_alloc and tracemalloc.is_tracing() else None
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - w0
+            cpu = time.thread_time() - c0
+            st = self.stats.get((kind, name))
+            if st is None:
+                st = self.stats[(kind, name)] = _new_stat()
+            st["n"] += 1
+            st["wall"] += wall
+            st["cpu"] += cpu
+            st["buckets"][bisect_left(BUCKETS, wall)] += 1
+            if alloc0 is not None:
+                st["alloc"] += tracemalloc.get_traced_memory()[0] - alloc0
+            if rule_id is not None:
+                self.rules.append((wall, rule_id, name))
+
+    def stage(self, name: str):
+        return self.measure("stage", name)
+
+    def op(self, name: str, rule_id: Optional[str] = None):
+        return self.measure("op", name or "?", rule_id=rule_id)
+
+    def breakdown(self) -> Dict[str, Any]:
+        def _dump(kind: str) -> Dict[str, Any]:
+            out = {}
+            for (k, name), st in sorted(self.stats.items(), key=lambda kv: -kv[1]["wall"]):
+                if k != kind:
+                    continue
+                out[name] = {
+                    "n": st["n"],
+                    "wall": round(st["wall"], 6),
+                    "cpu": round(st["cpu"], 6),
+                    "buckets": st["buckets"],
+                }
+                if self.trace_alloc:
+                    out[name]["alloc"] = st["alloc"]
+            return out
+
+        slowest = sorted(self.rules, reverse=True)[:TOP_RULES]
+        return {
+            "wall": round(time.perf_counter() - self._t0, 6),
+            "buckets": list(BUCKETS),
+            "stages": _dump("stage"),
+            "ops": _dump("op"),
+            "slowest_rules": [{"rule_id": rid, "op": op, "wall": round(w, 6)} for w, rid, op in slowest],
+        }
+
+
+def current() -> Optional[Profiler]:
+    return _current.get()
+
+
+def stage(name: str):
+    """引擎内部埋点：有激活的 Profiler 就计时，否则是空上下文。"""
+    prof = _current.get()
+    return prof.stage(name) if prof is not None else nullcontext()
+
+
+def op(name: str, rule_id: Optional[str] = None):
+    """按 op 计时（执行计划里每条规则一次）；没激活 Profiler 时是空上下文。"""
+    prof = _current.get()
+    return prof.op(name, rule_id=rule_id) if prof is not None else nullcontext()
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .checker import Checker, Finding
+from .compile_dsl import build_plan
+from .rule_loader import load_rules
+from .snapshot_store import load_snapshot
+
+# =========================
+# 历史回放：同一批留档 snapshot 上分别跑 基线规则集 和 候选规则集，按规则统计 findings 的变化
+#   new：候选多出来的；resolved：基线有、候选没了；changed：同一位置同一规则，但严重级别 / 文案变了
+# - 每个 worker 进程各建一对 Checker（规则集只加载一次），snapshot 按 chunksize 分批派发
+# - finding 的“位置”= (rule_id, para_idx, anchor, text_hash)；同一位置多条时先配对完全相同的
+# - 规则集的执行计划按 rules 重新编：手改过的 runtime.json（增删规则没重新编译）也按实际规则跑
+# =========================
+
+DIFF_KINDS = ("new", "resolved", "changed")
+
+
+def finding_key(f: Finding) -> Tuple:
+    return (f.rule_id, f.para_idx, f.anchor, f.text_hash)
+
+
+def diff_findings(old: List[Finding], new: List[Finding]) -> List[Tuple[str, Optional[Finding], Optional[Finding]]]:
+    """-> [(kind, 基线 finding, 候选 finding)]，kind ∈ new / resolved / changed（没变的不返回）"""
+    pool: Dict[Tuple, List[Finding]] = defaultdict(list)
+    for f in old:
+        pool[finding_key(f)].append(f)
+
+    out: List[Tuple[str, Optional[Finding], Optional[Finding]]] = []
+    pending: List[Finding] = []
+    for f in new:
+        same = pool.get(finding_key(f))
+        if same and f in same:
+            same.remove(f)
+        else:
+            pending.append(f)
+    for f in pending:
+        same = pool.get(finding_key(f))
+        if same:
+            out.append(("changed", same.pop(0), f))
+        else:
+            out.append(("new", None, f))
+    out.extend(("resolved", f, None) for fs in pool.values() for f in fs)
+    return out
+
+
+def load_ruleset(path: str) -> dict:
+    """load_rules + 按当前 rules 重建 plan（plan 里存的是规则下标，rules 改过后旧 plan 不可信）"""
+    runtime = load_rules(path)
+    runtime["plan"] = build_plan(runtime["rules"])
+    return runtime
+
+
+def ruleset_changes(baseline: dict, candidate: dict) -> Dict[str, str]:
+    """规则集本身的差异：rule_id -> added / removed / modified"""
+    old = {str(r.get("id")): r for r in baseline.get("rules") or []}
+    new = {str(r.get("id")): r for r in candidate.get("rules") or []}
+    out = {rid: "added" for rid in new.keys() - old.keys()}
+    out.update({rid: "removed" for rid in old.keys() - new.keys()})
+    out.update({rid: "modified" for rid in old.keys() & new.keys() if old[rid] != new[rid]})
+    return out
+
+
+# ---------- worker ----------
+_PAIR: Optional[Tuple[Checker, Checker]] = None
+_SAMPLES = 0
+
+
+def _init_worker(baseline_path: str, candidate_path: str, samples: int = 0):
+    global _PAIR, _SAMPLES
+    _PAIR = (Checker(load_ruleset(baseline_path)), Checker(load_ruleset(candidate_path)))
+    _SAMPLES = samples
+
+
+def _sample(kind: str, job: str, old: Optional[Finding], new: Optional[Finding]) -> Dict[str, Any]:
+    f = new or old
+    return {
+        "kind": kind,
+        "job": job,
+        "para_idx": f.para_idx,
+        "anchor": f.anchor,
+        "old": f"[{old.severity}] {old.message}" if old else None,
+        "new": f"[{new.severity}] {new.message}" if new else None,
+    }
+
+
+def evaluate(item: Tuple[str, str]) -> Dict[str, Any]:
+    """(job_id, snapshot 路径) -> 这个文档上每条规则的 new / resolved / changed 计数（+ 少量样例）"""
+    job, path = item
+    baseline, candidate = _PAIR
+    t0 = time.perf_counter()
+    try:
+        snap = load_snapshot(path)
+        t1 = time.perf_counter()
+        old = baseline.check_snapshot(snap, name=job)
+        new = candidate.check_snapshot(snap, name=job)
+    except Exception as exc:  # 坏 / 缺失的 snapshot：记下来继续
+        return {"job": job, "error": f"{type(exc).__name__}: {exc}"}
+
+    rules: Dict[str, Dict[str, int]] = {}
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    for kind, a, b in diff_findings(old.findings, new.findings):
+        rid = (b or a).rule_id or "?"
+        counts = rules.setdefault(rid, dict.fromkeys(DIFF_KINDS, 0))
+        counts[kind] += 1
+        lst = samples.setdefault(rid, [])
+        if len(lst) < _SAMPLES:
+            lst.append(_sample(kind, job, a, b))
+    return {
+        "job": job,
+        "rules": rules,
+        "samples": samples,
+        "baseline": len(old.findings),
+        "candidate": len(new.findings),
+        "load_seconds": round(t1 - t0, 3),
+        "baseline_seconds": old.seconds,
+        "candidate_seconds": new.seconds,
+    }
+
+
+# ---------- 汇总 ----------
+def new_report(baseline: dict, candidate: dict) -> Dict[str, Any]:
+    return {
+        "documents": 0,
+        "errors": [],
+        "changed_documents": 0,
+        "findings": {"baseline": 0, "candidate": 0},
+        "seconds": {"load": 0.0, "baseline": 0.0, "candidate": 0.0},
+        "ruleset": ruleset_changes(baseline, candidate),
+        "rules": {},
+    }
+
+
+def merge(report: Dict[str, Any], res: Dict[str, Any], samples: int = 0):
+    if "error" in res:
+        report["errors"].append({"job": res["job"], "error": res["error"]})
+        return
+    report["documents"] += 1
+    report["findings"]["baseline"] += res["baseline"]
+    report["findings"]["candidate"] += res["candidate"]
+    for k in ("load", "baseline", "candidate"):
+        report["seconds"][k] += res[f"{k}_seconds"]
+    if res["rules"]:
+        report["changed_documents"] += 1
+    for rid, counts in res["rules"].items():
+        row = report["rules"].setdefault(rid, {**dict.fromkeys(DIFF_KINDS, 0), "documents": 0, "samples": []})
+        for kind in DIFF_KINDS:
+            row[kind] += counts[kind]
+        row["documents"] += 1
+        room = samples - len(row["samples"])
+        if room > 0:
+            row["samples"].extend(res["samples"].get(rid, [])[:room])
+
+
+def run_reevaluation(items: List[Tuple[str, str]], baseline_path: str, candidate_path: str, *,
+                     jobs: int = 1, chunksize: int = 8, samples: int = 3,
+                     progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """items：[(job_id, snapshot 路径)]；返回汇总报告（可 JSON 化）"""
+    report = new_report(load_ruleset(baseline_path), load_ruleset(candidate_path))
+    t0 = time.perf_counter()
+
+    def results() -> Iterable[Dict[str, Any]]:
+        if jobs <= 1 or len(items) <= 1:
+            _init_worker(baseline_path, candidate_path, samples)
+            yield from map(evaluate, items)
+            return
+        # spawn：和 gost-check 一致（调用方可能是带线程的 Django 进程）
+        with get_context("spawn").Pool(jobs, initializer=_init_worker,
+                                       initargs=(baseline_path, candidate_path, samples)) as pool:
+            yield from pool.imap_unordered(evaluate, items, chunksize=max(1, chunksize))
+
+    for n, res in enumerate(results(), start=1):
+        merge(report, res, samples)
+        if progress:
+            progress(n, len(items))
+    report["wall_seconds"] = round(time.perf_counter() - t0, 3)
+    for k, v in report["seconds"].items():
+        report["seconds"][k] = round(v, 3)
+    return report
+
+
+def format_report(report: Dict[str, Any], *, show_samples: bool = True) -> str:
+    """按规则的差异表（变化最多的在前）"""
+    lines = [
+        f"documents: {report['documents']} ({report['changed_documents']} with changes, "
+        f"{len(report['errors'])} failed) in {report.get('wall_seconds', 0):.1f}s",
+        f"findings: {report['findings']['baseline']} -> {report['findings']['candidate']}",
+    ]
+    ruleset = report.get("ruleset") or {}
+    if ruleset:
+        lines.append("ruleset: " + ", ".join(f"{rid} {kind}" for rid, kind in sorted(ruleset.items())))
+    rows = sorted(
+        report["rules"].items(),
+        key=lambda kv: (-(kv[1]["new"] + kv[1]["resolved"] + kv[1]["changed"]), kv[0]),
+    )
+    errors = [f"error: {err['job']}: {err['error']}" for err in report["errors"]]
+    if not rows:
+        lines.append("no differences" if report["documents"] else "no snapshots evaluated")
+        return "\n".join(lines + errors)
+
+    lines.append("")
+    lines.append(f"{'rule':<14}{'new':>8}{'resolved':>10}{'changed':>9}{'docs':>7}  ruleset")
+    for rid, row in rows:
+        lines.append(
+            f"{rid:<14}{row['new']:>8}{row['resolved']:>10}{row['changed']:>9}{row['documents']:>7}  "
+            f"{ruleset.get(rid, '')}"
+        )
+    if show_samples:
+        for rid, row in rows:
+            for s in row["samples"]:
+                where = f"{s['anchor'] or ''} #{s['para_idx'] if s['para_idx'] is not None else '?'}".strip()
+                lines.append(f"  {rid} {s['kind']} job={s['job']} {where}")
+                if s["old"]:
+                    lines.append(f"    - {s['old']}")
+                if s["new"]:
+                    lines.append(f"    + {s['new']}")
+    return "\n".join(lines + errors)
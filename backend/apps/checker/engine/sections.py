@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from .docx_extractor import _norm_heading_key
+
+# 结构元素标题（ГОСТ 7.32-2017 §4），用于切分章节
+STRUCTURAL_TITLES = (
+    "ТИТУЛЬНЫЙ ЛИСТ",
+    "СПИСОК ИСПОЛНИТЕЛЕЙ",
+    "РЕФЕРАТ",
+    "СОДЕРЖАНИЕ",
+    "ТЕРМИНЫ И ОПРЕДЕЛЕНИЯ",
+    "ПЕРЕЧЕНЬ СОКРАЩЕНИЙ И ОБОЗНАЧЕНИЙ",
+    "ВВЕДЕНИЕ",
+    "ОСНОВНАЯ ЧАСТЬ",
+    "ЗАКЛЮЧЕНИЕ",
+    "СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ",
+    "ПРИЛОЖЕНИЯ",
+)
+_STRUCTURAL_SET = set(STRUCTURAL_TITLES)
+_APPENDIX_RE = re.compile(r"^ПРИЛОЖЕНИЕ(\s+[А-ЯA-Z0-9]{1,3})?$")
+
+# 不对应具体章节、按整篇文档处理的 scope
+DOCUMENT_SCOPES = {"document", "structural_headings", "figures", "tables", "formulas", "notes"}
+
+Span = Tuple[int, int]  # [start, end)：snapshot["paragraphs"] 列表下标（不是 docx 段落 idx）
+
+
+def _is_boundary_key(key: str) -> bool:
+    return key in _STRUCTURAL_SET or bool(_APPENDIX_RE.match(key))
+
+
+def build_section_index(snapshot: dict) -> dict:
+    """
+    一次性切分章节：结构标题 -> 连续段落区间。
+    标题位置优先取 anchor_map（heading style），缺的再用“整段全大写且等于结构标题”兜底；
+    一级标题（各章）同样作为边界。
+    返回：
+    - headings: {标题: pos}
+    - chapters: [pos, ...]（一级标题）
+    - appendices: [pos, ...]
+    - spans: {"document": [0, n], "title_page": [0, k], "section:РЕФЕРАТ": [s, e], "appendices": [s, n], ...}
+    """
+    paragraphs = snapshot.get("paragraphs") or []
+    n = len(paragraphs)
+    pos_by_idx = {p["idx"]: pos for pos, p in enumerate(paragraphs)}
+
+    headings: Dict[str, int] = {}
+    appendices: List[int] = []
+
+    for key, idx in (snapshot.get("anchor_map") or {}).items():
+        pos = pos_by_idx.get(idx)
+        if pos is None or not _is_boundary_key(key):
+            continue
+        if key in _STRUCTURAL_SET:
+            headings.setdefault(key, pos)
+        else:
+            appendices.append(pos)
+
+    # 一次扫描：
+    # - 一级标题（各章，如 “1 Анализ”）也是章节边界，否则 ВВЕДЕНИЕ 会一直延伸到 ЗАКЛЮЧЕНИЕ
+    # - 兜底：没用标题样式的文档，整段全大写且等于结构标题（目录里的混排大小写行不会命中）
+    chapters: List[int] = []
+    seen_appendix = set(appendices)
+    for pos, p in enumerate(paragraphs):
+        t = p.get("text") or ""
+        if len(t) > 80:
+            continue
+        if p.get("is_heading_style") and p.get("heading_level") == 1:
+            chapters.append(pos)
+        if not p.get("is_upper"):
+            continue
+        key = _norm_heading_key(t)
+        if key in _STRUCTURAL_SET:
+            headings.setdefault(key, pos)
+        elif _APPENDIX_RE.match(key) and pos not in seen_appendix:
+            appendices.append(pos)
+
+    appendices.sort()
+    boundaries = sorted(set(headings.values()) | set(appendices) | set(chapters))
+
+    def _next_boundary(pos: int) -> int:
+        i = bisect_right(boundaries, pos)
+        return boundaries[i] if i < len(boundaries) else n
+
+    spans: Dict[str, Span] = {"document": (0, n)}
+    for title, pos in headings.items():
+        # 标题行本身不算章节内容
+        spans[f"section:{title}"] = (pos + 1, _next_boundary(pos))
+
+    if boundaries and boundaries[0] > 0:
+        spans["title_page"] = (0, boundaries[0])
+
+    if appendices:
+        spans["appendices"] = (appendices[0], n)
+
+    # ОСНОВНАЯ ЧАСТЬ 通常没有同名标题（直接是各章）：取 ВВЕДЕНИЕ 结束到 ЗАКЛЮЧЕНИЕ 之间
+    if "section:ОСНОВНАЯ ЧАСТЬ" not in spans and "ВВЕДЕНИЕ" in headings and "ЗАКЛЮЧЕНИЕ" in headings:
+        start = spans["section:ВВЕДЕНИЕ"][1]
+        end = headings["ЗАКЛЮЧЕНИЕ"]
+        if start < end:
+            spans["section:ОСНОВНАЯ ЧАСТЬ"] = (start, end)
+
+    return {
+        "size": n,
+        "headings": headings,
+        "chapters": chapters,
+        "appendices": appendices,
+        "spans": spans,
+    }
+
+
+def resolve_scope(index: dict, scope: str) -> Optional[Span]:
+    """scope 字符串 -> 段落区间；章节不存在返回 None。"""
+    scope = (scope or "document").strip()
+    spans = index.get("spans") or {}
+    if scope in spans:
+        return spans[scope]
+    if scope in DOCUMENT_SCOPES:
+        return spans.get("document", (0, index.get("size", 0)))
+    if scope.startswith("section:"):
+        key = _norm_heading_key(scope.split(":", 1)[1])
+        return spans.get(f"section:{key}")
+    return None
+
+
+def resolve_scopes(index: dict, runtime: dict) -> Dict[str, Optional[Span]]:
+    """按规则集预解析所有 scope（runtime.index.by_scope 的 key），每个 job 只算一次。"""
+    by_scope = ((runtime or {}).get("index") or {}).get("by_scope") or {}
+    scopes = set(by_scope) or {r.get("scope") for r in (runtime or {}).get("rules", []) if r.get("scope")}
+    return {s: resolve_scope(index, s) for s in scopes}
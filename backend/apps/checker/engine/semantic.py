@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .hard_rules import _issue, _review_placeholder, _scope_span, _section_missing_issue
+
+# =========================
+# 语义审查（CHECK_SEMANTIC_REVIEW：5.3.2.2 / 5.7 / 5.8 / 5.9 ...）
+# - 按 scope 取章节文本，超长按段落边界切块
+# - 同一块文本上的多条规则合并成一次调用（rules_per_call）
+# - asyncio 并发；每个 provider 一个进程内限速器（rpm）+ 并发上限
+# - 结果按 (章节文本 hash, rule_id, provider) 缓存，重跑/重复上传不再花钱
+# - STUB：本地确定性 provider，离线跑通整条流水线和压测
+# =========================
+
+SEMANTIC_OP = "CHECK_SEMANTIC_REVIEW"
+PENDING_CATEGORY = "AI_PENDING"  # HYBRID 超时的占位 finding，回填任务按它找行
+
+DEFAULT_CHUNK_CHARS = 6000
+DEFAULT_RULES_PER_CALL = 4
+
+
+def semantic_rules(runtime: dict) -> List[dict]:
+    return [r for r in (runtime or {}).get("rules", []) or [] if r.get("op") == SEMANTIC_OP]
+
+
+def chunk_paragraphs(texts: List[str], max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """按段落边界切块；单段超长时硬切。"""
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for t in texts:
+        while len(t) > max_chars:
+            if buf:
+                chunks.append("\n".join(buf))
+                buf, size = [], 0
+            chunks.append(t[:max_chars])
+            t = t[max_chars:]
+        if buf and size + len(t) + 1 > max_chars:
+            chunks.append("\n".join(buf))
+            buf, size = [], 0
+        if t:
+            buf.append(t)
+            size += len(t) + 1
+    if buf:
+        chunks.append("\n".join(buf))
+    return chunks
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def cache_key(section_hash: str, rule_id: str, provider: str) -> str:
+    return f"semantic:{provider}:{rule_id}:{section_hash}"
+
+
+class MemoryCache:
+    """默认缓存（进程内 LRU）；调用方也可以传 Django cache 之类带 get/set 的对象。"""
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value, timeout=None):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+_DEFAULT_CACHE = MemoryCache()
+
+
+# ---------- 限速 ----------
+class RateLimiter:
+    """
+    进程内、跨事件循环的最小间隔限速（rpm=0 不限速）。
+    Celery worker 里每个 job 各自 asyncio.run，但同一 provider 共用一个限速器。
+    """
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm and rpm > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_at)
+            self._next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+_LIMITERS: Dict[Tuple[str, int], RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _limiter(name: str, rpm: int) -> RateLimiter:
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get((name, rpm))
+        if lim is None:
+            lim = _LIMITERS[(name, rpm)] = RateLimiter(rpm)
+        return lim
+
+
+# ---------- Provider ----------
+class Provider:
+    """
+    review(chunk, rules) -> {rule_id: {"ok": bool, "message": str, "suggestion": str}}
+    没返回的 rule_id 视为“无法判断”。
+    """
+    name = "NONE"
+
+    def __init__(self, *, rpm: int = 0, concurrency: int = 4, rules_per_call: int = DEFAULT_RULES_PER_CALL,
+                 chunk_chars: int = DEFAULT_CHUNK_CHARS, **_):
+        self.rpm = int(rpm or 0)
+        self.concurrency = max(1, int(concurrency or 1))
+        self.rules_per_call = max(1, int(rules_per_call or 1))
+        self.chunk_chars = int(chunk_chars or DEFAULT_CHUNK_CHARS)
+
+    @property
+    def cache_name(self) -> str:
+        return self.name
+
+    async def open(self):
+        """一次 review_async 开始前调用（建连接池等）。"""
+
+    async def close(self):
+        """一次 review_async 结束后调用。"""
+
+    async def review(self, chunk: str, rules: List[dict]) -> Dict[str, dict]:
+        raise NotImplementedError
+
+
+class StubProvider(Provider):
+    """
+    确定性本地 provider：不联网，结果只取决于文本本身。
+    章节过短（< min_words 个词）判为不满足，否则通过；latency 用来模拟网络耗时做压测。
+    """
+    name = "STUB"
+
+    def __init__(self, *, latency: float = 0.0, min_words: int = 30, **kw):
+        super().__init__(**kw)
+        self.latency = float(latency or 0)
+        self.min_words = int(min_words)
+
+    async def review(self, chunk: str, rules: List[dict]) -> Dict[str, dict]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        words = len(chunk.split())
+        ok = words >= self.min_words
+        return {
+            r["id"]: {
+                "ok": ok,
+                "message": "" if ok else f"Раздел слишком краткий ({words} слов) для выполнения требования: {r.get('title', '')}",
+                "suggestion": "" if ok else "Раскройте содержание раздела в соответствии с требованием ГОСТ.",
+            }
+            for r in rules
+        }
+
+
+_SYSTEM_PROMPT = (
+    "Ты проверяешь отчет о НИР на соответствие ГОСТ 7.32-2017. "
+    "Тебе дан фрагмент раздела и список требований. Для каждого требования реши, выполнено ли оно в этом фрагменте. "
+    'Ответь только JSON-объектом вида {"results": [{"rule_id": "...", "ok": true|false, '
+    '"message": "кратко, что не так", "suggestion": "как исправить"}]}.'
+)
+
+
+class OpenAICompatibleProvider(Provider):
+    """GPT / DEEPSEEK / QWEN：都走 OpenAI 兼容的 chat.completions 接口，只是 base_url / model 不同。"""
+
+    def __init__(self, name: str, *, api_key: str, model: str, base_url: Optional[str] = None,
+                 timeout: float = 60.0, **kw):
+        super().__init__(**kw)
+        if not api_key:
+            raise ValueError(f"AI provider {name}: api_key is not configured")
+        self.name = name
+        self.model = model
+        self.base_url = base_url or None
+        self.api_key = api_key
+        self.timeout = float(timeout)
+        self._client = None
+
+    @property
+    def cache_name(self) -> str:
+        return f"{self.name}/{self.model}"
+
+    async def open(self):
+        # client 的 httpx 连接池绑定事件循环：每次 review_async 各建一个
+        from openai import AsyncOpenAI
+        self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def review(self, chunk: str, rules: List[dict]) -> Dict[str, dict]:
+        reqs = "\n".join(f"- {r['id']}: {r.get('title', '')}" for r in rules)
+        resp = await self._client.chat.completions.create(
+            model=self.model,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": f"Требования:\n{reqs}\n\nФрагмент:\n{chunk}"},
+            ],
+        )
+        return _parse_results(resp.choices[0].message.content or "")
+
+
+def _parse_results(content: str) -> Dict[str, dict]:
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return {}
+    items = data.get("results") if isinstance(data, dict) else data
+    out: Dict[str, dict] = {}
+    for item in items or []:
+        if isinstance(item, dict) and item.get("rule_id") is not None:
+            out[str(item["rule_id"])] = {
+                "ok": bool(item.get("ok")),
+                "message": str(item.get("message") or ""),
+                "suggestion": str(item.get("suggestion") or ""),
+            }
+    return out
+
+
+def get_provider(name: str, config: Optional[Dict[str, dict]] = None) -> Optional[Provider]:
+    """config：settings.AI_PROVIDERS；NONE / 未知 provider 返回 None（走人工复核）。"""
+    name = (name or "NONE").upper()
+    opts = dict((config or {}).get(name) or {})
+    if name == "STUB":
+        return StubProvider(**opts)
+    if name in (config or {}):
+        return OpenAICompatibleProvider(name, **opts)
+    return None
+
+
+# ---------- 执行 ----------
+def _verdict_issue(rule: dict, verdict: dict, provider: Provider) -> Dict[str, Any]:
+    return _issue(
+        rule,
+        message=verdict.get("message") or f"Требование не выполнено: {rule.get('title', '')}",
+        suggestion=verdict.get("suggestion") or "Доработайте раздел в соответствии с требованием ГОСТ.",
+        category=f"AI:{provider.name}",
+    )
+
+
+def _merge(verdicts: List[Optional[dict]]) -> Optional[dict]:
+    """多块文本的结论合并：要求都是“章节中应包含 …”，任一块满足即满足；都没返回算无法判断。"""
+    got = [v for v in verdicts if v]
+    if not got:
+        return None
+    for v in got:
+        if v["ok"]:
+            return v
+    return got[0]
+
+
+def plan_semantic_review(snapshot: dict, ctx: dict, rules: List[dict]) -> List[dict]:
+    """
+    规则 -> 待审任务：[{"rule", "text", "section_hash"}]；章节不存在的记为 missing（出缺失提示）。
+    只依赖章节索引，HYBRID 模式下可以在硬规则之前就准备好。
+    """
+    paragraphs = snapshot.get("paragraphs") or []
+    tasks: List[dict] = []
+    for rule in rules:
+        span = _scope_span(ctx, rule.get("scope") or "document")
+        if span is None:
+            tasks.append({"rule": rule, "missing": True})
+            continue
+        texts = [(p.get("text") or "").strip() for p in paragraphs[span[0]:span[1]]]
+        text = "\n".join(t for t in texts if t)
+        tasks.append({"rule": rule, "text": text, "section_hash": _text_hash(text)})
+    return tasks
+
+
+async def review_async(tasks: List[dict], provider: Provider, *, cache=None, cache_ttl=None) -> List[dict]:
+    cache = cache if cache is not None else _DEFAULT_CACHE
+    results: Dict[str, Optional[dict]] = {}
+    errors: Dict[str, str] = {}
+
+    # 1) 先查缓存；剩下的按章节文本分组（同一文本上的规则合批）
+    groups: Dict[str, dict] = {}
+    for t in tasks:
+        if t.get("missing"):
+            continue
+        rid = t["rule"]["id"]
+        hit = cache.get(cache_key(t["section_hash"], rid, provider.cache_name))
+        if hit is not None:
+            results[rid] = hit
+            continue
+        g = groups.setdefault(t["section_hash"], {"text": t["text"], "rules": []})
+        g["rules"].append(t["rule"])
+
+    # 2) 每组：切块 × 按 rules_per_call 分批 -> 一次调用
+    calls: List[Tuple[str, str, int, List[dict]]] = []
+    chunked: Dict[str, int] = {}
+    for h, g in groups.items():
+        chunks = chunk_paragraphs(g["text"].split("\n"), provider.chunk_chars) or [""]
+        chunked[h] = len(chunks)
+        for ci, chunk in enumerate(chunks):
+            for i in range(0, len(g["rules"]), provider.rules_per_call):
+                calls.append((h, chunk, ci, g["rules"][i:i + provider.rules_per_call]))
+
+    sem = asyncio.Semaphore(provider.concurrency)
+    limiter = _limiter(provider.cache_name, provider.rpm)
+
+    async def _call(chunk: str, batch: List[dict]) -> Dict[str, dict]:
+        async with sem:
+            await limiter.acquire()
+            return await provider.review(chunk, batch)
+
+    outs: list = []
+    if calls:
+        try:
+            await provider.open()
+            outs = await asyncio.gather(*(_call(chunk, batch) for _, chunk, _, batch in calls), return_exceptions=True)
+        except Exception as exc:
+            # provider 起不来（配置/依赖问题）：整批按失败处理，降级为人工复核
+            outs = [exc] * len(calls)
+        finally:
+            await provider.close()
+
+    per_rule: Dict[Tuple[str, str], List[Optional[dict]]] = {}
+    for (h, _, ci, batch), out in zip(calls, outs):
+        for rule in batch:
+            slot = per_rule.setdefault((h, rule["id"]), [None] * chunked[h])
+            if isinstance(out, BaseException):
+                errors[rule["id"]] = f"{type(out).__name__}: {out}"
+            else:
+                slot[ci] = out.get(rule["id"])
+
+    for (h, rid), verdicts in per_rule.items():
+        if rid in errors:
+            continue
+        merged = _merge(verdicts)
+        results[rid] = merged
+        if merged is not None:
+            cache.set(cache_key(h, rid, provider.cache_name), merged, cache_ttl)
+
+    # 3) 结论 -> issues（按规则原顺序）
+    issues: List[dict] = []
+    for t in tasks:
+        rule = t["rule"]
+        rid = rule["id"]
+        if t.get("missing"):
+            issues.append(_section_missing_issue(rule))
+        elif rid in errors:
+            issues.append(_review_placeholder(rule, f"ошибка AI-провайдера {provider.name} ({errors[rid][:200]})"))
+        elif results.get(rid) is None:
+            issues.append(_review_placeholder(rule, f"AI-провайдер {provider.name} не дал ответа"))
+        elif not results[rid]["ok"]:
+            issues.append(_verdict_issue(rule, results[rid], provider))
+    return issues
+
+
+def review(snapshot: dict, ctx: dict, rules: List[dict], provider: Provider, *, cache=None, cache_ttl=None) -> List[dict]:
+    """同步入口（Celery 任务里用）。"""
+    tasks = plan_semantic_review(snapshot, ctx, rules)
+    return asyncio.run(review_async(tasks, provider, cache=cache, cache_ttl=cache_ttl))
+
+
+# ---------- HYBRID：和硬规则并行 ----------
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="semantic")
+        return _EXECUTOR
+
+
+def submit_review(snapshot: dict, ctx: dict, rules: List[dict], provider: Provider, *,
+                  cache=None, cache_ttl=None) -> Tuple[List[dict], Future]:
+    """
+    只需要章节索引：build_context 之后立即提交，AI 请求（I/O）在后台线程里跑，
+    主线程继续执行 CPU 密集的硬规则；返回 (tasks, future)，合并时 future.result(timeout=...)。
+    """
+    tasks = plan_semantic_review(snapshot, ctx, rules)
+    fut = _executor().submit(asyncio.run, review_async(tasks, provider, cache=cache, cache_ttl=cache_ttl))
+    return tasks, fut
+
+
+def pending_placeholders(tasks: List[dict], provider: Provider) -> List[dict]:
+    """截止时间到了 AI 还没回：章节缺失的照常给结论，其余先占位，等回填。"""
+    issues: List[dict] = []
+    for t in tasks:
+        rule = t["rule"]
+        if t.get("missing"):
+            issues.append(_section_missing_issue(rule))
+        else:
+            issue = _review_placeholder(rule, f"ответ AI-провайдера {provider.name} ещё не получен, результат будет дополнен")
+            issue["category"] = PENDING_CATEGORY
+            issues.append(issue)
+    return issues
@@ -1,19 +1,23 @@
 from pathlib import Path
-from .rule_loader import load_rules
+from typing import Optional
+
+from .checker import Checker
 from .hard_rules import run_hard_rules
 from .result_writer import write_result
-from .docx_extractor import extract_text  # 如果你后面要用
+
+DEFAULT_RUNTIME = Path(__file__).resolve().parent.parent / "standards" / "gost_7_32_2017.runtime.json"
 
 
-def run_checker(input_path: str, media_root: Path) -> dict:
+def run_checker(input_path: str, media_root: Path, rules_path: Optional[str] = None) -> dict:
+    """不经过 Celery 的单文档检查：docx -> snapshot -> 规则 -> 结果 docx（多个文档请直接常驻一个 Checker）。"""
     input_file = Path(input_path)
     if not input_file.exists():
         raise FileNotFoundError(f"Input file not found: {input_file}")
 
-    rules = load_rules()
-    text = extract_text(input_file)  # 你之前注释了，但下面又在用
-    issues = run_hard_rules(text, rules)
-    result_path = write_result(media_root, input_file.stem, issues)
+    checker = Checker.from_path(rules_path or DEFAULT_RUNTIME, keep_snapshot=True)
+    result = checker.check(input_file)
+    issues = result.issues() or run_hard_rules(result.snapshot, {})
+    result_path = write_result(media_root, input_file.stem, issues, snapshot=result.snapshot)
 
     return {
         "issues": issues,
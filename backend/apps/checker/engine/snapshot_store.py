@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+# =========================
+# snapshot 落盘：gzip 压缩的 JSON（MEDIA_ROOT/snapshots/<job_id>.json.gz）
+# 用途：规则集改动后直接在历史 snapshot 上重跑（manage.py reevaluate），不用重新上传 / 解析 docx
+# =========================
+
+COMPRESS_LEVEL = 6  # 再高压缩率几乎不变，写入明显变慢
+
+
+def snapshot_relpath(job_id: str) -> str:
+    return f"snapshots/{job_id}.json.gz"
+
+
+def save_snapshot(media_root: Path | str, job_id: str, snapshot: dict) -> str:
+    """写入 MEDIA_ROOT/snapshots/，返回相对 MEDIA_ROOT 的路径（同 write_result）"""
+    rel = snapshot_relpath(job_id)
+    path = Path(media_root) / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL) as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(path)  # 先写临时文件再改名：重跑时读的一方不会看到半个文件
+    return rel
+
+
+def load_snapshot(path: Path | str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.styles import BabelFish
+
+# =========================
+# 有效格式解析：docDefaults -> 段落样式（based_on 链）-> 段落直接格式 -> 字符样式 -> run 直接格式
+# 直接读 styles.xml 的 lxml 元素（不依赖 python-docx 的对象层）；
+# 每个样式 id 只沿 based_on 链解析一次并缓存，成本和样式数成正比，和段落数无关。
+# =========================
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+_VAL = _w("val")
+
+# w:jc -> python-docx 的对齐枚举（snapshot 里 alignment / alignment_text 沿用它的格式）
+_JC_ALIAS = {"start": "left", "end": "right"}
+
+
+def _on(el) -> bool:
+    """开关属性：<w:b/> / <w:b w:val="true|1|on"/> 为真，val=false|0|off 为假。"""
+    v = el.get(_VAL)
+    return v is None or v.lower() not in ("0", "false", "off", "none")
+
+
+def _on_attr(v: Optional[str]) -> bool:
+    return v is not None and v.lower() in ("1", "true", "on")
+
+
+def _int(v: Optional[str]) -> Optional[int]:
+    try:
+        return int(v) if v is not None else None
+    except ValueError:
+        return None
+
+
+def parse_rpr(rpr) -> Dict[str, Any]:
+    """<w:rPr> -> 只含显式设置项的 dict（没设置的键不出现，合并时不覆盖上一级）"""
+    out: Dict[str, Any] = {}
+    if rpr is None:
+        return out
+    for child in rpr:
+        tag = child.tag
+        if tag == _w("rFonts"):
+            theme = child.get(_w("asciiTheme")) or child.get(_w("hAnsiTheme"))
+            name = child.get(_w("ascii")) or child.get(_w("hAnsi"))
+            # 主题字体优先于显式字体（ECMA-376 17.3.2.26）；先记成 "theme:minorHAnsi"，run() 里换成实际字体
+            if theme:
+                out["font_name"] = f"theme:{theme}"
+            elif name:
+                out["font_name"] = name
+        elif tag == _w("sz"):
+            half = _int(child.get(_VAL))
+            if half is not None:
+                out["size_pt"] = half / 2
+        elif tag == _w("b"):
+            out["bold"] = _on(child)
+        elif tag == _w("i"):
+            out["italic"] = _on(child)
+        elif tag == _w("caps"):
+            out["caps"] = _on(child)
+        elif tag == _w("color"):
+            val = child.get(_VAL)
+            if val:
+                out["color"] = val.upper()
+    return out
+
+
+def parse_ppr(ppr) -> Dict[str, Any]:
+    """<w:pPr> -> 只含显式设置项的 dict"""
+    out: Dict[str, Any] = {}
+    if ppr is None:
+        return out
+    for child in ppr:
+        tag = child.tag
+        if tag == _w("jc"):
+            val = child.get(_VAL)
+            if val:
+                out["jc"] = _JC_ALIAS.get(val, val)
+        elif tag == _w("spacing"):
+            line = _int(child.get(_w("line")))
+            if line is not None:
+                out["line"] = line
+                out["line_rule"] = child.get(_w("lineRule")) or "auto"
+        elif tag == _w("ind"):
+            first = _int(child.get(_w("firstLine")))
+            hanging = _int(child.get(_w("hanging")))
+            if hanging is not None:
+                out["first_line_twips"] = -hanging
+            elif first is not None:
+                out["first_line_twips"] = first
+        elif tag == _w("pageBreakBefore"):
+            out["page_break_before"] = _on(child)
+        elif tag == _w("outlineLvl"):
+            lvl = _int(child.get(_VAL))
+            if lvl is not None:
+                out["outline_level"] = lvl
+    return out
+
+
+def theme_fonts(theme_xml: Optional[bytes]) -> Dict[str, str]:
+    """theme1.xml -> {"major": 字体, "minor": 字体}（拉丁字体）"""
+    if not theme_xml:
+        return {}
+    from lxml import etree
+
+    root = etree.fromstring(theme_xml)
+    out = {}
+    for kind in ("major", "minor"):
+        latin = root.find(f".//{{{A_NS}}}{kind}Font/{{{A_NS}}}latin")
+        if latin is not None and latin.get("typeface"):
+            out[kind] = latin.get("typeface")
+    return out
+
+
+class StyleResolver:
+    """
+    styles_el：styles.xml 的根元素（python-docx 里是 document.styles.element）。
+    style() / char_style() 按样式 id 缓存；paragraph() / run() 只做一次 dict 合并。
+    """
+    def __init__(self, styles_el, theme: Optional[Dict[str, str]] = None):
+        self.theme = theme or {}
+        self._styles: Dict[Tuple[str, str], Any] = {}
+        self._names: Dict[str, str] = {}
+        self._default: Dict[str, Optional[str]] = {"paragraph": None, "character": None}
+        self._ppr_default: Dict[str, Any] = {}
+        self._rpr_default: Dict[str, Any] = {}
+        self._memo: Dict[Tuple[str, Optional[str]], Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+        if styles_el is None:
+            return
+        defaults = styles_el.find(_w("docDefaults"))
+        if defaults is not None:
+            self._rpr_default = parse_rpr(defaults.find(f"{_w('rPrDefault')}/{_w('rPr')}"))
+            self._ppr_default = parse_ppr(defaults.find(f"{_w('pPrDefault')}/{_w('pPr')}"))
+        for st in styles_el.iterfind(_w("style")):
+            stype = st.get(_w("type")) or "paragraph"
+            sid = st.get(_w("styleId"))
+            if not sid:
+                continue
+            self._styles[(stype, sid)] = st
+            name = st.find(_w("name"))
+            if name is not None and name.get(_VAL):
+                self._names[sid] = name.get(_VAL)
+            if _on_attr(st.get(_w("default"))) and stype in self._default:
+                self._default[stype] = sid
+
+    def name(self, style_id: Optional[str]) -> Optional[str]:
+        """段落样式的显示名（同 python-docx：找不到的 id 退回默认样式，内置名 heading 1 -> Heading 1）"""
+        sid = style_id if (style_id and ("paragraph", style_id) in self._styles) else self._default["paragraph"]
+        return BabelFish.internal2ui(self._names.get(sid, sid)) if sid else None
+
+    def _resolve(self, stype: str, style_id: Optional[str], seen: frozenset = frozenset()):
+        """样式自身沿 based_on 链合并后的 (ppr, rpr)，不含 docDefaults。"""
+        key = (stype, style_id)
+        hit = self._memo.get(key)
+        if hit is not None:
+            return hit
+        st = self._styles.get(key) if style_id else None
+        if st is None or style_id in seen:
+            return {}, {}
+        based = st.find(_w("basedOn"))
+        base_id = based.get(_VAL) if based is not None else None
+        ppr, rpr = self._resolve(stype, base_id, seen | {style_id}) if base_id else ({}, {})
+        out = ({**ppr, **parse_ppr(st.find(_w("pPr")))}, {**rpr, **parse_rpr(st.find(_w("rPr")))})
+        self._memo[key] = out
+        return out
+
+    def style(self, style_id: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """段落样式的有效 (ppr, rpr)：docDefaults + based_on 链 + 样式本身。"""
+        sid = style_id if (style_id and ("paragraph", style_id) in self._styles) else self._default["paragraph"]
+        key = ("effective", sid)
+        hit = self._memo.get(key)
+        if hit is None:
+            ppr, rpr = self._resolve("paragraph", sid)
+            hit = self._memo[key] = ({**self._ppr_default, **ppr}, {**self._rpr_default, **rpr})
+        return hit
+
+    def char_style(self, style_id: Optional[str]) -> Dict[str, Any]:
+        return self._resolve("character", style_id or self._default["character"])[1]
+
+    def paragraph(self, ppr_el) -> Tuple[Optional[str], Dict[str, Any], Dict[str, Any]]:
+        """
+        <w:pPr> -> (样式 id, 有效段落格式, run 的基础格式)
+        pPr 里的 rPr 是段落标记符自己的格式，不作用于 run，这里不合并。
+        """
+        style_id = None
+        direct: Dict[str, Any] = {}
+        if ppr_el is not None:
+            ps = ppr_el.find(_w("pStyle"))
+            style_id = ps.get(_VAL) if ps is not None else None
+            direct = parse_ppr(ppr_el)
+        ppr, rpr = self.style(style_id)
+        return style_id, ({**ppr, **direct} if direct else ppr), rpr
+
+    def run(self, base_rpr: Dict[str, Any], rpr_el) -> Dict[str, Any]:
+        """段落级基础格式 + 字符样式 + run 直接格式 -> 有效 run 格式（主题字体换成实际字体名）"""
+        eff = base_rpr
+        if rpr_el is not None:
+            rs = rpr_el.find(_w("rStyle"))
+            char = self.char_style(rs.get(_VAL) if rs is not None else None)
+            direct = parse_rpr(rpr_el)
+            if char or direct:
+                eff = {**base_rpr, **char, **direct}
+        else:
+            char = self.char_style(None)
+            if char:
+                eff = {**base_rpr, **char}
+        return self.font(eff)
+
+    def font(self, rpr: Dict[str, Any]) -> Dict[str, Any]:
+        name = rpr.get("font_name")
+        if name and name.startswith("theme:"):
+            real = self.theme.get("major" if name[6:].startswith("major") else "minor")
+            return {**rpr, "font_name": real}
+        return rpr
+
+
+# ---------- snapshot 字段 ----------
+def alignment(ppr: Dict[str, Any]):
+    jc = ppr.get("jc")
+    if not jc:
+        return None
+    try:
+        return WD_PARAGRAPH_ALIGNMENT.from_xml(jc)
+    except (KeyError, ValueError):
+        return None
+
+
+def line_spacing(ppr: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """(倍数, 磅值)：lineRule=auto 时是倍数（line/240），exact / atLeast 时是磅值（line/20）。"""
+    line = ppr.get("line")
+    if line is None:
+        return None, None
+    if ppr.get("line_rule", "auto") == "auto":
+        return round(line / 240, 2), None
+    return None, round(line / 20, 1)
+
+
+# =========================
+# run 级格式：全局格式表 + 每段游程编码
+# 每种不同的有效 run 格式只存一次（snapshot["formats"]），段落里只存扁平的
+# [offset, length, fmt_id, offset, length, fmt_id, ...]（offset 相对 p["text"]，相邻同格式合并）；
+# 字符级规则先看格式表里有哪些格式违规，再只对这些 fmt_id 展开到段落。
+# =========================
+FORMAT_FIELDS = ("font_name", "size_pt", "bold", "italic", "caps", "color")
+
+
+class FormatTable:
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        self._ids: Dict[tuple, int] = {}
+
+    def intern(self, rpr: Dict[str, Any]) -> int:
+        key = tuple(rpr.get(f) for f in FORMAT_FIELDS)
+        fid = self._ids.get(key)
+        if fid is None:
+            fid = self._ids[key] = len(self.rows)
+            self.rows.append(dict(zip(FORMAT_FIELDS, key)))
+        return fid
+
+
+def encode_runs(texts_and_formats: Iterable[Tuple[str, int]], lead: int) -> List[int]:
+    """
+    [(run 文本, fmt_id), ...] -> 扁平游程；lead = 段首被 strip 掉的字符数。
+    纯空白 run 不单独成段（不参与格式检查），被前后同格式的游程吞并。
+    """
+    spans: List[int] = []
+    pos = -lead
+    for text, fid in texts_and_formats:
+        n = len(text)
+        if text.strip():
+            start = max(pos, 0)
+            end = pos + n
+            if spans and spans[-1] == fid:
+                spans[-2] = end - spans[-3]
+            else:
+                spans += [start, end - start, fid]
+        pos += n
+    return spans
+
+
+def iter_spans(p: dict) -> Iterator[Tuple[int, int, int]]:
+    """段落的游程 -> (offset, length, fmt_id)"""
+    spans = p.get("runs") or []
+    for k in range(0, len(spans), 3):
+        yield spans[k], spans[k + 1], spans[k + 2]
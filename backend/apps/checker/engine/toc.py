@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .docx_extractor import _norm_heading_key
+
+# =========================
+# СОДЕРЖАНИЕ <-> 正文标题 对账（5.4.1 toc_completeness）
+# - 解析目录行：标题 + 点引导线 + 页码
+# - 标题 key 用 _norm_heading_key 归一化后走 hash 索引（O(n)），
+#   只有没对上的少量条目才做编辑距离兜底（按长度分桶，避免 n×m）
+# - 输出缺失 / 多余 / 顺序错乱 / 页码不符
+# =========================
+
+_TOC_LINE_RE = re.compile(
+    r"^(?P<title>.*?\S)"
+    r"(?:[ \t]*[\.…·_]{2,}[ \t]*|\t+[ \t]*|[ \t]{2,})"
+    r"(?P<page>\d{1,4})\s*$"
+)
+
+FUZZY_RATIO = 0.2  # 允许的编辑距离 / 标题长度
+
+
+def parse_toc(paragraphs: List[dict], span: Tuple[int, int]) -> List[dict]:
+    entries: List[dict] = []
+    for pos in range(span[0], span[1]):
+        p = paragraphs[pos]
+        text = (p.get("text") or "").strip()
+        if not text:
+            continue
+        m = _TOC_LINE_RE.match(text)
+        title = m.group("title") if m else text
+        title = re.sub(r"[\s\.…·_]+$", "", title)
+        key = _norm_heading_key(title)
+        if not key:
+            continue
+        entries.append({
+            "pos": pos,
+            "idx": p.get("idx"),
+            "title": title,
+            "key": key,
+            "page": int(m.group("page")) if m else None,
+        })
+    return entries
+
+
+def _levenshtein(a: str, b: str, limit: int) -> int:
+    """带上限的编辑距离：超过 limit 提前返回 limit+1。"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def _lis_keep(seq: List[int]) -> set:
+    """最长递增子序列（O(n log n)），返回保留下来的下标集合。"""
+    tails: List[int] = []
+    tails_at: List[int] = []
+    parent: List[int] = [-1] * len(seq)
+    for i, v in enumerate(seq):
+        k = bisect_left(tails, v)
+        if k == len(tails):
+            tails.append(v)
+            tails_at.append(i)
+        else:
+            tails[k] = v
+            tails_at[k] = i
+        parent[i] = tails_at[k - 1] if k > 0 else -1
+    keep = set()
+    i = tails_at[-1] if tails_at else -1
+    while i != -1:
+        keep.add(i)
+        i = parent[i]
+    return keep
+
+
+def reconcile_toc(
+    entries: List[dict],
+    headings: List[dict],
+    page_map: Optional[Dict[int, int]] = None,
+) -> dict:
+    """
+    entries：parse_toc 结果；headings：[{"pos", "idx", "text"}]（正文标题，按文档顺序）
+    返回 matched / fuzzy / missing / extra / misordered / page_mismatch
+    """
+    index: Dict[str, List[int]] = {}
+    for hi, h in enumerate(headings):
+        index.setdefault(_norm_heading_key(h["text"]), []).append(hi)
+
+    used = [False] * len(headings)
+    match: Dict[int, int] = {}  # entry_i -> heading_i
+    unmatched: List[int] = []
+
+    # 1) 精确 key：hash 索引，同名标题按出现顺序依次消费
+    for ei, e in enumerate(entries):
+        bucket = index.get(e["key"])
+        if bucket:
+            hi = bucket.pop(0)
+            used[hi] = True
+            match[ei] = hi
+        else:
+            unmatched.append(ei)
+
+    # 2) 近似匹配：只在剩余条目 × 剩余标题之间做，按长度分桶
+    fuzzy: List[int] = []
+    if unmatched:
+        by_len: Dict[int, List[int]] = {}
+        for hi, h in enumerate(headings):
+            if not used[hi]:
+                by_len.setdefault(len(_norm_heading_key(h["text"])), []).append(hi)
+        still: List[int] = []
+        for ei in unmatched:
+            key = entries[ei]["key"]
+            limit = max(1, int(len(key) * FUZZY_RATIO))
+            best, best_d = None, limit + 1
+            for ln in range(len(key) - limit, len(key) + limit + 1):
+                for hi in by_len.get(ln, ()):
+                    if used[hi]:
+                        continue
+                    d = _levenshtein(key, _norm_heading_key(headings[hi]["text"]), limit)
+                    if d < best_d:
+                        best, best_d = hi, d
+            if best is None:
+                still.append(ei)
+            else:
+                used[best] = True
+                match[ei] = best
+                fuzzy.append(ei)
+        unmatched = still
+
+    # 3) 顺序：按目录顺序取对应标题的位置，不在 LIS 里的就是错位
+    ordered = sorted(match)
+    keep = _lis_keep([match[ei] for ei in ordered])
+    misordered = [ei for k, ei in enumerate(ordered) if k not in keep]
+
+    # 4) 页码（有 page_map 才校验）
+    page_mismatch: List[Tuple[int, int]] = []
+    if page_map:
+        for ei, hi in match.items():
+            expected = entries[ei].get("page")
+            actual = page_map.get(headings[hi]["idx"])
+            if expected is not None and actual is not None and expected != actual:
+                page_mismatch.append((ei, actual))
+
+    return {
+        "match": match,
+        "fuzzy": fuzzy,
+        "missing": [hi for hi in range(len(headings)) if not used[hi]],
+        "extra": unmatched,
+        "misordered": misordered,
+        "page_mismatch": sorted(page_mismatch),
+    }
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Set
+
+# =========================
+# 段落级规则的单遍访问器
+# 每条段落级规则是一个 handler：visit 逐段回调，finish 在遍历结束后出 issue。
+# walk 只遍历 snapshot["paragraphs"] 一次，每段依次调用关心它的 handler——
+# 再加一条段落规则只多一次函数调用，不多一遍全文扫描。
+# =========================
+
+
+class ParagraphHandler:
+    """
+    positions：只关心的段落下标（如结构标题候选）；None 表示每段都要看。
+    handler 自己记状态（超过定位上限时只计数），不要提前终止遍历。
+    """
+    positions: Optional[Set[int]] = None
+
+    def visit(self, pos: int, p: dict) -> None:
+        pass
+
+    def finish(self) -> List[dict]:
+        return []
+
+
+def walk(paragraphs: List[dict], handlers: List[ParagraphHandler]) -> None:
+    every: List[Callable[[int, dict], None]] = []
+    sparse: Dict[int, List[Callable[[int, dict], None]]] = {}
+    for h in handlers:
+        if h.positions is None:
+            every.append(h.visit)
+        else:
+            for pos in h.positions:
+                sparse.setdefault(pos, []).append(h.visit)
+
+    for pos, p in enumerate(paragraphs):
+        for visit in every:
+            visit(pos, p)
+        extra = sparse.get(pos)
+        if extra:
+            for visit in extra:
+                visit(pos, p)
@@ -0,0 +1,208 @@
+import io
+import unittest
+import zipfile
+from unittest import mock
+
+from docx import Document
+from lxml import etree
+
+from apps.checker.engine import chunked
+from apps.checker.engine.annotate import annotate_docx
+from apps.checker.engine.docx_extractor import extract_docx_snapshot
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = "{%s}" % W_NS
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "{extra}</Types>"
+)
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="word/document.xml"/></Relationships>'
+)
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>'
+)
+COMMENTS_REL = (
+    '<Relationship Id="rId7" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments" '
+    'Target="comments.xml"/>'
+)
+COMMENTS_OVERRIDE = (
+    '<Override PartName="/word/comments.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"/>'
+)
+EXISTING_COMMENTS = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:comments xmlns:w="{W_NS}">'
+    '<w:comment w:id="4" w:author="Рецензент"><w:p><w:r><w:t>Старое замечание</w:t></w:r></w:p></w:comment>'
+    "</w:comments>"
+)
+
+# 顶层段落 idx：0 普通 / 1 自闭合 <w:p/> / 2 带 pPrChange 嵌套 pPr / 3 空 <w:pPr/> / 4 最后一段；
+# sdt（目录）和表格里的段落不是顶层段落，不占 idx
+BODY = (
+    '<w:p><w:r><w:t>ВВЕДЕНИЕ</w:t></w:r></w:p>'
+    '<w:sdt><w:sdtPr><w:docPartObj><w:docPartGallery w:val="Table of Contents"/></w:docPartObj></w:sdtPr>'
+    '<w:sdtContent><w:p><w:r><w:t>СОДЕРЖАНИЕ</w:t></w:r></w:p>'
+    '<w:p><w:r><w:t>1 Раздел ... 3</w:t></w:r></w:p></w:sdtContent></w:sdt>'
+    "<w:p/>"
+    '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Ячейка</w:t></w:r></w:p>'
+    '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Вложенная</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+    "</w:tc></w:tr></w:tbl>"
+    '<w:p><w:pPr><w:jc w:val="center"/><w:pPrChange w:id="1" w:author="a" w:date="2024-01-01T00:00:00Z">'
+    '<w:pPr><w:jc w:val="left"/></w:pPr></w:pPrChange></w:pPr><w:r><w:t>Выровненный абзац</w:t></w:r></w:p>'
+    '<w:p><w:pPr/><w:r><w:t xml:space="preserve">Абзац с пустым pPr </w:t></w:r></w:p>'
+    '<w:p w:rsidR="00AB12CD"><w:r><w:t>Последний абзац</w:t></w:r></w:p>'
+)
+SECT = '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/></w:sectPr>'
+
+
+def make_docx(body: str = BODY, *, comments: bool = False) -> bytes:
+    document = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{W_NS}"><w:body>' \
+               f"{body}{SECT}</w:body></w:document>"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES.format(extra=COMMENTS_OVERRIDE if comments else ""))
+        zf.writestr("_rels/.rels", PACKAGE_RELS)
+        zf.writestr("word/document.xml", document)
+        zf.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS.format(rels=COMMENTS_REL if comments else ""))
+        if comments:
+            zf.writestr("word/comments.xml", EXISTING_COMMENTS)
+    return buf.getvalue()
+
+
+def top_paragraphs(docx: bytes):
+    with zipfile.ZipFile(io.BytesIO(docx)) as zf:
+        root = etree.fromstring(zf.read("word/document.xml"))
+    return list(root.find(W + "body").iterchildren(W + "p"))
+
+
+def comment_targets(docx: bytes) -> dict:
+    """批注 id -> 它所在的顶层段落 idx（commentRangeStart / End / Reference 必须在同一段落）"""
+    out = {}
+    for idx, p in enumerate(top_paragraphs(docx)):
+        for tag in ("commentRangeStart", "commentRangeEnd", "commentReference"):
+            for el in p.iter(W + tag):
+                out.setdefault(int(el.get(W + "id")), set()).add(idx)
+    return out
+
+
+def annotate(docx: bytes, findings) -> bytes:
+    out = io.BytesIO()
+    annotate_docx(docx, out, findings)
+    return out.getvalue()
+
+
+def finding(para_idx, rule_id="6.1.1", message="Замечание"):
+    return {"rule_id": rule_id, "severity": "HIGH", "message": message, "suggestion": "Исправьте.", "para_idx": para_idx}
+
+
+class AnnotateTests(unittest.TestCase):
+    def test_comments_land_on_snapshot_paragraphs(self):
+        src = make_docx()
+        snap = extract_docx_snapshot(src)
+        self.assertEqual([p["idx"] for p in snap["paragraphs"]], [0, 2, 3, 4])
+
+        findings = [finding(p["idx"], message=p["text"]) for p in snap["paragraphs"]]
+        out = annotate(src, findings)
+
+        targets = comment_targets(out)
+        self.assertEqual(targets, {n: {f["para_idx"]} for n, f in enumerate(findings)})
+        # 批注所在段落的文字就是 snapshot 里这个 idx 的文字
+        paras = top_paragraphs(out)
+        for f in findings:
+            text = "".join(t.text or "" for t in paras[f["para_idx"]].iter(W + "t")).strip()
+            self.assertEqual(text, f["message"])
+
+        # 重新解析：段落 idx / 文字不变，python-docx 能打开
+        again = extract_docx_snapshot(out)
+        self.assertEqual(
+            [(p["idx"], p["text"]) for p in again["paragraphs"]],
+            [(p["idx"], p["text"]) for p in snap["paragraphs"]],
+        )
+        self.assertEqual(len(Document(io.BytesIO(out)).paragraphs), len(top_paragraphs(src)))
+
+    def test_range_start_follows_paragraph_properties(self):
+        out = annotate(make_docx(), [finding(2), finding(3)])
+        paras = top_paragraphs(out)
+        for idx in (2, 3):
+            children = list(paras[idx])
+            self.assertEqual(children[0].tag, W + "pPr")
+            self.assertEqual(children[1].tag, W + "commentRangeStart")
+        # pPrChange 里的 pPr 原样保留
+        self.assertEqual(len(list(paras[2].iter(W + "pPrChange"))), 1)
+
+    def test_self_closing_paragraph(self):
+        out = annotate(make_docx(), [finding(1)])
+        self.assertEqual(comment_targets(out), {0: {1}})
+        self.assertEqual(len(top_paragraphs(out)), len(top_paragraphs(make_docx())))
+
+    def test_unlocated_findings_go_to_first_paragraph(self):
+        out = annotate(make_docx(), [finding(None), finding(999)])
+        self.assertEqual(comment_targets(out), {0: {0}, 1: {0}})
+
+    def test_new_package_gets_comments_part(self):
+        out = annotate(make_docx(), [finding(0)])
+        with zipfile.ZipFile(io.BytesIO(out)) as zf:
+            comments = etree.fromstring(zf.read("word/comments.xml"))
+            rels = zf.read("word/_rels/document.xml.rels")
+            types = zf.read("[Content_Types].xml")
+        self.assertEqual([c.get(W + "id") for c in comments], ["0"])
+        self.assertEqual(rels.count(b"relationships/comments"), 1)
+        self.assertEqual(types.count(b"/word/comments.xml"), 1)
+
+    def test_existing_comments_are_kept(self):
+        src = make_docx(comments=True)
+        out = annotate(src, [finding(0), finding(4)])
+        with zipfile.ZipFile(io.BytesIO(out)) as zf:
+            comments = etree.fromstring(zf.read("word/comments.xml"))
+            rels = zf.read("word/_rels/document.xml.rels")
+            types = zf.read("[Content_Types].xml")
+        self.assertEqual([c.get(W + "id") for c in comments], ["4", "5", "6"])
+        self.assertEqual(comment_targets(out), {5: {0}, 6: {4}})
+        self.assertEqual(rels.count(b"relationships/comments"), 1)
+        self.assertEqual(types.count(b"/word/comments.xml"), 1)
+        self.assertEqual(len(Document(io.BytesIO(out)).paragraphs), len(top_paragraphs(src)))
+
+
+class ChunkedParityTests(unittest.TestCase):
+    """分块并行提取和顺序提取结果一致（scan_body / split_chunks 只在顶层元素边界切）"""
+
+    def tearDown(self):
+        if chunked._POOL is not None:
+            chunked._POOL.shutdown()
+            chunked._POOL = None
+
+    def test_scan_body_counts_top_level_paragraphs(self):
+        with zipfile.ZipFile(io.BytesIO(make_docx())) as zf:
+            xml = zf.read("word/document.xml")
+        _, start, end, bounds = chunked.scan_body(xml)
+        # 顶层元素：p, sdt, p/, tbl, p, p, p
+        self.assertEqual(len(bounds), 7)
+        self.assertEqual(bounds[-1][1], len(top_paragraphs(make_docx())))
+        for n in (1, 2, 3, 7):
+            chunks = chunked.split_chunks(start, end, bounds, n)
+            self.assertEqual(chunks[0][0], start)
+            self.assertEqual(chunks[-1][1], end)
+            for (_, a_end, _), (b_start, _, _) in zip(chunks, chunks[1:]):
+                self.assertEqual(a_end, b_start)
+
+    def test_parallel_matches_sequential(self):
+        src = make_docx(BODY * 40)
+        sequential = extract_docx_snapshot(src)
+        with mock.patch.object(chunked, "PARALLEL_MIN_BYTES", 0), mock.patch.object(chunked, "MIN_CHUNK_BYTES", 1):
+            parallel = extract_docx_snapshot(src, workers=2)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(len(sequential["paragraphs"]), 4 * 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import unittest
+from pathlib import Path
+
+from docx import Document
+
+from apps.checker.engine.conditions import DocumentFacts
+from apps.checker.engine.docx_extractor import extract_docx_snapshot
+from apps.checker.engine.hard_rules import build_context, run_plan
+from apps.checker.engine.rule_loader import load_rules
+
+RUNTIME = Path(__file__).resolve().parents[1] / "standards" / "gost_7_32_2017.runtime.json"
+
+HEAD = ["Министерство науки и высшего образования Российской Федерации", "УТВЕРЖДАЮ", "Ректор ____ А.А. Смирнов",
+        "ОТЧЕТ О НАУЧНО-ИССЛЕДОВАТЕЛЬСКОЙ РАБОТЕ"]
+TAIL = ["Москва 2024", "РЕФЕРАТ", "Отчет 30 с., 2 рис., 1 табл., 10 источн.", "ВВЕДЕНИЕ", "Текст введения."]
+
+
+def snapshot(title_lines):
+    doc = Document()
+    for line in HEAD + title_lines + TAIL:
+        doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return extract_docx_snapshot(buf.getvalue())
+
+
+class AuthorCountTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.runtime = load_rules(str(RUNTIME))
+
+    def author_count(self, snap):
+        return DocumentFacts(snap, build_context(snap, self.runtime))["author_count"]
+
+    def rule_ids(self, snap):
+        return [i.get("rule_id") for i in run_plan(snap, self.runtime)]
+
+    def test_single_executor_title_page(self):
+        snap = snapshot(["Руководитель НИР, д-р техн. наук ____ Б.Б. Кузнецов",
+                         "Исполнитель, канд. техн. наук ____ В.В. Попов"])
+        self.assertEqual(self.author_count(snap), 1)
+        self.assertNotIn("5.2.1", self.rule_ids(snap))
+
+    def test_signature_on_next_line(self):
+        snap = snapshot(["Ответственный исполнитель", "____ В.В. Попов", "Исполнитель", "____ Г.Г. Соколов"])
+        self.assertEqual(self.author_count(snap), 2)
+        self.assertIn("5.2.1", self.rule_ids(snap))
+
+    def test_no_executor_line_is_undecidable(self):
+        snap = snapshot(["Руководитель НИР ____ Б.Б. Кузнецов"])
+        self.assertIsNone(self.author_count(snap))
+        self.assertNotIn("5.2.1", self.rule_ids(snap))
+
+    def test_label_before_another_role_is_not_a_signature(self):
+        snap = snapshot(["Исполнитель", "Руководитель НИР ____ Б.Б. Кузнецов"])
+        self.assertIsNone(self.author_count(snap))
+
+
+if __name__ == "__main__":
+    unittest.main()
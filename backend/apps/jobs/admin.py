@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import Job, JobEvent
+from .models import Job, JobEvent, Finding
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
+    # download_count / last_download_ok 直接读 Job 上的原子计数字段（事件是缓冲写入的，会有延迟）
     list_display = (
         "id",
         "status",
@@ -13,18 +14,16 @@ class JobAdmin(admin.ModelAdmin):
         "created_at",
     )
 
-    def download_count(self, obj):
-        return obj.events.filter(type="DOWNLOAD", ok=True).count()
-    download_count.short_description = "Downloads"
-
-    def last_download_ok(self, obj):
-        last = obj.events.filter(type__in=["DOWNLOAD", "DOWNLOAD_FAILED"]).first()
-        return last.ok if last else None
-    last_download_ok.boolean = True
-
 @admin.register(JobEvent)
 class JobEventAdmin(admin.ModelAdmin):
     list_display = ("created_at","type","ok","job","message")
     list_filter = ("type","ok")
     search_fields = ("job__id","message")
     readonly_fields = ("created_at",)
+
+
+@admin.register(Finding)
+class FindingAdmin(admin.ModelAdmin):
+    list_display = ("job", "seq", "severity", "category", "rule_id", "message")
+    list_filter = ("severity", "category")
+    search_fields = ("job__id", "rule_id", "message")
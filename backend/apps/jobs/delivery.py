@@ -0,0 +1,95 @@
+"""
+结果文件交付：
+- 强 ETag（结果文件 sha256）+ Last-Modified，条件请求直接 304
+- RESULT_DELIVERY=x-accel / x-sendfile 时只回响应头，文件由前置代理（nginx / apache / lighttpd）发送，
+  不占用 WSGI worker；默认 django 走 FileResponse
+"""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+
+from .models import Job
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def file_sha256(fh, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    for chunk in iter(lambda: fh.read(chunk_size), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def result_sha256(job: Job) -> str:
+    """结果 hash：优先用落库值；老数据没有就现算一次并回写。"""
+    if job.result_sha256:
+        return job.result_sha256
+    with job.result_file.open("rb") as fh:
+        digest = file_sha256(fh)
+    Job.objects.filter(id=job.id).update(result_sha256=digest)
+    job.result_sha256 = digest
+    return digest
+
+
+def result_last_modified(job: Job) -> Optional[datetime]:
+    try:
+        return job.result_file.storage.get_modified_time(job.result_file.name)
+    except (NotImplementedError, OSError):
+        return None
+
+
+def is_not_modified(request, etag: str, last_modified: Optional[datetime]) -> bool:
+    # RFC 9110：有 If-None-Match 时忽略 If-Modified-Since
+    inm = request.META.get("HTTP_IF_NONE_MATCH")
+    if inm:
+        tags = parse_etags(inm)
+        return "*" in tags or etag in tags
+
+    ims = request.META.get("HTTP_IF_MODIFIED_SINCE")
+    if ims and last_modified is not None:
+        since = parse_http_date_safe(ims)
+        return since is not None and int(last_modified.timestamp()) <= since
+    return False
+
+
+def _validators(response, etag: str, last_modified: Optional[datetime]):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # 结果文件内容固定（hash 不变），但仍要求客户端每次带条件请求回源校验
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]):
+    return _validators(HttpResponseNotModified(), etag, last_modified)
+
+
+def file_response(job: Job, fh, download_name: str, etag: str, last_modified: Optional[datetime]):
+    """按 RESULT_DELIVERY 构造下载响应；fh 只在 django 模式下被消费，其余模式直接关闭。"""
+    mode = getattr(settings, "RESULT_DELIVERY", "django")
+    content_type = mimetypes.guess_type(download_name)[0] or DOCX_CONTENT_TYPE
+
+    if mode == "x-accel":
+        fh.close()
+        prefix = getattr(settings, "RESULT_ACCEL_PREFIX", "/protected-media/").rstrip("/")
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(job.result_file.name)}"
+    elif mode == "x-sendfile":
+        fh.close()
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = job.result_file.path
+    else:
+        response = FileResponse(fh, as_attachment=True, filename=download_name, content_type=content_type)
+        return _validators(response, etag, last_modified)
+
+    response["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    return _validators(response, etag, last_modified)
@@ -0,0 +1,85 @@
+"""
+JobEvent 缓冲写入：下载这类高频事件不必每次单独 INSERT。
+先放进进程内队列，攒够 JOB_EVENT_BUFFER_SIZE 条或超过 JOB_EVENT_FLUSH_INTERVAL 秒后
+一次 bulk_create；进程退出时 atexit 兜底刷盘。
+JOB_EVENT_BUFFER_SIZE=1 等价于关闭缓冲（每条立即写入）。
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from .models import JobEvent
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    def __init__(self, max_size: int = 50, max_age: float = 2.0):
+        self.max_size = max(int(max_size), 1)
+        self.max_age = max(float(max_age), 0.0)
+        self._lock = threading.Lock()
+        self._pending: List[JobEvent] = []
+        self._first_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, **fields) -> None:
+        """入队一条事件；满批或超时则当场刷盘。"""
+        event = JobEvent(**fields)
+        batch = None
+        with self._lock:
+            self._pending.append(event)
+            now = time.monotonic()
+            if self._first_at is None:
+                self._first_at = now
+            if len(self._pending) >= self.max_size or now - self._first_at >= self.max_age:
+                batch = self._take()
+            elif self._timer is None:
+                # 流量停下来时也要落库：挂一个一次性定时器
+                self._timer = threading.Timer(self.max_age, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def _take(self) -> List[JobEvent]:
+        # 调用方持有锁
+        batch, self._pending = self._pending, []
+        self._first_at = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        finally:
+            # 定时器线程里打开的 DB 连接不会被请求周期回收，手动关掉
+            connection.close()
+
+    def _write(self, batch: List[JobEvent]) -> None:
+        try:
+            JobEvent.objects.bulk_create(batch)
+        except Exception:
+            # 事件只是审计数据，写失败不能影响下载本身
+            logger.exception("Failed to write %d job events", len(batch))
+
+
+download_events = EventBuffer(
+    max_size=getattr(settings, "JOB_EVENT_BUFFER_SIZE", 50),
+    max_age=getattr(settings, "JOB_EVENT_FLUSH_INTERVAL", 2.0),
+)
+atexit.register(download_events.flush)
@@ -0,0 +1,68 @@
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.checker.cli import resolve_rules
+from apps.checker.engine.reevaluate import format_report, run_reevaluation
+from apps.jobs.models import Job
+from apps.jobs.tasks import RUNTIME_RULESET_PATH
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run a candidate ruleset over the stored snapshots of past jobs and report, per rule, "
+        "how many findings are new, resolved or changed compared to the baseline ruleset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("candidate", help="candidate runtime.json or DSL .yaml")
+        parser.add_argument("--baseline", default=None,
+                            help="baseline runtime.json or DSL .yaml (default: the ruleset the service runs)")
+        parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+        parser.add_argument("--chunksize", type=int, default=8, help="snapshots handed to a worker at a time")
+        parser.add_argument("--job", action="append", default=[], help="only these job ids (repeatable)")
+        parser.add_argument("--since", default=None, help="only jobs created on/after this date (YYYY-MM-DD)")
+        parser.add_argument("--limit", type=int, default=None, help="only the N most recent jobs")
+        parser.add_argument("--samples", type=int, default=3, help="example findings listed per rule")
+        parser.add_argument("--json", dest="json_out", default=None, help="also write the full report as JSON")
+
+    def handle(self, *args, **opts):
+        candidate = resolve_rules(opts["candidate"])
+        baseline = resolve_rules(opts["baseline"] or str(RUNTIME_RULESET_PATH))
+
+        jobs = Job.objects.filter(status=Job.Status.DONE)
+        if opts["job"]:
+            jobs = jobs.filter(id__in=opts["job"])
+        if opts["since"]:
+            jobs = jobs.filter(created_at__date__gte=opts["since"])
+        jobs = jobs.order_by("-created_at")
+        if opts["limit"]:
+            jobs = jobs[: opts["limit"]]
+        # 同一批 job（过滤 / limit 之后）里再分有没有留档 snapshot
+        selected = list(jobs.values_list("id", "snapshot_file"))
+        items = [(str(jid), str(Path(settings.MEDIA_ROOT) / name)) for jid, name in selected if name]
+
+        if not items:
+            raise CommandError(f"no stored snapshots to re-evaluate ({len(selected)} matching finished jobs)")
+        self.stderr.write(
+            f"re-evaluating {len(items)} snapshots ({len(selected) - len(items)} matching finished jobs without one)"
+        )
+
+        def progress(n, total_items):
+            if n % 100 == 0 or n == total_items:
+                self.stderr.write(f"  {n}/{total_items}")
+
+        report = run_reevaluation(
+            items, baseline, candidate,
+            jobs=opts["jobs"] or os.cpu_count() or 1, chunksize=opts["chunksize"],
+            samples=opts["samples"], progress=progress,
+        )
+        self.stdout.write(format_report(report, show_samples=opts["samples"] > 0))
+        if opts["json_out"]:
+            with open(opts["json_out"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if report["errors"]:
+            raise CommandError(f"{len(report['errors'])} snapshots could not be re-evaluated")
@@ -0,0 +1,129 @@
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from apps.checker.engine.profiling import BUCKETS
+from .models import JobEvent
+
+# =========================
+# GET /metrics（Prometheus 文本格式）
+# 数据源是 JobEvent.meta["profile"]（worker 进程写入），web 进程按事件 id 增量累加：
+# 聚合结果连同 last_id 放在 Django cache 里，每次抓取只读新增事件。
+# =========================
+
+PROFILED_EVENTS = (
+    JobEvent.Type.CHECK_DONE,
+    JobEvent.Type.CHECK_FAILED,
+    JobEvent.Type.RESULT_RENDERED,
+)
+
+_CACHE_KEY = "jobs:metrics:v1"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _empty() -> dict:
+    return {"last_id": 0, "events": {}, "series": {}}
+
+
+def _merge(series: dict, key: str, st: dict):
+    cur = series.get(key)
+    if cur is None:
+        cur = series[key] = {"n": 0, "wall": 0.0, "cpu": 0.0, "alloc": 0, "buckets": [0] * (len(BUCKETS) + 1)}
+    cur["n"] += int(st.get("n", 0))
+    cur["wall"] += float(st.get("wall", 0.0))
+    cur["cpu"] += float(st.get("cpu", 0.0))
+    cur["alloc"] += int(st.get("alloc", 0))
+    buckets = st.get("buckets") or []
+    if len(buckets) == len(cur["buckets"]):
+        cur["buckets"] = [a + b for a, b in zip(cur["buckets"], buckets)]
+
+
+def aggregate() -> dict:
+    agg = cache.get(_CACHE_KEY) or _empty()
+    qs = (
+        JobEvent.objects.filter(id__gt=agg["last_id"], type__in=PROFILED_EVENTS)
+        .order_by("id")
+        .values_list("id", "type", "meta")
+    )
+    for event_id, etype, meta in qs.iterator(chunk_size=500):
+        agg["last_id"] = event_id
+        agg["events"][etype] = agg["events"].get(etype, 0) + 1
+        prof = (meta or {}).get("profile")
+        if not prof:
+            continue
+        # 桶边界变过的旧数据只计 sum/count，不进直方图
+        same_buckets = list(prof.get("buckets") or []) == list(BUCKETS)
+        for kind, label in (("stages", "stage"), ("ops", "op")):
+            for name, st in (prof.get(kind) or {}).items():
+                _merge(agg["series"], f"{label}|{name}", st if same_buckets else {**st, "buckets": None})
+        wall = float(prof.get("wall") or 0.0)
+        _merge(agg["series"], f"job|{etype}", {"n": 1, "wall": wall, "buckets": _one_hot(wall)})
+    cache.set(_CACHE_KEY, agg, None)
+    return agg
+
+
+def _one_hot(value: float) -> list:
+    out = [0] * (len(BUCKETS) + 1)
+    out[bisect_left(BUCKETS, value)] = 1
+    return out
+
+
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram(lines: list, metric: str, label: str, items: list):
+    lines.append(f"# TYPE {metric} histogram")
+    for name, st in items:
+        lbl = f'{label}="{_esc(name)}"'
+        acc = 0
+        for bound, cnt in zip(BUCKETS, st["buckets"]):
+            acc += cnt
+            lines.append(f'{metric}_bucket{{{lbl},le="{bound}"}} {acc}')
+        lines.append(f'{metric}_bucket{{{lbl},le="+Inf"}} {st["n"]}')
+        lines.append(f"{metric}_sum{{{lbl}}} {st['wall']:.6f}")
+        lines.append(f"{metric}_count{{{lbl}}} {st['n']}")
+
+
+def _counter(lines: list, metric: str, label: str, items: list, field: str, mtype: str = "counter"):
+    lines.append(f"# TYPE {metric} {mtype}")
+    for name, st in items:
+        lines.append(f'{metric}{{{label}="{_esc(name)}"}} {st[field]}')
+
+
+def render(agg: dict) -> str:
+    by_kind: dict = {"stage": [], "op": [], "job": []}
+    for key, st in sorted(agg["series"].items()):
+        kind, name = key.split("|", 1)
+        by_kind.setdefault(kind, []).append((name, st))
+
+    lines: list = []
+    lines.append("# HELP gost_job_events_total Profiled job events by type.")
+    lines.append("# TYPE gost_job_events_total counter")
+    for etype, n in sorted(agg["events"].items()):
+        lines.append(f'gost_job_events_total{{type="{_esc(etype)}"}} {n}')
+
+    lines.append("# HELP gost_job_duration_seconds Wall time of a check / render run.")
+    _histogram(lines, "gost_job_duration_seconds", "event", by_kind["job"])
+
+    for kind in ("stage", "op"):
+        items = by_kind[kind]
+        lines.append(f"# HELP gost_{kind}_duration_seconds Wall time per {kind}.")
+        _histogram(lines, f"gost_{kind}_duration_seconds", kind, items)
+        lines.append(f"# HELP gost_{kind}_cpu_seconds_total CPU time per {kind}.")
+        _counter(lines, f"gost_{kind}_cpu_seconds_total", kind, [(n, {**s, "cpu": round(s["cpu"], 6)}) for n, s in items], "cpu")
+        if any(s["alloc"] for _, s in items):
+            # 净分配可以为负（阶段内释放多于分配），所以是 gauge 而不是 counter
+            lines.append(f"# HELP gost_{kind}_alloc_net_bytes Summed net allocation per {kind} (JOB_PROFILE_ALLOC=1).")
+            _counter(lines, f"gost_{kind}_alloc_net_bytes", kind, items, "alloc", mtype="gauge")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(render(aggregate()), content_type=CONTENT_TYPE)
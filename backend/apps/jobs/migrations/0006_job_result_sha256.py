@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_job_original_filename'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='result_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
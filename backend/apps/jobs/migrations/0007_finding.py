@@ -0,0 +1,40 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_job_result_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Finding',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('rule_id', models.CharField(blank=True, default='', max_length=64)),
+                ('clause', models.CharField(blank=True, default='', max_length=32)),
+                ('severity', models.CharField(max_length=16)),
+                ('category', models.CharField(blank=True, default='', max_length=32)),
+                ('message', models.TextField()),
+                ('suggestion', models.TextField(blank=True, default='')),
+                ('anchor', models.CharField(blank=True, default='', max_length=255)),
+                ('para_idx', models.IntegerField(blank=True, null=True)),
+                ('snippet', models.TextField(blank=True, default='')),
+                ('text_hash', models.CharField(blank=True, default='', max_length=16)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='findings', to='jobs.job')),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['job', 'severity', 'seq'], name='jobs_findin_job_id_20c5f8_idx'), models.Index(fields=['job', 'rule_id', 'seq'], name='jobs_findin_job_id_0d8c35_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='finding',
+            constraint=models.UniqueConstraint(fields=('job', 'seq'), name='uniq_finding_job_seq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_finding'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobevent',
+            name='type',
+            field=models.CharField(choices=[('UPLOAD', 'Upload'), ('CHECK_START', 'Check Start'), ('CHECK_DONE', 'Check Done'), ('CHECK_FAILED', 'Check Failed'), ('AI_BACKFILL', 'Ai Backfill'), ('DOWNLOAD', 'Download'), ('DOWNLOAD_FAILED', 'Download Failed')], max_length=32),
+        ),
+    ]
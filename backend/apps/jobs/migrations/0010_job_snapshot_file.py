@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_jobevent_result_rendered'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='snapshot_file',
+            field=models.FileField(blank=True, null=True, upload_to=''),
+        ),
+    ]
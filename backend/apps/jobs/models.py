@@ -51,10 +51,13 @@ class Job(models.Model):
     progress = models.PositiveSmallIntegerField(default=0)
 
     ai_mode = models.CharField(max_length=16, default="NONE")     # NONE | AI_DIRECT | HYBRID
-    provider = models.CharField(max_length=16, default="NONE")    # GPT | DEEPSEEK | QWEN | NONE
+    provider = models.CharField(max_length=16, default="NONE")    # GPT | DEEPSEEK | QWEN | STUB | NONE
     original_filename = models.CharField(max_length=255, blank=True, default="")
     uploaded_file = models.FileField(upload_to=uploads_path)
     result_file = models.FileField(upload_to=results_path, null=True, blank=True)
+    result_sha256 = models.CharField(max_length=64, blank=True, default="")  # ETag 来源
+    # 解析结果（gzip JSON）：manage.py reevaluate 在它上面重跑新规则集，不用重新解析 docx
+    snapshot_file = models.FileField(null=True, blank=True)
 
     error_message = models.TextField(null=True, blank=True)
 
@@ -74,6 +77,8 @@ class JobEvent(models.Model):
         CHECK_START = "CHECK_START"
         CHECK_DONE = "CHECK_DONE"
         CHECK_FAILED = "CHECK_FAILED"
+        AI_BACKFILL = "AI_BACKFILL"
+        RESULT_RENDERED = "RESULT_RENDERED"
         DOWNLOAD = "DOWNLOAD"
         DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
 
@@ -90,3 +95,69 @@ class JobEvent(models.Model):
     def __str__(self):
         return f"{self.created_at} {self.job_id} {self.type} ok={self.ok}"
 
+
+
+class Finding(models.Model):
+    """
+    结构化检查结果（一条 issue 一行），供 /api/jobs/<id>/findings 直接分页读取，
+    不需要下载/解析结果 docx。seq = 规则执行产出顺序，也是游标分页的排序键。
+    """
+    job = models.ForeignKey("Job", on_delete=models.CASCADE, related_name="findings")
+    seq = models.PositiveIntegerField()
+    rule_id = models.CharField(max_length=64, blank=True, default="")
+    clause = models.CharField(max_length=32, blank=True, default="")
+    severity = models.CharField(max_length=16)
+    category = models.CharField(max_length=32, blank=True, default="")
+    message = models.TextField()
+    suggestion = models.TextField(blank=True, default="")
+    anchor = models.CharField(max_length=255, blank=True, default="")
+    para_idx = models.IntegerField(null=True, blank=True)
+    snippet = models.TextField(blank=True, default="")
+    text_hash = models.CharField(max_length=16, blank=True, default="")
+
+    class Meta:
+        ordering = ["seq"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "seq"], name="uniq_finding_job_seq"),
+        ]
+        indexes = [
+            models.Index(fields=["job", "severity", "seq"]),
+            models.Index(fields=["job", "rule_id", "seq"]),
+        ]
+
+    @classmethod
+    def from_issue(cls, job_id, seq: int, issue: dict) -> "Finding":
+        """run_rule 产出的 issue dict -> Finding（未保存，配合 bulk_create）。"""
+        return cls(
+            job_id=job_id,
+            seq=seq,
+            rule_id=str(issue.get("rule_id") or ""),
+            clause=str(issue.get("clause") or ""),
+            severity=str(issue.get("severity") or "NEED_REVIEW"),
+            category=str(issue.get("category") or ""),
+            message=str(issue.get("message") or ""),
+            suggestion=str(issue.get("suggestion") or ""),
+            anchor=str(issue.get("anchor") or "")[:255],
+            para_idx=issue.get("para_idx"),
+            snippet=str(issue.get("snippet") or ""),
+            text_hash=str(issue.get("text_hash") or ""),
+        )
+
+    def to_issue(self) -> dict:
+        """Finding -> issue dict（result_writer 等引擎侧消费的格式）。"""
+        return {
+            "page": "?",
+            "severity": self.severity,
+            "category": self.category or None,
+            "rule_id": self.rule_id or None,
+            "clause": self.clause or None,
+            "message": self.message,
+            "suggestion": self.suggestion,
+            "anchor": self.anchor or None,
+            "para_idx": self.para_idx,
+            "snippet": self.snippet or None,
+            "text_hash": self.text_hash or None,
+        }
+
+    def __str__(self):
+        return f"{self.job_id} #{self.seq} {self.severity} {self.rule_id}"
@@ -6,11 +6,11 @@ class JobCreateSerializer(serializers.ModelSerializer):
     POST /api/jobs
     - uploaded_file: 只允许 docx
     - ai_mode: NONE | AI_DIRECT | HYBRID
-    - provider: NONE | GPT | DEEPSEEK | QWEN
+    - provider: NONE | GPT | DEEPSEEK | QWEN | STUB（本地确定性实现，离线/压测用）
     """
     uploaded_file = serializers.FileField(write_only=True)
     ai_mode = serializers.ChoiceField(choices=["NONE", "AI_DIRECT", "HYBRID"], default="NONE")
-    provider = serializers.ChoiceField(choices=["NONE", "GPT", "DEEPSEEK", "QWEN"], default="NONE")
+    provider = serializers.ChoiceField(choices=["NONE", "GPT", "DEEPSEEK", "QWEN", "STUB"], default="NONE")
 
     class Meta:
         model = Job
@@ -33,3 +33,20 @@ class JobDownloadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
         fields = ("id", "result_file")
+
+
+class FindingSerializer(serializers.Serializer):
+    """
+    GET /api/jobs/<id>/findings
+    只读、字段平铺的轻量序列化（不走 ModelSerializer 的字段推断/校验）
+    """
+    seq = serializers.IntegerField()
+    rule_id = serializers.CharField()
+    clause = serializers.CharField()
+    severity = serializers.CharField()
+    category = serializers.CharField()
+    message = serializers.CharField()
+    suggestion = serializers.CharField()
+    anchor = serializers.CharField()
+    para_idx = serializers.IntegerField(allow_null=True)
+    snippet = serializers.CharField()
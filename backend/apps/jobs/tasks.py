@@ -1,23 +1,33 @@
+import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
 from celery import shared_task
 from django.conf import settings
-from django.db import close_old_connections
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
 from pathlib import Path
 from django.utils import timezone
 from apps.checker.engine.word_to_pdf import docx_to_pdf
-from apps.jobs.models import Job
+from apps.jobs.models import Job, Finding
 from apps.checker.engine.rule_loader import load_rules
 from apps.checker.engine.docx_extractor import extract_docx_snapshot
-from apps.checker.engine.hard_rules import run_hard_rules, run_rule
+from apps.checker.engine.hard_rules import build_context, run_hard_rules, run_plan, run_rule
 from apps.checker.engine.result_writer import write_result
+from apps.checker.engine.snapshot_store import load_snapshot, save_snapshot
+from apps.checker.engine import profiling, semantic
 from .models import JobEvent
+from .delivery import file_sha256
+
 
 
+logger = logging.getLogger(__name__)
 
 RUNTIME_RULESET_PATH = (
     settings.BASE_DIR / "apps" / "checker" / "standards" / "gost_7_32_2017.runtime.json"
 )
 
-def _set_progress(job_id, progress=None, status=None, error=None, result_file=None):
+def _set_progress(job_id, progress=None, status=None, error=None, result_file=None, result_sha256=None):
     update = {}
 
     if progress is not None:
@@ -30,6 +40,8 @@ def _set_progress(job_id, progress=None, status=None, error=None, result_file=No
     # ✅ 这里必须叫 result_file，因为 model 字段就是 result_file
     if result_file is not None:
         update["result_file"] = result_file
+    if result_sha256 is not None:
+        update["result_sha256"] = result_sha256
 
     if update:
         Job.objects.filter(id=job_id).update(**update)
@@ -38,6 +50,30 @@ def _set_progress(job_id, progress=None, status=None, error=None, result_file=No
     result_file 传相对 MEDIA_ROOT 的路径，如：results/xxx.docx
     """
 
+def _save_findings(job_id, issues: list[dict]):
+    with transaction.atomic():
+        Finding.objects.filter(job_id=job_id).delete()
+        Finding.objects.bulk_create(
+            [Finding.from_issue(job_id, seq, issue) for seq, issue in enumerate(issues)],
+            batch_size=500,
+        )
+
+def _semantic_provider(job):
+    """AI_DIRECT / HYBRID 且 provider 配好了才返回；否则语义规则走人工复核占位。"""
+    if job.ai_mode not in ("AI_DIRECT", "HYBRID"):
+        return None
+    common = {
+        "timeout": settings.AI_REQUEST_TIMEOUT,
+        "rules_per_call": settings.AI_RULES_PER_CALL,
+        "chunk_chars": settings.AI_CHUNK_CHARS,
+    }
+    config = {name: {**common, **opts} for name, opts in settings.AI_PROVIDERS.items()}
+    try:
+        return semantic.get_provider(job.provider, config)
+    except ValueError as exc:
+        logger.warning("job %s: semantic review disabled: %s", job.id, exc)
+        return None
+
 # def _to_media_relative(path_str: str) -> str:
 #     media_root = str(settings.MEDIA_ROOT).rstrip("/") + "/"
 #     p = str(path_str)
@@ -50,83 +86,224 @@ def run_check_job(self, job_id: str):
 
     # 起始事件 + 起始状态
     JobEvent.objects.create(job=job, type=JobEvent.Type.CHECK_START, ok=True, message="Check started")
-    _set_progress(job.id, progress=0, status=Job.Status.RUNNING, error=None, result_file=None)
+    # result_file 置空：重跑时不能把旧结果当缓存发出去
+    _set_progress(job.id, progress=0, status=Job.Status.RUNNING, error=None, result_file="", result_sha256="")
+
+    # 各阶段 / 各 op 的耗时，随 CHECK_DONE 事件存入 meta["profile"]（/metrics 从这里聚合）
+    prof = profiling.Profiler(trace_alloc=getattr(settings, "JOB_PROFILE_ALLOC", False))
+    with prof.activate():
+        try:
+            # 阶段 1：读取规则（10%）
+            with prof.stage("load_rules"):
+                runtime = load_rules(str(RUNTIME_RULESET_PATH))
+            _set_progress(job.id, progress=10)
+
+            # 阶段 2：解析 docx（20%）
+            doc_path = job.uploaded_file.path
+            with prof.stage("extract"):
+                snap = extract_docx_snapshot(doc_path, workers=settings.EXTRACT_WORKERS)
+            if getattr(settings, "JOB_KEEP_SNAPSHOT", True):
+                # 留档：规则集改了以后 manage.py reevaluate 直接在 snapshot 上重跑
+                with prof.stage("save_snapshot"):
+                    snapshot_rel = save_snapshot(settings.MEDIA_ROOT, str(job.id), snap)
+                Job.objects.filter(id=job.id).update(snapshot_file=snapshot_rel)
+            # result_rel = write_result(settings.MEDIA_ROOT, str(job.id), issues, snapshot=snap)
+            # 章节索引 + scope 区间：每个 job 只建一次，所有规则共用
+            with prof.stage("context"):
+                ctx = build_context(snap, runtime)
+
+            _set_progress(job.id, progress=20)
+
+            # 语义规则交给 AI provider（没有 provider 时仍由 run_rule 给人工复核占位）
+            provider = _semantic_provider(job)
+            sem_rules = semantic.semantic_rules(runtime) if provider else []
+
+            # HYBRID：章节索引一有就把 AI 请求提交到后台线程，和下面的硬规则并行
+            sem_pending = None
+            if sem_rules and job.ai_mode == "HYBRID":
+                sem_tasks, sem_pending = semantic.submit_review(
+                    snap, ctx, sem_rules, provider, cache=cache, cache_ttl=settings.AI_CACHE_TTL
+                )
+                sem_deadline = time.monotonic() + settings.AI_HYBRID_DEADLINE
+
+            # 阶段 3：按编译好的执行计划跑规则（20% -> 90%，按 10% 刷新）
+            next_tick = [30]  # 30/40/.../90
+
+            def on_rule(done, total):
+                percent = 20 + int((done / total) * 70)  # 20..90
+                if percent >= next_tick[0]:
+                    _set_progress(job.id, progress=next_tick[0])
+                    next_tick[0] += 10
+
+            if runtime.get("rules"):
+                skip_ops = (semantic.SEMANTIC_OP,) if sem_rules else ()
+                with prof.stage("rules"):
+                    issues = run_plan(snap, runtime, ctx, skip_ops=skip_ops, on_rule=on_rule)
+                _set_progress(job.id, progress=90)
+            else:
+                # 兜底：无规则也给 MVP 输出
+                issues = run_hard_rules(runtime, snap)
+                _set_progress(job.id, progress=90)
+
+            backfill = False
+            if sem_pending is not None:
+                # HYBRID：这里只剩等待时间（AI 和硬规则重叠的部分不计入）
+                with prof.stage("semantic_wait"):
+                    try:
+                        issues.extend(sem_pending.result(timeout=max(0.0, sem_deadline - time.monotonic())))
+                    except FutureTimeout:
+                        # 不等了：先占位完成 job，AI 结果由 backfill_semantic_review 回填
+                        issues.extend(semantic.pending_placeholders(sem_tasks, provider))
+                        backfill = True
+            elif sem_rules:
+                with prof.stage("semantic"):
+                    issues.extend(semantic.review(snap, ctx, sem_rules, provider, cache=cache, cache_ttl=settings.AI_CACHE_TTL))
+
+            # 结构化结果落库（重跑时先清掉旧的）
+            with prof.stage("save_findings"):
+                _save_findings(job.id, issues)
+
+            # 阶段 4：结果 docx 改为延迟渲染（见 render_result）；eager 模式保持旧行为
+            JobEvent.objects.create(
+                job=job, type=JobEvent.Type.CHECK_DONE, ok=True, message="Check done",
+                meta={"profile": prof.breakdown()},
+            )
+            _set_progress(job.id, progress=100, status=Job.Status.DONE)
+            _schedule_render(job.id)
+
+            if backfill:
+                # 晚一个请求超时再回填：后台线程里还在飞的请求那时已结束并写入缓存，回填基本只读缓存
+                backfill_semantic_review.apply_async(args=[str(job.id)], countdown=int(settings.AI_REQUEST_TIMEOUT))
+
+        except Exception as exc:
+            error_msg = f"{type(exc).__name__}: {exc}"
+            JobEvent.objects.create(
+                job=job, type=JobEvent.Type.CHECK_FAILED, ok=False, message=error_msg,
+                meta={"profile": prof.breakdown()},
+            )
+            _set_progress(job.id, status=Job.Status.FAILED, error=error_msg, progress=100)
+            raise
+        finally:
+            close_old_connections()
+
+
+def _schedule_render(job_id):
+    render_mode = getattr(settings, "RESULT_RENDER_MODE", "lazy")
+    if render_mode == "eager":
+        render_result(job_id)
+    elif render_mode == "background":
+        # redis broker：priority 9 = 最低优先级，不和检查任务抢 worker
+        render_result_job.apply_async(args=[str(job_id)], priority=9)
+
+
+def render_result(job_id) -> Job:
+    """
+    从 Finding 渲染结果 docx 并缓存到 job.result_file（首次下载 / 后台任务触发）。
+    行锁串行化：并发的首次下载只渲染一次，后到的直接拿缓存。
+    """
+    with transaction.atomic():
+        job = Job.objects.select_for_update().get(id=job_id)
+        if job.result_file:
+            return job
 
+        prof = profiling.Profiler(trace_alloc=getattr(settings, "JOB_PROFILE_ALLOC", False))
+        with prof.activate():
+            with prof.stage("load_findings"):
+                issues = [f.to_issue() for f in Finding.objects.filter(job_id=job.id).order_by("seq")]
+            with prof.stage("render"):
+                result_rel = write_result(settings.MEDIA_ROOT, str(job.id), issues)
+
+            # 结果 hash：下载时作为强 ETag
+            with prof.stage("hash"), open(Path(settings.MEDIA_ROOT) / result_rel, "rb") as fh:
+                result_hash = file_sha256(fh)
+
+        # 落库就用相对路径（FileField 存 name）
+        _set_progress(job.id, result_file=result_rel, result_sha256=result_hash)
+        job.result_file.name = result_rel
+        job.result_sha256 = result_hash
+        JobEvent.objects.create(
+            job=job, type=JobEvent.Type.RESULT_RENDERED, ok=True, message="Result rendered",
+            meta={"profile": prof.breakdown()},
+        )
+    return job
+
+
+@shared_task(ignore_result=True)
+def render_result_job(job_id: str):
+    close_old_connections()
     try:
-        # 阶段 1：读取规则（10%）
-        runtime = load_rules(str(RUNTIME_RULESET_PATH))
-        _set_progress(job.id, progress=10)
-
-        # 阶段 2：解析 docx（20%）
-        doc_path = job.uploaded_file.path
-        snap = extract_docx_snapshot(doc_path)
-        # result_rel = write_result(settings.MEDIA_ROOT, str(job.id), issues, snapshot=snap)
-
-        _set_progress(job.id, progress=20)
-
-        # 阶段 3：执行规则（20% -> 90%，按 10% 刷新）
-        rules = runtime.get("rules", []) or []
-        total = max(len(rules), 1)
-
-        issues: list[dict] = []
-        next_tick = 30  # 30/40/.../90
-
-        if rules:
-            for idx, rule in enumerate(rules, start=1):
-                try:
-                    issues.extend(run_rule(snap, rule))
-                except Exception as rule_exc:
-                    # 单条规则失败：不影响全局（降级一条 issue）
-                    issues.append({
-                        "page": "?",
-                        "severity": "NEED_REVIEW",
-                        "category": "ENGINE",
-                        "message": f"Rule {rule.get('id', '?')} failed: {rule_exc}",
-                        "suggestion": "Проверьте правило/реализацию или отметьте для ручной проверки.",
-                    })
-
-                percent = 20 + int((idx / total) * 70)  # 20..90
-                if percent >= next_tick:
-                    _set_progress(job.id, progress=next_tick)
-                    next_tick += 10
-
-            _set_progress(job.id, progress=90)
-        else:
-            # 兜底：无规则也给 MVP 输出
-            issues = run_hard_rules(runtime, snap)
-            _set_progress(job.id, progress=90)
-
-        # 阶段 4：写结果 docx（100%）
-        # result_abs_path = Path(write_result(settings.MEDIA_ROOT, str(job.id), issues))
-        # media_root = Path(settings.MEDIA_ROOT)
-        # result_abs_path = Path(write_result(settings.MEDIA_ROOT, str(job.id), issues))
-        # media_root = Path(settings.MEDIA_ROOT)
-        # try:
-        #     result_rel_path = result_abs_path.relative_to(media_root)
-        # except ValueError:
-        #     results_dir = media_root / "results"
-        #     results_dir.mkdir(parents=True, exist_ok=True)
-        #     forced = results_dir / result_abs_path.name
-        #     if result_abs_path.exists() and forced.resolve() != result_abs_path.resolve():
-        #         forced.write_bytes(result_abs_path.read_bytes())
-        #     result_rel_path = forced.relative_to(media_root)
-        result_rel = write_result(
-            settings.MEDIA_ROOT,
-            str(job.id),
-            issues,
-            snapshot=snap,   # ✅ 关键：把 anchor_map 输出到结果里
+        job = Job.objects.only("id", "status").get(id=job_id)
+        if job.status == Job.Status.DONE:
+            render_result(job.id)
+    finally:
+        close_old_connections()
+
+
+def _replace_pending(job_id, issues: list[dict]) -> int:
+    """AI_PENDING 占位行按 rule_id 原位（同一 seq）替换为最终结论；通过的规则直接删掉占位。"""
+    by_rule = {str(i.get("rule_id")): i for i in issues}
+    with transaction.atomic():
+        rows = list(
+            Finding.objects.select_for_update()
+            .filter(job_id=job_id, category=semantic.PENDING_CATEGORY)
+            .order_by("seq")
         )
+        if not rows:
+            return 0
+        Finding.objects.filter(id__in=[r.id for r in rows]).delete()
+        Finding.objects.bulk_create([
+            Finding.from_issue(job_id, r.seq, by_rule[r.rule_id]) for r in rows if r.rule_id in by_rule
+        ])
+        # findings 变了：已渲染的结果 docx / ETag 作废
+        _set_progress(job_id, result_file="", result_sha256="")
+    return len(rows)
 
-        # 落库就用相对路径（FileField 存 name）
-        JobEvent.objects.create(job=job, type=JobEvent.Type.CHECK_DONE, ok=True, message="Check done")
-        _set_progress(job.id, progress=100, status=Job.Status.DONE, result_file=result_rel)
-        # JobEvent.objects.create(job=job, type=JobEvent.Type.CHECK_DONE, ok=True, message="Check done")
-        # _set_progress(job.id, progress=100, status=Job.Status.DONE, result_file=str(result_rel_path))
 
+def _job_snapshot(job) -> dict:
+    """留档的 snapshot 优先（省一次 docx 解析）；没有或读不出来就重新解析。"""
+    if job.snapshot_file:
+        try:
+            return load_snapshot(job.snapshot_file.path)
+        except (OSError, ValueError) as exc:
+            logger.warning("job %s: stored snapshot unreadable, re-extracting: %s", job.id, exc)
+    return extract_docx_snapshot(job.uploaded_file.path, workers=settings.EXTRACT_WORKERS)
+
+
+@shared_task(ignore_result=True)
+def backfill_semantic_review(job_id: str):
+    """HYBRID 超时后的回填：只重跑还在占位的语义规则（无截止时间），替换占位 finding。"""
+    close_old_connections()
+    try:
+        job = Job.objects.get(id=job_id)
+        pending = set(
+            Finding.objects.filter(job_id=job.id, category=semantic.PENDING_CATEGORY).values_list("rule_id", flat=True)
+        )
+        if not pending:
+            return
+
+        runtime = load_rules(str(RUNTIME_RULESET_PATH))
+        rules = [r for r in semantic.semantic_rules(runtime) if str(r.get("id")) in pending]
+        snap = _job_snapshot(job)
+        ctx = build_context(snap, runtime)
+
+        provider = _semantic_provider(job)
+        if provider is not None:
+            issues = semantic.review(snap, ctx, rules, provider, cache=cache, cache_ttl=settings.AI_CACHE_TTL)
+        else:
+            # provider 配置被撤掉了：退回人工复核占位
+            issues = [i for rule in rules for i in run_rule(snap, rule, ctx)]
+
+        replaced = _replace_pending(job.id, issues)
+        JobEvent.objects.create(
+            job=job, type=JobEvent.Type.AI_BACKFILL, ok=True,
+            message=f"Semantic review back-filled ({replaced} placeholders)",
+            meta={"rules": sorted(pending), "provider": job.provider},
+        )
+        _schedule_render(job.id)
     except Exception as exc:
-        error_msg = f"{type(exc).__name__}: {exc}"
-        JobEvent.objects.create(job=job, type=JobEvent.Type.CHECK_FAILED, ok=False, message=error_msg)
-        _set_progress(job.id, status=Job.Status.FAILED, error=error_msg, progress=100)
+        JobEvent.objects.create(
+            job_id=job_id, type=JobEvent.Type.AI_BACKFILL, ok=False, message=f"{type(exc).__name__}: {exc}"
+        )
         raise
     finally:
-        close_old_connections()
\ No newline at end of file
+        close_old_connections()
@@ -1,13 +1,27 @@
 import os
+import tempfile
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import FileResponse, Http404
+from rest_framework.pagination import CursorPagination
+from django.conf import settings
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-
-from .models import Job, JobEvent
-from .serializers import JobCreateSerializer, JobStatusSerializer
-from .tasks import run_check_job
+from django.db.models import F
+
+from .models import Job, JobEvent, Finding
+from .serializers import JobCreateSerializer, JobStatusSerializer, FindingSerializer
+from .events import download_events
+from .delivery import (
+    file_response,
+    is_not_modified,
+    not_modified_response,
+    result_last_modified,
+    result_sha256,
+)
+from .tasks import run_check_job, render_result
+from apps.checker.engine.exporters import EXPORTERS, get_exporter
+from apps.checker.engine.annotate import annotate_docx
 
 from django.utils import timezone
 import logging
@@ -48,83 +62,165 @@ class JobStatusView(APIView):
         return Response(serializer.data)
 
 
+class FindingCursorPagination(CursorPagination):
+    # 按 seq 游标翻页：(job, seq) 有唯一索引，深翻页也是索引范围扫描
+    ordering = "seq"
+    page_size = getattr(settings, "JOB_FINDINGS_PAGE_SIZE", 100)
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+FINDING_FILTERS = ("severity", "category", "rule_id")
+
+
+class JobFindingsView(APIView):
+    """
+    GET /api/jobs/<id>/findings?severity=HIGH,MEDIUM&category=FONT&rule_id=6.1.1&cursor=...
+    过滤参数支持逗号分隔多值。
+    """
+    def get(self, request, job_id: str):
+        job = get_object_or_404(Job.objects.only("id", "status", "progress"), id=job_id)
+        if job.status != Job.Status.DONE:
+            return Response(
+                {"message": "Result not ready", "status": job.status, "progress": job.progress},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        qs = Finding.objects.filter(job_id=job.id)
+        for name in FINDING_FILTERS:
+            raw = request.query_params.get(name)
+            if not raw:
+                continue
+            values = [v.strip() for v in raw.split(",") if v.strip()]
+            if values:
+                qs = qs.filter(**{f"{name}__in": values})
+        qs = qs.only(*FindingSerializer().fields.keys())
+
+        paginator = FindingCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        return paginator.get_paginated_response(FindingSerializer(page, many=True).data)
+
+
 logger = logging.getLogger(__name__)
 
+
+def _record_download(job, request, *, ok: bool, message: str, meta: dict | None = None, count: bool = True):
+    """
+    下载统计：一条原子 UPDATE（download_count = download_count + 1），
+    事件走缓冲批量写入，不再 read-modify-write + save。
+    count=False：成功但不计数（304 条件请求）。
+    """
+    update = {
+        "last_download_ok": ok,
+        "last_download_error": None if ok else message,
+        "last_download_at": timezone.now(),
+    }
+    if ok and count:
+        update["download_count"] = F("download_count") + 1
+    Job.objects.filter(id=job.id).update(**update)
+
+    meta = dict(meta or {})
+    meta.setdefault("ip", request.META.get("REMOTE_ADDR"))
+    download_events.add(job_id=job.id, type=JobEvent.Type.DOWNLOAD, ok=ok, message=message, meta=meta)
+
+
 class JobDownloadView(APIView):
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= 在这里是导出格式，不是 DRF 的渲染器覆盖参数：协商失败时回落到默认 JSON 渲染器
+        return super().perform_content_negotiation(request, force=True)
+
+    def _annotated(self, request, job):
+        """原文副本 + 每条 finding 一个 Word 批注；一遍流式重写 zip，写到临时文件再发出去。"""
+        findings = (
+            f.to_issue()
+            for f in Finding.objects.filter(job_id=job.id).order_by("seq").iterator(chunk_size=500)
+        )
+        out = tempfile.TemporaryFile()
+        try:
+            with job.uploaded_file.open("rb") as src:
+                n = annotate_docx(src, out, findings)
+        except Exception as e:
+            out.close()
+            logger.exception("Annotating failed for job %s", job.id)
+            _record_download(job, request, ok=False, message=f"annotate failed: {e}", meta={"format": "annotated"})
+            raise Http404("Annotated document not available")
+        out.seek(0)
+        _record_download(job, request, ok=True, message="Download ok", meta={"format": "annotated", "comments": n})
+        return FileResponse(
+            out, as_attachment=True, filename=f"gost_annotated_{job.id}.docx",
+            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        )
+
+    def _export(self, request, job, fmt: str):
+        if fmt == "annotated":
+            return self._annotated(request, job)
+        exporter = get_exporter(fmt)
+        if exporter is None:
+            return Response(
+                {"message": f"Unsupported format: {fmt}", "formats": ["docx", "annotated", *sorted(EXPORTERS)]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        _record_download(job, request, ok=True, message="Download ok", meta={"format": fmt})
+
+        findings = (
+            f.to_issue()
+            for f in Finding.objects.filter(job_id=job.id).order_by("seq").iterator(chunk_size=500)
+        )
+        meta = {"job_id": str(job.id), "generated_at": timezone.localtime().strftime("%Y-%m-%d %H:%M:%S")}
+        response = StreamingHttpResponse(exporter.render(findings, meta), content_type=exporter.content_type)
+        response["Content-Disposition"] = f'attachment; filename="gost_result_{job.id}.{exporter.extension}"'
+        return response
+
     def get(self, request, job_id: str):
         job = get_object_or_404(Job, id=job_id)
 
         # 1) 未完成：409 + 记录失败
         if job.status != Job.Status.DONE:
-            JobEvent.objects.create(
-                job=job,
-                type=JobEvent.Type.DOWNLOAD,
-                ok=False,
-                message="Result not ready",
-                meta={"status": job.status, "progress": job.progress, "ip": request.META.get("REMOTE_ADDR")},
+            _record_download(
+                job, request, ok=False, message="Result not ready",
+                meta={"status": job.status, "progress": job.progress},
             )
-            job.last_download_ok = False
-            job.last_download_error = "Result not ready"
-            job.last_download_at = timezone.now()
-            job.save(update_fields=["last_download_ok", "last_download_error", "last_download_at"])
-
             return Response(
                 {"message": "Result not ready", "status": job.status, "progress": job.progress},
                 status=status.HTTP_409_CONFLICT,
             )
 
-        # 2) DONE 但没挂文件：404 + 记录失败
+        # 1.5) ?format=json|csv|sarif|html：直接从 Finding 流式导出，不渲染 docx；
+        #      ?format=annotated：原文副本 + Word 批注
+        fmt = (request.query_params.get("format") or "docx").lower()
+        if fmt != "docx":
+            return self._export(request, job, fmt)
+
+        # 2) DONE 但还没渲染：首次下载时从 Finding 渲染并缓存
         if not job.result_file:
-            JobEvent.objects.create(
-                job=job,
-                type=JobEvent.Type.DOWNLOAD,
-                ok=False,
-                message="Result file not set",
-                meta={"ip": request.META.get("REMOTE_ADDR")},
-            )
-            job.last_download_ok = False
-            job.last_download_error = "Result file not set"
-            job.last_download_at = timezone.now()
-            job.save(update_fields=["last_download_ok", "last_download_error", "last_download_at"])
-            raise Http404("Result file not set")
+            try:
+                job = render_result(job.id)
+            except Exception as e:
+                logger.exception("Result rendering failed for job %s", job.id)
+                _record_download(job, request, ok=False, message=f"render failed: {e}")
+                raise Http404("Result file not available")
 
         # 3) 用 storage.open：兼容本地/未来上云存储
         try:
+            etag = f'"{result_sha256(job)}"'
+            last_modified = result_last_modified(job)
+            if is_not_modified(request, etag, last_modified):
+                _record_download(job, request, ok=True, message="Not modified", meta={"etag": etag}, count=False)
+                return not_modified_response(etag, last_modified)
             fh = job.result_file.open("rb")
         except FileNotFoundError:
-            JobEvent.objects.create(
-                job=job,
-                type=JobEvent.Type.DOWNLOAD,
-                ok=False,
-                message="Result file missing",
+            _record_download(
+                job, request, ok=False, message="Result file missing",
                 meta={"path": getattr(job.result_file, "name", None)},
             )
-            job.last_download_ok = False
-            job.last_download_error = "Result file missing"
-            job.last_download_at = timezone.now()
-            job.save(update_fields=["last_download_ok", "last_download_error", "last_download_at"])
             raise Http404("Result file missing")
         except Exception as e:
-            JobEvent.objects.create(job=job, type=JobEvent.Type.DOWNLOAD, ok=False, message=f"open failed: {e}")
-            job.last_download_ok = False
-            job.last_download_error = f"open failed: {e}"
-            job.last_download_at = timezone.now()
-            job.save(update_fields=["last_download_ok","last_download_error","last_download_at"])
+            _record_download(job, request, ok=False, message=f"open failed: {e}")
             raise Http404("Result file missing")
 
         # 4) 成功下载：计数 + 时间 + 日志
-        JobEvent.objects.create(
-            job=job,
-            type=JobEvent.Type.DOWNLOAD,
-            ok=True,
-            message="Download ok",
-            meta={"ip": request.META.get("REMOTE_ADDR")},
-        )
-        job.download_count = (job.download_count or 0) + 1
-        job.last_download_ok = True
-        job.last_download_error = None
-        job.last_download_at = timezone.now()
-        job.save(update_fields=["download_count", "last_download_ok", "last_download_error", "last_download_at"])
+        _record_download(job, request, ok=True, message="Download ok")
 
         download_name = f"gost_result_{job_id}.docx"
-        return FileResponse(fh, as_attachment=True, filename=download_name)
+        return file_response(job, fh, download_name, etag, last_modified)
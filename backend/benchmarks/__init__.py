@@ -0,0 +1,8 @@
+"""
+性能基准：合成 ГОСТ 7.32 报告 + 分阶段计时（extract_docx_snapshot / run_plan / write_result）。
+
+在 backend/ 下运行：
+    python -m benchmarks                               # 10 / 100 / 500 / 2000 页
+    python -m benchmarks --sizes 10 100 --repeat 5 --out bench.json
+    python -m benchmarks --baseline bench.json --max-regression 0.2   # 回退时退出码 1
+"""
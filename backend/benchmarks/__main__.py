@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .generator import SIZES, generate_corpus
+from .runner import compare, environment, format_comparison, format_results, resolve_ruleset, run_case, save
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks", description="GOST checker benchmarks")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="report sizes in pages")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--clean", action="store_true", help="generate reports without deliberate violations")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per size (median is reported)")
+    ap.add_argument("--corpus", default=".bench_corpus", help="directory for generated reports (reused between runs)")
+    ap.add_argument("--regenerate", action="store_true", help="regenerate reports even if they exist")
+    ap.add_argument("--rules", default=None, help="runtime.json to use (default: compiled standard)")
+    ap.add_argument("--extract-workers", type=int, default=1, help="processes for chunked docx extraction (1 = sequential)")
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--baseline", default=None, help="results JSON to compare against")
+    ap.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown ratio before failing (0.2 = +20%%)")
+    args = ap.parse_args(argv)
+
+    corpus_dir = Path(args.corpus)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    ruleset = resolve_ruleset(args.rules, corpus_dir)
+    corpus = generate_corpus(corpus_dir, args.sizes, seed=args.seed, violations=not args.clean, force=args.regenerate)
+
+    results = []
+    for item in corpus:
+        print(f"[bench] {item['pages']} pages: {item['path']}", file=sys.stderr)
+        results.append({"pages": item["pages"], **run_case(item["path"], ruleset, repeat=args.repeat, extract_workers=args.extract_workers)})
+
+    data = {
+        "env": environment(),
+        "params": {"seed": args.seed, "violations": not args.clean, "repeat": args.repeat},
+        "results": results,
+    }
+    print(format_results(results))
+    if args.out:
+        save(args.out, data)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        rows = compare(data, baseline, args.max_regression)
+        print()
+        print(format_comparison(rows))
+        if any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import random
+import struct
+import zlib
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import List
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from docx.shared import Mm, Pt, RGBColor
+
+# =========================
+# 合成 ГОСТ 7.32-2017 报告（确定性：同样的参数 + seed 生成同样的文档内容）
+# 结构齐全：титульный лист / РЕФЕРАТ / СОДЕРЖАНИЕ / ВВЕДЕНИЕ / 各章 / ЗАКЛЮЧЕНИЕ /
+# СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ / ПРИЛОЖЕНИЕ А；按页数放图、表、公式和引用，
+# 可选地注入固定比例的违规（小字号、悬空引用、跳号、漏目录项），让规则都有活干。
+# =========================
+
+SIZES = (10, 100, 500, 2000)
+
+PARAS_PER_PAGE = 7  # 14pt、1.5 倍行距下一页正文约 7 段（每段 ~250 字符）
+
+_WORDS = (
+    "исследование анализ метод система данные модель результат процесс параметр оценка "
+    "эксперимент разработка структура алгоритм значение расчет испытание объект показатель "
+    "требование проверка документ обработка измерение погрешность характеристика решение "
+    "задача подход условие вариант этап область применение критерий точность нагрузка"
+).split()
+
+
+@dataclass
+class ReportSpec:
+    pages: int
+    seed: int = 0
+    chapters: int = 0           # 0 = 按页数自动（每 ~20 页一章，3..30）
+    figure_every: int = 4       # 每 N 页一张图
+    table_every: int = 5        # 每 N 页一张表
+    formula_every: int = 6      # 每 N 页一个公式
+    citations_per_page: int = 2
+    sources: int = 0            # 0 = 按页数自动
+    violations: bool = True
+
+
+def _png(size: int = 8) -> bytes:
+    """最小灰度 PNG（不依赖 Pillow）。"""
+    raw = b"".join(b"\x00" + bytes([(x * 29 + y * 17) % 256 for x in range(size)]) for y in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+_PNG = _png(400)  # 60 мм 宽时约 170 dpi：干净报告不触发 6.5 的 min_dpi（150）
+
+
+class _Text:
+    def __init__(self, rnd: random.Random):
+        self.rnd = rnd
+
+    def sentence(self, n: int = 12) -> str:
+        words = [self.rnd.choice(_WORDS) for _ in range(n)]
+        return " ".join(words).capitalize() + "."
+
+    def paragraph(self, sentences: int = 3) -> str:
+        return " ".join(self.sentence(self.rnd.randint(8, 16)) for _ in range(sentences))
+
+    def title(self, n: int = 3) -> str:
+        return " ".join(self.rnd.choice(_WORDS) for _ in range(n)).capitalize()
+
+
+def _setup(doc: Document):
+    sec = doc.sections[0]
+    sec.left_margin, sec.right_margin = Mm(30), Mm(15)
+    sec.top_margin, sec.bottom_margin = Mm(20), Mm(20)
+    normal = doc.styles["Normal"]
+    normal.font.name = "Times New Roman"
+    normal.font.size = Pt(14)
+    normal.paragraph_format.line_spacing = 1.5
+    # 模板自带的标题样式是彩色 Calibri：统一成黑色 Times New Roman，干净报告不触发 6.1.1 颜色检查
+    for name in ("Heading 1", "Heading 2"):
+        font = doc.styles[name].font
+        font.name = "Times New Roman"
+        font.size = Pt(14)
+        font.color.rgb = RGBColor(0, 0, 0)
+
+
+def _page_break(doc: Document):
+    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+
+def _structural(doc: Document, title: str):
+    h = doc.add_heading(title, level=1)
+    h.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def generate_report(path: Path | str, spec: ReportSpec) -> dict:
+    """写出 docx，返回统计（页数、段落数、图表数、注入的违规数）。"""
+    rnd = random.Random(f"{spec.seed}:{spec.pages}")
+    text = _Text(rnd)
+    doc = Document()
+    _setup(doc)
+
+    n_chapters = spec.chapters or max(3, min(30, spec.pages // 20))
+    n_sources = spec.sources or max(5, min(300, spec.pages // 2))
+    body_pages = max(1, spec.pages - 6)
+    pages_per_chapter = max(1, body_pages // n_chapters)
+
+    stats = {"pages": spec.pages, "figures": 0, "tables": 0, "formulas": 0, "citations": 0, "violations": 0}
+    chapter_titles = [f"{i} {text.title()}" for i in range(1, n_chapters + 1)]
+    section_titles = [[f"{i}.{k} {text.title(2)}" for k in (1, 2)] for i in range(1, n_chapters + 1)]
+    violate = spec.violations
+
+    # ---- титульный лист ----
+    for line in (
+        "Министерство науки и высшего образования Российской Федерации",
+        "УДК 004.9",
+        "Рег. № 123456",
+        "Инв. № 654321",
+        "УТВЕРЖДАЮ",
+        "ОТЧЕТ О НАУЧНО-ИССЛЕДОВАТЕЛЬСКОЙ РАБОТЕ",
+        "заключительный",
+        "Руководитель темы Иванов И.И.",
+        "Москва 2024",
+    ):
+        doc.add_paragraph(line).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    _page_break(doc)
+
+    # ---- РЕФЕРАТ ----
+    _structural(doc, "РЕФЕРАТ")
+    n_fig = body_pages // spec.figure_every if spec.figure_every else 0
+    n_tab = body_pages // spec.table_every if spec.table_every else 0
+    doc.add_paragraph(f"Отчет {spec.pages} с., {n_fig} рис., {n_tab} табл., {n_sources} источн., 1 прил.")
+    doc.add_paragraph("Ключевые слова: " + ", ".join(w.upper() for w in rnd.sample(_WORDS, 7)))
+    doc.add_paragraph("Объект исследования – " + text.paragraph(1))
+    doc.add_paragraph("Цель работы – " + text.paragraph(1))
+    doc.add_paragraph("Метод исследования – " + text.paragraph(1))
+    doc.add_paragraph("Результаты работы – " + text.paragraph(2))
+    _page_break(doc)
+
+    # ---- СОДЕРЖАНИЕ ----
+    _structural(doc, "СОДЕРЖАНИЕ")
+    toc = ["Введение"]
+    for ch_title, subs in zip(chapter_titles, section_titles):
+        toc += [ch_title] + subs
+    toc += ["Заключение", "Список использованных источников", "Приложение А"]
+    for k, entry in enumerate(toc):
+        if violate and k == len(toc) // 2:
+            stats["violations"] += 1  # 漏掉一个目录项
+            continue
+        doc.add_paragraph(f"{entry} {'.' * 10} {4 + k * pages_per_chapter}")
+    _page_break(doc)
+
+    # ---- ВВЕДЕНИЕ ----
+    _structural(doc, "ВВЕДЕНИЕ")
+    for _ in range(PARAS_PER_PAGE):
+        doc.add_paragraph(text.paragraph())
+
+    # ---- 各章 ----
+    fig_no = tab_no = formula_no = 0
+    page = 0
+    next_source = 1  # 先按顺序引用每个源（编号 = 首次引用顺序），之后随机
+    for ch_title, subs in zip(chapter_titles, section_titles):
+        doc.add_heading(ch_title, level=1)
+        for sub_title in subs:
+            doc.add_heading(sub_title, level=2)
+            for _ in range(max(1, pages_per_chapter // 2)):
+                page += 1
+                for _ in range(PARAS_PER_PAGE - 2):
+                    para = text.paragraph()
+                    for _ in range(spec.citations_per_page // 2 or 1):
+                        if next_source <= n_sources:
+                            ref, next_source = next_source, next_source + 1
+                        else:
+                            ref = rnd.randint(1, n_sources)
+                        para += f" [{ref}]"
+                        stats["citations"] += 1
+                    doc.add_paragraph(para)
+
+                if spec.figure_every and page % spec.figure_every == 0:
+                    fig_no += 1
+                    if violate and fig_no == 3:
+                        fig_no += 1  # 跳号
+                        stats["violations"] += 1
+                    doc.add_paragraph(f"Схема приведена на рисунке {fig_no}. " + text.sentence())
+                    doc.add_paragraph().add_run().add_picture(BytesIO(_PNG), width=Mm(60))
+                    cap = doc.add_paragraph(f"Рисунок {fig_no} – {text.title()}")
+                    cap.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                    stats["figures"] += 1
+
+                if spec.table_every and page % spec.table_every == 0:
+                    tab_no += 1
+                    unreferenced = violate and tab_no == 2
+                    if unreferenced:
+                        stats["violations"] += 1
+                    else:
+                        doc.add_paragraph(f"Результаты приведены в таблице {tab_no}. " + text.sentence())
+                    doc.add_paragraph(f"Таблица {tab_no} – {text.title()}")
+                    table = doc.add_table(rows=4, cols=3)
+                    for r, row in enumerate(table.rows):
+                        for c, cell in enumerate(row.cells):
+                            cell.text = text.title(1) if r == 0 else f"{rnd.randint(1, 999)},{rnd.randint(0, 9)}"
+                    stats["tables"] += 1
+
+                if spec.formula_every and page % spec.formula_every == 0:
+                    formula_no += 1
+                    doc.add_paragraph(f"y = a·x{formula_no} + b ({formula_no})")
+                    doc.add_paragraph("где a – " + text.sentence(5))
+                    stats["formulas"] += 1
+
+                if violate and page % 50 == 25:
+                    # 小字号片段
+                    run = doc.add_paragraph().add_run(text.sentence(6))
+                    run.font.size = Pt(10)
+                    stats["violations"] += 1
+
+    # ---- ЗАКЛЮЧЕНИЕ ----
+    _structural(doc, "ЗАКЛЮЧЕНИЕ")
+    for _ in range(PARAS_PER_PAGE):
+        doc.add_paragraph(text.paragraph())
+    if violate:
+        doc.add_paragraph(text.sentence() + f" [{n_sources + 5}]")  # 悬空引用
+        stats["violations"] += 1
+
+    # ---- СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ ----
+    _structural(doc, "СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ")
+    for k in range(1, n_sources + 1):
+        doc.add_paragraph(f"{k}. {text.title(2)} {text.title(3)}. – М. : Наука, {1990 + k % 30}. – {100 + k} с.")
+
+    # ---- ПРИЛОЖЕНИЕ А ----
+    _structural(doc, "ПРИЛОЖЕНИЕ А")
+    doc.add_paragraph("(обязательное)").alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(text.title())
+    for _ in range(3):
+        doc.add_paragraph(text.paragraph())
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(path))
+    stats["paragraphs"] = len(doc.paragraphs)
+    return stats
+
+
+def generate_corpus(out_dir: Path | str, sizes: List[int] = list(SIZES), *, seed: int = 0,
+                    violations: bool = True, force: bool = False) -> List[dict]:
+    """按尺寸生成（已存在且不 force 时复用）；返回 [{"pages", "path", ...stats}]"""
+    out_dir = Path(out_dir)
+    out = []
+    for pages in sizes:
+        path = out_dir / f"report_{pages}p_s{seed}{'' if violations else '_clean'}.docx"
+        if path.exists() and not force:
+            out.append({"pages": pages, "path": str(path)})
+            continue
+        stats = generate_report(path, ReportSpec(pages=pages, seed=seed, violations=violations))
+        out.append({**stats, "path": str(path)})
+    return out
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+STANDARDS_DIR = BACKEND_DIR / "apps" / "checker" / "standards"
+
+STAGES = ("extract", "rules", "write_result")
+
+
+def resolve_ruleset(path: Optional[str], work_dir: Path) -> str:
+    """优先用已编译的 runtime.json；没有就从 DSL 现编一份到 work_dir。"""
+    if path:
+        return path
+    compiled = STANDARDS_DIR / "gost_7_32_2017.runtime.json"
+    if compiled.exists():
+        return str(compiled)
+    from apps.checker.engine.compile_dsl import compile_dsl
+    out = work_dir / "gost_7_32_2017.runtime.json"
+    compile_dsl(STANDARDS_DIR / "gost_7_32_2017.yaml", out)
+    return str(out)
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux：KB；macOS：字节
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _run_case(doc_path: str, ruleset_path: str, repeat: int, extract_workers: int = 1) -> dict:
+    """在独立子进程里跑：peak RSS 只反映这一个尺寸。"""
+    from apps.checker.engine.docx_extractor import extract_docx_snapshot
+    from apps.checker.engine.hard_rules import build_context, run_plan
+    from apps.checker.engine.result_writer import write_result
+    from apps.checker.engine.rule_loader import load_rules
+
+    runtime = load_rules(ruleset_path)
+    timings: Dict[str, List[float]] = {s: [] for s in STAGES}
+    paragraphs = issues_n = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            snap = extract_docx_snapshot(doc_path, workers=extract_workers)
+            t1 = time.perf_counter()
+            ctx = build_context(snap, runtime)
+            issues = run_plan(snap, runtime, ctx)
+            t2 = time.perf_counter()
+            write_result(tmp, "bench", issues)
+            t3 = time.perf_counter()
+
+            timings["extract"].append(t1 - t0)
+            timings["rules"].append(t2 - t1)
+            timings["write_result"].append(t3 - t2)
+            paragraphs = len(snap.get("paragraphs") or [])
+            issues_n = len(issues)
+
+    return {"timings": timings, "paragraphs": paragraphs, "issues": issues_n, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_case(doc_path: str, ruleset_path: str, repeat: int = 3, extract_workers: int = 1) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        raw = pool.submit(_run_case, doc_path, ruleset_path, repeat, extract_workers).result()
+
+    n = raw["paragraphs"]
+    stages = {}
+    for stage, vals in raw["timings"].items():
+        med = statistics.median(vals)
+        stages[stage] = {
+            "median_s": round(med, 6),
+            "min_s": round(min(vals), 6),
+            "paragraphs_per_s": round(n / med, 1) if med > 0 else None,
+        }
+    total = sum(stages[s]["median_s"] for s in STAGES)
+    return {
+        "paragraphs": n,
+        "issues": raw["issues"],
+        "stages": stages,
+        "total_s": round(total, 6),
+        "jobs_per_min": round(60.0 / total, 2) if total > 0 else None,
+        "peak_rss_mb": raw["peak_rss_mb"],
+    }
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_rev": _git_rev(),
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+# ---------- 与基线对比 ----------
+def compare(current: dict, baseline: dict, max_regression: float) -> List[dict]:
+    """按 (pages, stage) 对比中位数耗时；ratio > 1 + max_regression 记为回退。"""
+    base = {r["pages"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in current.get("results", []):
+        b = base.get(r["pages"])
+        if not b:
+            continue
+        for stage in STAGES + ("total",):
+            cur_s = r["total_s"] if stage == "total" else r["stages"][stage]["median_s"]
+            base_s = b["total_s"] if stage == "total" else (b["stages"].get(stage) or {}).get("median_s")
+            if not base_s:
+                continue
+            ratio = cur_s / base_s
+            rows.append({
+                "pages": r["pages"], "stage": stage,
+                "baseline_s": base_s, "current_s": cur_s, "ratio": round(ratio, 3),
+                "regression": ratio > 1 + max_regression,
+            })
+        if b.get("peak_rss_mb") and r.get("peak_rss_mb"):
+            ratio = r["peak_rss_mb"] / b["peak_rss_mb"]
+            rows.append({
+                "pages": r["pages"], "stage": "peak_rss_mb",
+                "baseline_s": b["peak_rss_mb"], "current_s": r["peak_rss_mb"], "ratio": round(ratio, 3),
+                "regression": ratio > 1 + max_regression,
+            })
+    return rows
+
+
+def format_results(results: List[dict]) -> str:
+    lines = [f"{'pages':>6} {'paras':>7} {'extract s':>10} {'rules s':>9} {'write s':>9} {'para/s':>9} {'jobs/min':>9} {'rss MB':>8}"]
+    for r in results:
+        st = r["stages"]
+        lines.append(
+            f"{r['pages']:>6} {r['paragraphs']:>7} {st['extract']['median_s']:>10.3f} {st['rules']['median_s']:>9.3f} "
+            f"{st['write_result']['median_s']:>9.3f} {st['extract']['paragraphs_per_s'] or 0:>9.0f} "
+            f"{r['jobs_per_min'] or 0:>9.1f} {r['peak_rss_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict]) -> str:
+    lines = [f"{'pages':>6} {'stage':>13} {'baseline':>10} {'current':>10} {'ratio':>7}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['pages']:>6} {r['stage']:>13} {r['baseline_s']:>10.3f} {r['current_s']:>10.3f} {r['ratio']:>7.2f}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def save(path: Path | str, data: dict):
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
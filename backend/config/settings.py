@@ -86,6 +86,17 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
 CORS_ALLOW_ALL_ORIGINS = True
+# 浏览器端读取下载文件名/缓存校验头需要显式暴露
+CORS_EXPOSE_HEADERS = ["Content-Disposition", "ETag", "Last-Modified"]
+
+# 结果 docx 渲染时机：lazy（首次下载时）| background（检查完成后低优先级任务）| eager（检查任务内，旧行为）
+RESULT_RENDER_MODE = os.getenv("RESULT_RENDER_MODE", "lazy")
+
+# 结果下载交付方式：django（FileResponse）| x-accel（nginx internal location）| x-sendfile（apache/lighttpd）
+RESULT_DELIVERY = os.getenv("RESULT_DELIVERY", "django")
+# x-accel 模式下映射到 MEDIA_ROOT 的 internal location，例如：
+#   location /protected-media/ { internal; alias /path/to/backend/media/; }
+RESULT_ACCEL_PREFIX = os.getenv("RESULT_ACCEL_PREFIX", "/protected-media/")
 
 # Celery / Redis
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
@@ -94,3 +105,59 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+
+# JobEvent 缓冲写入（下载事件）：满 N 条或超过 T 秒批量落库；SIZE=1 即不缓冲
+JOB_EVENT_BUFFER_SIZE = int(os.getenv("JOB_EVENT_BUFFER_SIZE", "50"))
+JOB_EVENT_FLUSH_INTERVAL = float(os.getenv("JOB_EVENT_FLUSH_INTERVAL", "2.0"))
+
+# 语义审查（ai_mode = AI_DIRECT / HYBRID）：GPT / DEEPSEEK / QWEN 都走 OpenAI 兼容接口；STUB 为本地确定性实现
+# rpm：每个 worker 进程内的每分钟请求上限；concurrency：单个 job 的并发请求数
+AI_PROVIDERS = {
+    "GPT": {
+        "api_key": os.getenv("OPENAI_API_KEY", ""),
+        "base_url": os.getenv("OPENAI_BASE_URL", ""),
+        "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "rpm": int(os.getenv("OPENAI_RPM", "60")),
+        "concurrency": int(os.getenv("OPENAI_CONCURRENCY", "4")),
+    },
+    "DEEPSEEK": {
+        "api_key": os.getenv("DEEPSEEK_API_KEY", ""),
+        "base_url": os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+        "model": os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+        "rpm": int(os.getenv("DEEPSEEK_RPM", "60")),
+        "concurrency": int(os.getenv("DEEPSEEK_CONCURRENCY", "4")),
+    },
+    "QWEN": {
+        "api_key": os.getenv("DASHSCOPE_API_KEY", ""),
+        "base_url": os.getenv("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"),
+        "model": os.getenv("QWEN_MODEL", "qwen-plus"),
+        "rpm": int(os.getenv("QWEN_RPM", "60")),
+        "concurrency": int(os.getenv("QWEN_CONCURRENCY", "4")),
+    },
+    "STUB": {
+        "latency": float(os.getenv("AI_STUB_LATENCY", "0")),
+    },
+}
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "60"))
+AI_RULES_PER_CALL = int(os.getenv("AI_RULES_PER_CALL", "4"))
+AI_CHUNK_CHARS = int(os.getenv("AI_CHUNK_CHARS", "6000"))
+# HYBRID：AI 请求和硬规则并行，从提交起最多等这么久；超时先写 NEED_REVIEW 占位，后台任务回填
+AI_HYBRID_DEADLINE = float(os.getenv("AI_HYBRID_DEADLINE", "30"))
+# 结果缓存（Django cache）：key = (章节文本 hash, rule_id, provider)
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+
+# 性能埋点：每个 job 的阶段/op 耗时存进 JobEvent.meta["profile"]，/metrics 聚合成 Prometheus histogram
+# ALLOC=1 额外用 tracemalloc 统计内存分配增量（明显变慢，排查时再开）
+JOB_PROFILE_ALLOC = os.getenv("JOB_PROFILE_ALLOC", "0") == "1"
+# /metrics 访问令牌（Authorization: Bearer <token>）；留空则不校验
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# docx 解析进程数：>1 时 document.xml 超过 4MB（约 1000 页以上）的大文档分块并行解析；
+# Celery prefork 池的 worker 是 daemon 进程不能再起子进程，会自动退回顺序解析（用 --pool threads/solo 时才生效）
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "1"))
+
+# 每个 job 保留解析出的 snapshot（MEDIA_ROOT/snapshots/<id>.json.gz），供 manage.py reevaluate 回放新规则集
+JOB_KEEP_SNAPSHOT = os.getenv("JOB_KEEP_SNAPSHOT", "1") == "1"
+
+# GET /api/jobs/<id>/findings 默认每页条数（?page_size= 可覆盖，上限 500）
+JOB_FINDINGS_PAGE_SIZE = int(os.getenv("JOB_FINDINGS_PAGE_SIZE", "100"))